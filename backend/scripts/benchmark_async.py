@@ -0,0 +1,100 @@
+"""
+Benchmark de latencia: herramientas síncronas en hilos vs. capa asyncio nativa.
+
+Lanza N llamadas concurrentes a la misma consulta (balance de empresa) por dos
+caminos y reporta p50/p99:
+
+  - sync:  FinancialDataQueries en el executor por defecto (como hoy en FastMCP)
+  - async: AsyncFinancialDataQueries sobre el pool de aiomysql
+
+La caché de resultados se desactiva: ambos caminos van a la base de datos.
+
+Uso:
+    python scripts/benchmark_async.py --company-id E001 --concurrency 50 --rounds 5
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database import FinancialDataQueries, AsyncFinancialDataQueries, get_async_db_connection, get_result_cache
+from utils import setup_logger
+
+logger = setup_logger('benchmark_async', logging.INFO)
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Percentil por rango más cercano (suficiente para un benchmark)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_sync_round(company_id: str, concurrency: int) -> list:
+    queries = FinancialDataQueries()
+
+    def call() -> float:
+        start = time.perf_counter()
+        queries.get_company_balance(company_id)
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*[asyncio.to_thread(call) for _ in range(concurrency)])
+
+
+async def run_async_round(company_id: str, concurrency: int) -> list:
+    queries = AsyncFinancialDataQueries()
+
+    async def call() -> float:
+        start = time.perf_counter()
+        await queries.get_company_balance(company_id)
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*[call() for _ in range(concurrency)])
+
+
+def report(label: str, samples: list) -> None:
+    logger.info(
+        f"{label:<6} n={len(samples):<5} "
+        f"p50={statistics.median(samples):8.1f} ms  "
+        f"p99={percentile(samples, 99):8.1f} ms  "
+        f"max={max(samples):8.1f} ms"
+    )
+
+
+async def main(company_id: str, concurrency: int, rounds: int) -> None:
+    logger.info(f"=== Benchmark: {concurrency} llamadas concurrentes x {rounds} rondas ===")
+
+    # get_company_balance síncrono está cacheado: sin esto se compararían
+    # aciertos de caché contra consultas reales
+    get_result_cache().enabled = False
+
+    # Calentar ambos pools para no medir la creación de conexiones
+    await run_sync_round(company_id, 1)
+    await run_async_round(company_id, 1)
+
+    sync_samples, async_samples = [], []
+    for _ in range(rounds):
+        sync_samples.extend(await run_sync_round(company_id, concurrency))
+        async_samples.extend(await run_async_round(company_id, concurrency))
+
+    report("sync", sync_samples)
+    report("async", async_samples)
+
+    await get_async_db_connection().close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--company-id', default=None, help='ID de la empresa (default: todas)')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.company_id, args.concurrency, args.rounds))
@@ -0,0 +1,130 @@
+"""
+Benchmark de arranque: cuánto cuesta importar el servidor y qué módulos lo dominan.
+
+Ejecuta ``python -X importtime -c "import <módulo>"`` en procesos nuevos (sin
+cachés en memoria), toma la mediana de N corridas y reporta:
+
+  - tiempo total de pared del proceso
+  - los módulos con mayor costo acumulado y propio
+  - si se cargaron módulos pesados (pandas, statsmodels, scipy, duckdb), que
+    deberían importarse solo al pedir un pronóstico o en el warm-up
+
+Uso:
+    python scripts/benchmark_startup.py [--module mcp_http_server] [--runs 5] [--top 15] [--json]
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils import setup_logger
+
+logger = setup_logger('benchmark_startup', logging.INFO)
+
+SRC_DIR = Path(__file__).parent.parent / 'src'
+HEAVY_MODULES = ('pandas', 'statsmodels', 'scipy', 'duckdb')
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """{módulo: (self_us, cumulative_us)} a partir de la salida de -X importtime."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            out[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return out
+
+
+def run_once(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['']
+        raise RuntimeError(f"import {module} falló: {tail[0]}")
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def summarize(module: str, runs: int, top: int) -> dict:
+    walls: List[float] = []
+    samples: Dict[str, List[Tuple[int, int]]] = {}
+    for _ in range(runs):
+        wall_ms, timings = run_once(module)
+        walls.append(wall_ms)
+        for name, value in timings.items():
+            samples.setdefault(name, []).append(value)
+
+    modules = {
+        name: {
+            'self_ms': round(statistics.median(v[0] for v in values) / 1000, 2),
+            'cumulative_ms': round(statistics.median(v[1] for v in values) / 1000, 2),
+        }
+        for name, values in samples.items()
+    }
+    by_cumulative = sorted(modules.items(), key=lambda kv: kv[1]['cumulative_ms'], reverse=True)
+    by_self = sorted(modules.items(), key=lambda kv: kv[1]['self_ms'], reverse=True)
+    return {
+        'module': module,
+        'runs': runs,
+        'wall_ms': round(statistics.median(walls), 1),
+        'import_ms': modules.get(module, {}).get('cumulative_ms'),
+        'modules_loaded': len(modules),
+        'heavy_loaded': [m for m in HEAVY_MODULES if m in modules],
+        'top_cumulative': [{'module': n, **v} for n, v in by_cumulative[:top]],
+        'top_self': [{'module': n, **v} for n, v in by_self[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='mcp_http_server', help='Módulo a importar (relativo a src/)')
+    parser.add_argument('--runs', type=int, default=5, help='Procesos a lanzar (se reporta la mediana)')
+    parser.add_argument('--top', type=int, default=15, help='Módulos a listar por costo')
+    parser.add_argument('--json', action='store_true', help='Imprimir el resultado como JSON')
+    args = parser.parse_args()
+
+    try:
+        result = summarize(args.module, max(1, args.runs), args.top)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    logger.info(
+        f"import {result['module']}: {result['import_ms']} ms "
+        f"(proceso completo {result['wall_ms']} ms, mediana de {result['runs']}, "
+        f"{result['modules_loaded']} módulos)"
+    )
+    if result['heavy_loaded']:
+        logger.warning(f"Módulos pesados cargados al importar: {', '.join(result['heavy_loaded'])}")
+    else:
+        logger.info("✓ Ningún módulo pesado se carga al importar")
+    logger.info("Mayor costo acumulado:")
+    for row in result['top_cumulative']:
+        logger.info(f"  {row['cumulative_ms']:>9.2f} ms  {row['module']}")
+    logger.info("Mayor costo propio:")
+    for row in result['top_self']:
+        logger.info(f"  {row['self_ms']:>9.2f} ms  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
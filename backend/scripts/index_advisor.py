@@ -0,0 +1,86 @@
+"""
+Asesor de índices: compara las consultas que emite el código con los índices
+de las tablas y reporta cuáles no están cubiertas.
+
+Fuentes de consultas (se combinan):
+    --from-code     planes de FinancialDataQueries ejecutados sin base de datos (por defecto)
+    --slow-log F    huellas del registro de consultas lentas (scripts/slow_queries.py)
+
+Índices:
+    por defecto los de la base de datos (information_schema);
+    --planned usa los que crearían las migraciones, sin conectarse.
+
+Uso:
+    python scripts/index_advisor.py [--planned] [--slow-log logs/slow_queries.jsonl]
+                                    [--all] [--json]
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database.advisor import advise, parse_shape, statements_from_code
+from database.migrations import existing_indexes, planned_indexes
+from database.slowlog import read_log
+from utils import setup_logger
+
+logger = setup_logger('index_advisor', logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--no-code', action='store_true', help='No incluir las consultas de FinancialDataQueries')
+    parser.add_argument('--slow-log', default=None, help='Archivo JSONL del registro de consultas lentas')
+    parser.add_argument('--planned', action='store_true', help='Usar los índices de las migraciones (sin BD)')
+    parser.add_argument('--all', action='store_true', help='Mostrar también las consultas cubiertas')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    statements = []
+    if not args.no_code:
+        statements.extend(sql for _, sql in statements_from_code())
+    if args.slow_log:
+        statements.extend(entry['statement'] for entry in read_log(args.slow_log))
+    if not statements:
+        logger.warning("No hay consultas que analizar")
+        return
+
+    try:
+        if args.planned:
+            indexes = planned_indexes()
+        else:
+            tables = sorted({s.table for s in map(parse_shape, statements) if s})
+            indexes = existing_indexes(tables)
+    except Exception as e:
+        logger.error(f"No se pudieron leer los índices: {e}")
+        sys.exit(1)
+
+    report = advise(statements, indexes)
+    if not args.all:
+        report = [r for r in report if r['status'] != 'covered']
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    labels = {'not_covered': '✗ sin índice', 'partial': '~ parcial', 'full_scan': '· sin filtro', 'covered': '✓ cubierta'}
+    for r in report:
+        print(f"{labels[r['status']]:<14} [{r['id']}] {r['table']}  índice={r['index'] or '-'}")
+        print(f"    {r['fingerprint'][:240]}")
+        if r.get('non_sargable'):
+            print(f"    ⚠ funciones en WHERE (no usan índice): {', '.join(r['non_sargable'])}")
+        if r.get('suggested_index'):
+            print(f"    sugerido: ({', '.join(r['suggested_index'])})")
+    summary = {}
+    for r in advise(statements, indexes):
+        summary[r['status']] = summary.get(r['status'], 0) + 1
+    logger.info(f"Resumen: {summary}")
+
+
+if __name__ == "__main__":
+    main()
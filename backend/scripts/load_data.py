@@ -1,45 +1,63 @@
 """
 Script para cargar datos de los archivos Excel a la base de datos.
 Procesa los archivos de finanzas empresariales y personales.
+
+Los archivos se leen en streaming (openpyxl en modo read-only o CSV por
+bloques), los tipos se convierten por columna y las filas se insertan con
+executemany en lotes, una transacción por lote. Un lote rechazado se
+reintenta fila a fila, así que una fila inválida no aborta la carga. Con
+USE_MONTHLY_ROLLUP activo, el rollup mensual se actualiza al terminar.
+
+Uso:
+    python scripts/load_data.py [--batch-size 5000] [--chunk-size 50000]
+                                [--company-file F] [--personal-file F]
 """
 
+import argparse
 import os
 import sys
+import time
 import pandas as pd
 import logging
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from database import get_db_connection
+from database.cache import mark_entities_changed
+from database.rollup import MonthlyRollup, rollup_enabled
 from utils import setup_logger
 
 logger = setup_logger('data_loader', logging.INFO)
 
+DEFAULT_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 5000))
+DEFAULT_CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', 50000))
 
-def load_company_data(excel_path: str) -> int:
-    """
-    Carga datos empresariales desde Excel a la base de datos.
-    
-    Args:
-        excel_path: Ruta al archivo Excel de finanzas empresariales
-    
-    Returns:
-        Número de registros insertados
-    """
-    try:
-        # Leer Excel
-        df = pd.read_excel(excel_path)
-        logger.info(f"Leyendo archivo: {excel_path}")
-        logger.info(f"Columnas encontradas: {df.columns.tolist()}")
-        logger.info(f"Total de registros: {len(df)}")
-        
-        # Obtener conexión a BD
-        db = get_db_connection()
-        
-        # Crear tabla si no existe
-        create_table_query = """
+
+@dataclass
+class TableSpec:
+    """Tabla destino y columnas a cargar (nombre en el Excel = nombre en la tabla)."""
+
+    table: str
+    create_sql: str
+    entity_column: str
+    columns: Tuple[str, ...]
+    defaults: Dict[str, Any]
+    # Las transacciones empresariales alimentan el rollup mensual
+    rollup: bool = False
+
+    @property
+    def insert_sql(self) -> str:
+        placeholders = ', '.join(['%s'] * len(self.columns))
+        return f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})"
+
+
+COMPANY_SPEC = TableSpec(
+    table='transacciones_empresa',
+    create_sql="""
         CREATE TABLE IF NOT EXISTS transacciones_empresa (
             id INT AUTO_INCREMENT PRIMARY KEY,
             id_empresa VARCHAR(50),
@@ -49,73 +67,21 @@ def load_company_data(excel_path: str) -> int:
             categoria VARCHAR(100),
             monto DECIMAL(15, 2),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_empresa (id_empresa),
             INDEX idx_fecha (fecha),
-            INDEX idx_tipo (tipo_operacion),
-            INDEX idx_categoria (categoria)
+            INDEX idx_emp_tipo_fecha_monto (id_empresa, tipo_operacion, fecha, monto),
+            INDEX idx_emp_cat_fecha (id_empresa, categoria, fecha)
         )
-        """
-        db.execute_query(create_table_query, fetch=False)
-        logger.info("Tabla transacciones_empresa verificada/creada")
-        
-        # Insertar datos
-        insert_query = """
-        INSERT INTO transacciones_empresa 
-        (id_empresa, fecha, tipo_operacion, concepto, categoria, monto)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
-        inserted = 0
-        for _, row in df.iterrows():
-            try:
-                # Ajustar nombres de columnas según tu Excel
-                # Esto es un ejemplo, ajusta según tus columnas reales
-                params = (
-                    row.get('id_empresa', 'EMP001'),
-                    row.get('fecha'),
-                    row.get('tipo_operacion', 'gasto'),
-                    row.get('concepto', ''),
-                    row.get('categoria', 'Otros'),
-                    float(row.get('monto', 0))
-                )
-                
-                db.execute_query(insert_query, params, fetch=False)
-                inserted += 1
-                
-            except Exception as e:
-                logger.warning(f"Error insertando fila: {e}")
-                continue
-        
-        logger.info(f"Total de registros empresariales insertados: {inserted}")
-        return inserted
-        
-    except Exception as e:
-        logger.error(f"Error cargando datos empresariales: {e}")
-        raise
+    """,
+    entity_column='id_empresa',
+    columns=('id_empresa', 'fecha', 'tipo_operacion', 'concepto', 'categoria', 'monto'),
+    # Ajustar según las columnas reales del Excel
+    defaults={'id_empresa': 'EMP001', 'tipo_operacion': 'gasto', 'concepto': '', 'categoria': 'Otros'},
+    rollup=True,
+)
 
-
-def load_personal_data(excel_path: str) -> int:
-    """
-    Carga datos personales desde Excel a la base de datos.
-    
-    Args:
-        excel_path: Ruta al archivo Excel de finanzas personales
-    
-    Returns:
-        Número de registros insertados
-    """
-    try:
-        # Leer Excel
-        df = pd.read_excel(excel_path)
-        logger.info(f"Leyendo archivo: {excel_path}")
-        logger.info(f"Columnas encontradas: {df.columns.tolist()}")
-        logger.info(f"Total de registros: {len(df)}")
-        
-        # Obtener conexión a BD
-        db = get_db_connection()
-        
-        # Crear tabla si no existe
-        create_table_query = """
+PERSONAL_SPEC = TableSpec(
+    table='transacciones_personales',
+    create_sql="""
         CREATE TABLE IF NOT EXISTS transacciones_personales (
             id INT AUTO_INCREMENT PRIMARY KEY,
             id_usuario VARCHAR(50),
@@ -125,45 +91,195 @@ def load_personal_data(excel_path: str) -> int:
             categoria VARCHAR(100),
             monto DECIMAL(15, 2),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_usuario (id_usuario),
             INDEX idx_fecha (fecha),
-            INDEX idx_tipo (tipo_operacion),
-            INDEX idx_categoria (categoria)
+            INDEX idx_usr_tipo_fecha_monto (id_usuario, tipo_operacion, fecha, monto),
+            INDEX idx_usr_cat_fecha (id_usuario, categoria, fecha)
         )
-        """
-        db.execute_query(create_table_query, fetch=False)
-        logger.info("Tabla transacciones_personales verificada/creada")
-        
-        # Insertar datos
-        insert_query = """
-        INSERT INTO transacciones_personales 
-        (id_usuario, fecha, tipo_operacion, descripcion, categoria, monto)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
-        inserted = 0
-        for _, row in df.iterrows():
-            try:
-                # Ajustar nombres de columnas según tu Excel
-                params = (
-                    row.get('id_usuario', 'USR001'),
-                    row.get('fecha'),
-                    row.get('tipo_operacion', 'gasto'),
-                    row.get('descripcion', ''),
-                    row.get('categoria', 'Otros'),
-                    float(row.get('monto', 0))
-                )
-                
-                db.execute_query(insert_query, params, fetch=False)
-                inserted += 1
-                
-            except Exception as e:
-                logger.warning(f"Error insertando fila: {e}")
-                continue
-        
-        logger.info(f"Total de registros personales insertados: {inserted}")
-        return inserted
-        
+    """,
+    entity_column='id_usuario',
+    columns=('id_usuario', 'fecha', 'tipo_operacion', 'descripcion', 'categoria', 'monto'),
+    defaults={'id_usuario': 'USR001', 'tipo_operacion': 'gasto', 'descripcion': '', 'categoria': 'Otros'},
+)
+
+
+def iter_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lee el archivo por bloques sin cargarlo completo en memoria.
+
+    CSV: pandas con chunksize. Excel: openpyxl en modo read-only.
+    """
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        buffer: List[tuple] = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def prepare_chunk(df: pd.DataFrame, spec: TableSpec) -> Tuple[List[tuple], int]:
+    """
+    Convierte tipos por columna y devuelve (filas listas para insertar, filas descartadas).
+
+    Se descartan filas sin fecha válida.
+    """
+    out = pd.DataFrame(index=df.index)
+    for column in spec.columns:
+        if column == 'fecha':
+            out[column] = pd.to_datetime(df[column], errors='coerce') if column in df else pd.NaT
+        elif column == 'monto':
+            out[column] = pd.to_numeric(df[column], errors='coerce').fillna(0.0) if column in df else 0.0
+        else:
+            values = df[column] if column in df else pd.Series(None, index=df.index, dtype=object)
+            out[column] = values.where(values.notna(), spec.defaults.get(column, '')).astype(str)
+
+    valid = out['fecha'].notna()
+    out = out[valid]
+    out['fecha'] = out['fecha'].dt.date
+    out['monto'] = out['monto'].astype(float)
+    rows = list(out[list(spec.columns)].itertuples(index=False, name=None))
+    return rows, int((~valid).sum())
+
+
+def insert_batch(db, spec: TableSpec, batch: List[tuple]) -> List[tuple]:
+    """
+    Inserta un lote en una transacción y devuelve las filas insertadas.
+
+    Si el motor rechaza el lote (una fila con un valor fuera de rango basta
+    para que falle todo el executemany), se reintenta fila a fila y solo se
+    descartan, con log, las filas rechazadas.
+    """
+    try:
+        with db.session() as session:
+            session.execute_batch(spec.insert_sql, batch)
+        return batch
+    except Exception as e:
+        logger.warning(f"Lote de {len(batch)} filas rechazado ({e}); reintentando fila a fila")
+
+    inserted = []
+    for row in batch:
+        try:
+            with db.session() as session:
+                session.execute_query(spec.insert_sql, row, fetch=False)
+            inserted.append(row)
+        except Exception as e:
+            logger.warning(f"Fila descartada en {spec.table}: {row} ({e})")
+    return inserted
+
+
+def refresh_rollup(db) -> None:
+    """Pliega las filas recién cargadas en el rollup mensual (si está activo)."""
+    try:
+        result = MonthlyRollup(db).refresh()
+        logger.info(f"Rollup mensual: id {result['from_id']} -> {result['to_id']}")
+    except Exception as e:
+        logger.error(f"No se pudo actualizar el rollup mensual: {e}; ejecute scripts/refresh_rollup.py")
+
+
+def bulk_load(
+    path: str,
+    spec: TableSpec,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Carga un archivo en `spec.table` por lotes.
+
+    Args:
+        path: Ruta al archivo Excel o CSV
+        spec: Tabla destino y columnas
+        batch_size: Filas por executemany (una transacción por lote)
+        chunk_size: Filas leídas del archivo por bloque
+
+    Returns:
+        Número de registros insertados
+    """
+    logger.info(f"Leyendo archivo: {path}")
+    db = get_db_connection()
+    db.execute_query(spec.create_sql, fetch=False)
+    logger.info(f"Tabla {spec.table} verificada/creada")
+
+    started = time.perf_counter()
+    inserted = 0
+    rejected = 0
+    failed = 0
+    touched = set()
+
+    try:
+        for chunk in iter_chunks(path, chunk_size):
+            rows, skipped = prepare_chunk(chunk, spec)
+            rejected += skipped
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                done = insert_batch(db, spec, batch)
+                touched.update(row[0] for row in done)
+                inserted += len(done)
+                failed += len(batch) - len(done)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"  {inserted} filas insertadas ({inserted / elapsed:,.0f} filas/s)")
+    finally:
+        # El rollup se actualiza antes de invalidar, para que nadie vuelva a
+        # cachear agregados viejos; ambos corren aunque la carga se corte
+        if touched and spec.rollup and rollup_enabled():
+            refresh_rollup(db)
+        # Invalidar resultados cacheados de las entidades modificadas
+        mark_entities_changed(touched, db)
+
+    elapsed = time.perf_counter() - started
+    if rejected:
+        logger.warning(f"{rejected} filas descartadas por fecha inválida")
+    if failed:
+        logger.warning(f"{failed} filas rechazadas por la base de datos")
+    logger.info(
+        f"Total de registros insertados en {spec.table}: {inserted} "
+        f"en {elapsed:.1f}s ({inserted / elapsed if elapsed else 0:,.0f} filas/s)"
+    )
+    return inserted
+
+
+def load_company_data(excel_path: str, batch_size: int = DEFAULT_BATCH_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Carga datos empresariales desde Excel/CSV a la base de datos.
+
+    Args:
+        excel_path: Ruta al archivo de finanzas empresariales
+
+    Returns:
+        Número de registros insertados
+    """
+    try:
+        return bulk_load(excel_path, COMPANY_SPEC, batch_size, chunk_size)
+    except Exception as e:
+        logger.error(f"Error cargando datos empresariales: {e}")
+        raise
+
+
+def load_personal_data(excel_path: str, batch_size: int = DEFAULT_BATCH_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Carga datos personales desde Excel/CSV a la base de datos.
+
+    Args:
+        excel_path: Ruta al archivo de finanzas personales
+
+    Returns:
+        Número de registros insertados
+    """
+    try:
+        return bulk_load(excel_path, PERSONAL_SPEC, batch_size, chunk_size)
     except Exception as e:
         logger.error(f"Error cargando datos personales: {e}")
         raise
@@ -171,31 +287,39 @@ def load_personal_data(excel_path: str) -> int:
 
 def main():
     """Script principal."""
-    logger.info("=== Cargador de Datos Financieros ===")
-    
-    # Rutas a los archivos Excel
     recursos_dir = Path(__file__).parent.parent.parent / 'recursos'
-    empresa_file = recursos_dir / 'finanzas_empresa.xlsx'
-    personal_file = recursos_dir / 'finanzas_personales.xlsx'
-    
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--company-file', default=str(recursos_dir / 'finanzas_empresa.xlsx'))
+    parser.add_argument('--personal-file', default=str(recursos_dir / 'finanzas_personales.xlsx'))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Filas por INSERT/transacción')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Filas leídas por bloque')
+    args = parser.parse_args()
+
+    logger.info("=== Cargador de Datos Financieros ===")
+
+    # Rutas a los archivos
+    empresa_file = Path(args.company_file)
+    personal_file = Path(args.personal_file)
+
     try:
         # Verificar archivos
         if empresa_file.exists():
             logger.info(f"Procesando datos empresariales...")
-            company_count = load_company_data(str(empresa_file))
+            company_count = load_company_data(str(empresa_file), args.batch_size, args.chunk_size)
             logger.info(f"✓ {company_count} registros empresariales cargados")
         else:
             logger.warning(f"Archivo no encontrado: {empresa_file}")
-        
+
         if personal_file.exists():
             logger.info(f"Procesando datos personales...")
-            personal_count = load_personal_data(str(personal_file))
+            personal_count = load_personal_data(str(personal_file), args.batch_size, args.chunk_size)
             logger.info(f"✓ {personal_count} registros personales cargados")
         else:
             logger.warning(f"Archivo no encontrado: {personal_file}")
-        
+
         logger.info("=== Carga completada ===")
-        
+
     except Exception as e:
         logger.error(f"Error en la carga de datos: {e}")
         sys.exit(1)
@@ -203,4 +327,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
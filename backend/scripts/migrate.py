@@ -0,0 +1,60 @@
+"""
+Aplica las migraciones de esquema de las tablas finanzas_* (índices compuestos,
+columna generada anio_mes).
+
+Cada operación comprueba information_schema antes de ejecutarse, así que el
+script puede relanzarse sin riesgo. En tablas grandes, CREATE INDEX y ADD
+COLUMN ... STORED reconstruyen la tabla: ejecútelo fuera de horas pico.
+
+Uso:
+    python scripts/migrate.py [--status] [--dry-run] [--target ID]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database.migrations import MigrationRunner
+from utils import setup_logger
+
+logger = setup_logger('migrate', logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='Mostrar migraciones aplicadas y pendientes')
+    parser.add_argument('--dry-run', action='store_true', help='Mostrar el SQL que se ejecutaría')
+    parser.add_argument('--target', default=None, help='Aplicar hasta esta migración (incluida)')
+    args = parser.parse_args()
+
+    runner = MigrationRunner()
+    try:
+        if args.status:
+            for m in runner.status():
+                logger.info(f"{'✓' if m['applied'] else '·'} {m['id']}: {m['description']}")
+            return
+
+        if args.dry_run:
+            steps = runner.plan()
+            if not steps:
+                logger.info("No hay cambios pendientes")
+            for migration_id, sql in steps:
+                print(f"-- {migration_id}\n{sql};")
+            return
+
+        applied = runner.migrate(args.target)
+        if applied:
+            logger.info(f"✓ Migraciones aplicadas: {', '.join(applied)}")
+        else:
+            logger.info("✓ El esquema ya está al día")
+    except Exception as e:
+        logger.error(f"Error aplicando migraciones: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
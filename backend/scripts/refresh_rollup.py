@@ -0,0 +1,46 @@
+"""
+Actualiza el rollup mensual (finanzas_rollup_mensual) a partir de finanzas_empresa.
+
+Solo agrega las filas con id mayor al último watermark, así que puede
+ejecutarse con frecuencia (cron) sin recorrer toda la tabla. Use --rebuild
+después de editar o borrar transacciones históricas.
+
+Uso:
+    python scripts/refresh_rollup.py [--rebuild] [--batch-size 50000]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database import MonthlyRollup
+from utils import setup_logger
+
+logger = setup_logger('refresh_rollup', logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='Recalcular el rollup desde cero')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Filas (por rango de id) por lote')
+    args = parser.parse_args()
+
+    rollup = MonthlyRollup()
+    try:
+        if args.rebuild:
+            result = rollup.rebuild(args.batch_size)
+        else:
+            result = rollup.refresh(args.batch_size)
+        logger.info(f"✓ Rollup actualizado: id {result['from_id']} -> {result['to_id']} ({result['batches']} lotes)")
+        logger.info(f"Estado: {rollup.status()}")
+    except Exception as e:
+        logger.error(f"Error actualizando el rollup: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
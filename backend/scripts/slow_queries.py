@@ -0,0 +1,66 @@
+"""
+Muestra las consultas lentas registradas, agrupadas por huella y ordenadas por tiempo total.
+
+Lee el archivo JSONL que escribe DatabaseConnection cuando una sentencia
+supera DB_SLOW_QUERY_MS (por defecto backend/logs/slow_queries.jsonl).
+
+Uso:
+    python scripts/slow_queries.py [--top 20] [--since 2024-01-01] [--explain] [--json]
+                                   [--log RUTA]
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database.slowlog import aggregate, get_slow_query_log, read_log
+from utils import setup_logger
+
+logger = setup_logger('slow_queries', logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', default=None, help='Archivo JSONL (por defecto DB_SLOW_QUERY_LOG)')
+    parser.add_argument('--top', type=int, default=20, help='Número de huellas a mostrar')
+    parser.add_argument('--since', default=None, help='Solo entradas desde esta fecha (ISO)')
+    parser.add_argument('--explain', action='store_true', help='Incluir el plan EXPLAIN capturado')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    path = args.log or get_slow_query_log().log_path
+    if not path or not Path(path).exists():
+        logger.warning(f"No hay registro de consultas lentas en {path}")
+        sys.exit(0)
+
+    ranked = aggregate(read_log(str(path)), top_n=args.top, since=args.since)
+    if args.json:
+        print(json.dumps(ranked, indent=2, ensure_ascii=False, default=str))
+        return
+
+    logger.info(f"=== Top {len(ranked)} consultas lentas por tiempo total ({path}) ===")
+    for i, s in enumerate(ranked, 1):
+        print(
+            f"{i:>2}. [{s['id']}] total={s['total_ms']:.0f} ms  n={s['count']}  "
+            f"avg={s['avg_ms']:.0f} ms  max={s['max_ms']:.0f} ms  filas={s['rows']}"
+        )
+        print(f"    {s['fingerprint'][:300]}")
+        if s['params_shape']:
+            print(f"    parámetros: {', '.join(s['params_shape'])}")
+        if s['non_sargable']:
+            print(f"    ⚠ funciones sobre fecha (no usan índice): {', '.join(s['non_sargable'])}")
+        if args.explain and s.get('explain'):
+            for row in s['explain']:
+                print(
+                    f"    EXPLAIN table={row.get('table')} type={row.get('type')} "
+                    f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Sincroniza la réplica analítica local (DuckDB) desde finanzas_empresa y finanzas_personales.
+
+Copia las filas con id mayor al watermark de cada tabla. El servidor ya
+mantiene la réplica sincronizada en segundo plano cuando ANALYTICS_REPLICA=true;
+este script sirve para la carga inicial o un --rebuild con el servidor
+detenido (un archivo DuckDB admite un solo proceso escritor).
+
+Uso:
+    python scripts/sync_replica.py [--rebuild] [--batch-size 50000] [--status]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database import AnalyticalReplica
+from utils import setup_logger
+
+logger = setup_logger('sync_replica', logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='Copiar todo de nuevo (tras editar/borrar transacciones)')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Filas por lote (por id)')
+    parser.add_argument('--status', action='store_true', help='Solo mostrar watermark y filas por tabla')
+    parser.add_argument('--path', help='Archivo DuckDB (default: ANALYTICS_REPLICA_PATH)')
+    args = parser.parse_args()
+
+    replica = AnalyticalReplica.from_env()
+    if args.path:
+        replica.path = args.path
+    # Este proceso es el escritor: sin hilo de sincronización en segundo plano
+    replica.sync_interval = 0
+    try:
+        if not args.status:
+            result = replica.rebuild(args.batch_size) if args.rebuild else replica.sync(args.batch_size)
+            for table, info in result.items():
+                logger.info(f"✓ {table}: id {info['from_id']} -> {info['to_id']} ({info['rows']} filas)")
+        logger.info(f"Estado: {replica.status()}")
+    except Exception as e:
+        logger.error(f"Error sincronizando la réplica: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,32 @@
 """Database module for MySQL connection and operations."""
 from .connection import DatabaseConnection, get_db_connection
 from .queries import FinancialDataQueries
+from .rollup import MonthlyRollup, rollup_enabled
+from .replica import AnalyticalReplica, get_analytical_replica
+from .cache import cached, get_result_cache, mark_entities_changed
+from .columnar import EntityColumns, get_columnar_store
+from .slowlog import get_slow_query_log
+from .sql import Dialect, get_dialect
+from .async_connection import AsyncDatabaseConnection, get_async_db_connection
+from .async_queries import AsyncFinancialDataQueries
 
 __all__ = [
     'DatabaseConnection',
     'get_db_connection',
-    'FinancialDataQueries'
+    'FinancialDataQueries',
+    'MonthlyRollup',
+    'rollup_enabled',
+    'AnalyticalReplica',
+    'get_analytical_replica',
+    'cached',
+    'get_result_cache',
+    'mark_entities_changed',
+    'EntityColumns',
+    'get_columnar_store',
+    'get_slow_query_log',
+    'Dialect',
+    'get_dialect',
+    'AsyncDatabaseConnection',
+    'get_async_db_connection',
+    'AsyncFinancialDataQueries'
 ]
-
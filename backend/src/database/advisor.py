@@ -0,0 +1,216 @@
+"""Index advisor: checks SQL fingerprints against the indexes of their tables."""
+import inspect
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from utils.metrics import fingerprint, fingerprint_id
+
+logger = logging.getLogger(__name__)
+
+# Columnas de entidad: van primero en un índice sugerido
+ENTITY_COLUMNS = ('empresa_id', 'usuario_id', 'id_usuario', 'id_empresa')
+# Orden preferido para el resto de columnas de igualdad
+_EQUALITY_ORDER = ('tipo', 'categoria', 'anio_mes')
+_KNOWN_COLUMNS = (
+    'id', 'empresa_id', 'usuario_id', 'id_usuario', 'id_empresa', 'tipo', 'categoria',
+    'fecha', 'monto', 'anio_mes', 'contraparte', 'descripcion', 'concepto',
+)
+
+_FROM = re.compile(r'\bFROM\s+([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE)
+_CLAUSE_END = re.compile(r'\b(GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION)\b', re.IGNORECASE)
+_WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+_EQUALITY = re.compile(r'\b([a-z_]+)\s*(?:=|\bIN\b)\s*[?(]', re.IGNORECASE)
+_RANGE = re.compile(r'\b([a-z_]+)\s*(?:>=|<=|<|>|\bBETWEEN\b)', re.IGNORECASE)
+_FUNCTION_ON = re.compile(r'\b([A-Z_]+)\s*\(\s*(?:[^()]*?,\s*)?([a-z_]+)\b[^()]*\)', re.IGNORECASE)
+_IDENTIFIER = re.compile(r'\b([a-z_]+)\b')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'IN', 'EXISTS', 'WHERE', 'ON'}
+
+
+@dataclass
+class QueryShape:
+    """What a statement needs from an index."""
+
+    table: str
+    equality: Set[str] = field(default_factory=set)
+    ranges: Set[str] = field(default_factory=set)
+    functions: Set[str] = field(default_factory=set)
+    referenced: Set[str] = field(default_factory=set)
+
+
+def parse_shape(sql: str) -> Optional[QueryShape]:
+    """
+    Rough shape of a single-table SELECT: equality/range columns of the
+    WHERE clause, functions applied to columns there, and every known column
+    referenced anywhere. Returns None when no table is found.
+    """
+    match = _FROM.search(sql)
+    if not match:
+        return None
+    shape = QueryShape(table=match.group(1))
+
+    where = _WHERE.search(sql)
+    if where:
+        end = _CLAUSE_END.search(sql, where.end())
+        clause = sql[where.end():end.start() if end else len(sql)]
+
+        def strip_function(match):
+            name, column = match.group(1).upper(), match.group(2).lower()
+            if name in _KEYWORDS:
+                return match.group(0)
+            if column in _KNOWN_COLUMNS:
+                shape.functions.add(f"{name}({column})")
+            return ' '
+
+        plain = _FUNCTION_ON.sub(strip_function, clause)
+        shape.equality = {c.lower() for c in _EQUALITY.findall(plain) if c.lower() in _KNOWN_COLUMNS}
+        shape.ranges = {c.lower() for c in _RANGE.findall(plain) if c.lower() in _KNOWN_COLUMNS} - shape.equality
+
+    shape.referenced = {c.lower() for c in _IDENTIFIER.findall(sql) if c.lower() in _KNOWN_COLUMNS}
+    return shape
+
+
+def usable_prefix(index: Sequence[str], shape: QueryShape) -> int:
+    """Index columns usable for the WHERE clause: equality prefix plus one range column."""
+    used = 0
+    for column in index:
+        if column in shape.equality:
+            used += 1
+            continue
+        if column in shape.ranges:
+            used += 1
+        break
+    return used
+
+
+def suggest_index(shape: QueryShape) -> Tuple[str, ...]:
+    """Equality columns (entity first), then one range column, then the rest to cover the query."""
+    equality = sorted(
+        shape.equality,
+        key=lambda c: (
+            0 if c in ENTITY_COLUMNS else 1,
+            _EQUALITY_ORDER.index(c) if c in _EQUALITY_ORDER else len(_EQUALITY_ORDER),
+            c,
+        ),
+    )
+    columns = list(equality)
+    if shape.ranges:
+        columns.append('fecha' if 'fecha' in shape.ranges else sorted(shape.ranges)[0])
+    for extra in sorted(shape.referenced - set(columns) - {'id'}):
+        columns.append(extra)
+    return tuple(columns)
+
+
+def advise(
+    statements: Iterable[str],
+    indexes: Dict[str, Dict[str, Tuple[str, ...]]],
+) -> List[Dict[str, Any]]:
+    """
+    Classify each distinct fingerprint against ``{table: {index: columns}}``.
+
+    Status is ``covered`` (an index serves the filter and contains every
+    referenced column), ``partial`` (an index serves the filter but the rows
+    must still be read) or ``not_covered`` (full scan of the table). Date
+    functions in the WHERE clause are reported separately because no plain
+    index can serve them.
+    """
+    seen: Set[str] = set()
+    report = []
+    for sql in statements:
+        fp = fingerprint(sql)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        shape = parse_shape(fp)
+        if shape is None:
+            continue
+
+        candidates = [
+            (usable_prefix(cols, shape), shape.referenced <= set(cols) | {'id'}, name)
+            for name, cols in indexes.get(shape.table, {}).items()
+        ]
+        best_used, best_covering, best_name = max(candidates, default=(0, False, None))
+
+        if best_used == 0:
+            status = 'not_covered' if (shape.equality or shape.ranges or shape.functions) else 'full_scan'
+        elif best_covering:
+            status = 'covered'
+        else:
+            status = 'partial'
+
+        entry = {
+            'id': fingerprint_id(fp),
+            'table': shape.table,
+            'status': status,
+            'index': best_name if best_used else None,
+            'equality': sorted(shape.equality),
+            'ranges': sorted(shape.ranges),
+            'fingerprint': fp,
+        }
+        if shape.functions:
+            entry['non_sargable'] = sorted(shape.functions)
+        if status != 'covered' and (shape.equality or shape.ranges):
+            entry['suggested_index'] = suggest_index(shape)
+        report.append(entry)
+
+    order = {'not_covered': 0, 'partial': 1, 'full_scan': 2, 'covered': 3}
+    return sorted(report, key=lambda e: (order[e['status']], e['table'], e['id']))
+
+
+# ---- Huellas emitidas por el código ----
+
+_SAMPLE_ARGS = {
+    'company_id': 'EMP001',
+    'entity_id': 'EMP001',
+    'user_id': 'USR001',
+    'category': 'Otros',
+    'tipo': 'gasto',
+    'transaction_type': 'gasto',
+}
+
+
+def _sample_value(name: str, default: Any) -> Any:
+    if name in _SAMPLE_ARGS:
+        return _SAMPLE_ARGS[name]
+    if 'date' in name or 'fecha' in name:
+        return (datetime.now() - timedelta(days=90 if 'start' in name else 0)).strftime('%Y-%m-%d')
+    if default is not inspect.Parameter.empty:
+        return default
+    return None
+
+
+def statements_from_code(queries: Any = None) -> List[Tuple[str, str]]:
+    """
+    Drive every query plan of FinancialDataQueries without a database.
+
+    Each plan gets sample arguments and empty result sets, so only the
+    statements reached on that path are collected. Returns (plan, sql) pairs.
+    """
+    from .queries import FinancialDataQueries
+
+    # db=object(): los planes nunca tocan la conexión, solo generan SQL
+    queries = queries or FinancialDataQueries(db=object())
+    collected: List[Tuple[str, str]] = []
+    for name, method in inspect.getmembers(type(queries), predicate=callable):
+        plan = getattr(method, 'plan', None)
+        if plan is None:
+            continue
+        signature = inspect.signature(plan)
+        kwargs = {
+            p.name: _sample_value(p.name, p.default)
+            for p in list(signature.parameters.values())[1:]
+            if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+        }
+        generator = plan(queries, **kwargs)
+        try:
+            sql, _ = next(generator)
+            while True:
+                collected.append((name, sql))
+                sql, _ = generator.send([])
+        except StopIteration:
+            pass
+        except Exception as e:
+            logger.debug(f"Plan {name} stopped early with sample data: {e}")
+    return collected
@@ -0,0 +1,168 @@
+"""Asyncio-native database access for the FastMCP server."""
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiomysql
+
+from .connection import get_db_config
+from .pool import PoolSettings
+from .slowlog import get_slow_query_log
+from .sql import MYSQL
+from utils.metrics import record_query
+
+logger = logging.getLogger(__name__)
+
+# PyMySQL/aiomysql interpolan con el operador %, así que cualquier '%' literal
+# (p. ej. DATE_FORMAT(fecha, '%Y-%m')) debe escaparse cuando hay parámetros.
+_LITERAL_PERCENT = re.compile(r'%(?!s)')
+
+
+def _prepare(query: str, params: tuple = None) -> str:
+    return _LITERAL_PERCENT.sub('%%', query) if params else query
+
+
+def _record(query: str, params, started: float, rows: int) -> None:
+    # Sin EXPLAIN aquí: requeriría otra ida y vuelta asíncrona en el camino caliente
+    elapsed = time.perf_counter() - started
+    record_query(query, elapsed, rows)
+    get_slow_query_log().observe(query, params, elapsed, rows)
+
+
+class AsyncDatabaseSession:
+    """Unit of work over a single connection checked out from the aiomysql pool."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def fetch_all(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        async with self.connection.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(_prepare(query, params), params or None)
+            rows = list(await cursor.fetchall())
+        _record(query, params, started, len(rows))
+        return rows
+
+    async def execute(self, query: str, params: tuple = None) -> int:
+        started = time.perf_counter()
+        async with self.connection.cursor() as cursor:
+            await cursor.execute(_prepare(query, params), params or None)
+            rowcount = cursor.rowcount
+        _record(query, params, started, max(rowcount, 0))
+        return rowcount
+
+    async def execute_many_queries(
+        self, statements: Sequence[Tuple[str, Optional[tuple]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several SELECTs back to back and return their rows in order."""
+        return [await self.fetch_all(query, params) for query, params in statements]
+
+
+class AsyncDatabaseConnection:
+    """Manages an aiomysql connection pool bound to the running event loop."""
+
+    dialect = MYSQL
+    _instance: Optional['AsyncDatabaseConnection'] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._pool = None
+            cls._instance._lock = None
+        return cls._instance
+
+    async def _get_pool(self) -> aiomysql.Pool:
+        """Create the pool lazily, inside the loop that will use it."""
+        if self._pool is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._pool is None:
+                    config = get_db_config()
+                    settings = PoolSettings.from_env()
+                    self._pool = await aiomysql.create_pool(
+                        host=config['host'],
+                        port=config['port'],
+                        user=config['user'],
+                        password=config['password'] or '',
+                        db=config['database'],
+                        minsize=settings.min_size,
+                        maxsize=settings.max_size,
+                        charset='utf8mb4',
+                        autocommit=True,
+                    )
+                    logger.info("Async database connection pool initialized successfully")
+        return self._pool
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncDatabaseSession]:
+        """Check out one connection for a group of statements."""
+        pool = await self._get_pool()
+        try:
+            async with pool.acquire() as connection:
+                yield AsyncDatabaseSession(connection)
+        except Exception as e:
+            logger.error(f"Error executing async query: {e}")
+            raise
+
+    async def fetch_all(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        """
+        Execute a SELECT and return every row as a dict.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+
+        Returns:
+            List of rows
+        """
+        async with self.session() as session:
+            return await session.fetch_all(query, params)
+
+    async def fetch_one(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
+        """Execute a SELECT and return the first row (or None)."""
+        rows = await self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query: str, params: tuple = None) -> int:
+        """Execute an INSERT/UPDATE/DELETE and return the affected rows count."""
+        async with self.session() as session:
+            return await session.execute(query, params)
+
+    async def execute_many_queries(
+        self, statements: Sequence[Tuple[str, Optional[tuple]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Execute several SELECTs with a single connection checkout."""
+        async with self.session() as session:
+            return await session.execute_many_queries(statements)
+
+    async def execute_query(self, query: str, params: tuple = None, fetch: bool = True):
+        """Same contract as DatabaseConnection.execute_query, awaitable."""
+        if fetch:
+            return await self.fetch_all(query, params)
+        return await self.execute(query, params)
+
+    async def test_connection(self) -> bool:
+        """Test database connection."""
+        try:
+            await self.fetch_one("SELECT 1 AS ok")
+            logger.info("Async database connection test successful")
+            return True
+        except Exception as e:
+            logger.error(f"Async database connection test failed: {e}")
+            return False
+
+    async def close(self) -> None:
+        """Close every pooled connection (call on server shutdown)."""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+def get_async_db_connection() -> AsyncDatabaseConnection:
+    """Get the async database connection singleton."""
+    return AsyncDatabaseConnection()
@@ -0,0 +1,76 @@
+"""Async variants of the financial data queries."""
+import inspect
+from typing import Any
+
+from .async_connection import get_async_db_connection
+from .cache import cached
+from .queries import FinancialDataQueries, QueryPlan, QueryPlanHost
+from .sql import MYSQL
+
+
+def _async_plan(name: str):
+    """Build an awaitable method from the query plan behind FinancialDataQueries.<name>."""
+    plan = getattr(FinancialDataQueries, name).plan
+
+    async def method(self, *args, **kwargs):
+        return await self._run_plan(plan(self, *args, **kwargs))
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncFinancialDataQueries.{name}"
+    method.__doc__ = plan.__doc__
+    # Misma firma que el plan: @cached arma la misma clave que en el lado síncrono
+    method.__signature__ = inspect.signature(plan)
+    return method
+
+
+class AsyncFinancialDataQueries(QueryPlanHost):
+    """
+    Awaitable counterpart of FinancialDataQueries.
+
+    Runs exactly the same SQL and row shaping (the shared query plans), but
+    every statement goes through the aiomysql pool so tools can await I/O
+    instead of blocking the event loop. Methods cached on the sync side
+    share the same result cache entries here.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or get_async_db_connection()
+        self.dialect = getattr(self.db, 'dialect', MYSQL)
+
+    async def _run_plan(self, plan: QueryPlan) -> Any:
+        """Drive a query plan, running all of its statements on one pooled connection."""
+        try:
+            statement = next(plan)
+        except StopIteration as done:
+            return done.value
+        async with self.db.session() as session:
+            try:
+                while True:
+                    try:
+                        rows = await session.fetch_all(*statement)
+                    except Exception as e:
+                        statement = plan.throw(e)
+                    else:
+                        statement = plan.send(rows)
+            except StopIteration as done:
+                return done.value
+
+    list_transactions = _async_plan('list_transactions')
+    get_top_categories = _async_plan('get_top_categories')
+    get_monthly_summary = _async_plan('get_monthly_summary')
+    get_recent_burn_rate = _async_plan('get_recent_burn_rate')
+    get_monthly_totals_by_category = _async_plan('get_monthly_totals_by_category')
+    detect_recurring_payments = _async_plan('detect_recurring_payments')
+    get_company_balance = cached('get_company_balance')(_async_plan('get_company_balance'))
+    get_expenses_by_category = _async_plan('get_expenses_by_category')
+    get_cash_flow_projection = _async_plan('get_cash_flow_projection')
+    get_personal_balance = cached('get_personal_balance')(_async_plan('get_personal_balance'))
+    compare_budget_vs_actual = _async_plan('compare_budget_vs_actual')
+    get_monthly_trends = _async_plan('get_monthly_trends')
+    get_monthly_series = _async_plan('get_monthly_series')
+    get_monthly_flows = _async_plan('get_monthly_flows')
+    get_monthly_totals_all_categories = _async_plan('get_monthly_totals_all_categories')
+    get_financial_facts = _async_plan('get_financial_facts')
+    detect_spending_anomalies = _async_plan('detect_spending_anomalies')
+    get_multi_window_summary = _async_plan('get_multi_window_summary')
+    get_period_summary = _async_plan('get_period_summary')
@@ -0,0 +1,375 @@
+"""In-process result cache for queries and tools, invalidated per entity."""
+import asyncio
+import copy
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tabla compartida entre procesos: scripts/load_data.py (u otro escritor)
+# marca aquí las entidades que tocó y cada servidor la consulta cada pocos
+# segundos para invalidar su caché local.
+VERSION_TABLE = 'finanzas_cache_version'
+
+CREATE_VERSION_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+        entity_id VARCHAR(50) PRIMARY KEY,
+        updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+            ON UPDATE CURRENT_TIMESTAMP(6)
+    )
+"""
+
+# Argumentos que identifican a la entidad dueña del resultado
+ENTITY_ARGS = ('company_id', 'entity_id', 'user_id')
+# Resultados sin entidad (agregados de todas las empresas)
+ALL_ENTITIES = '*'
+# Argumentos con datos precalculados por el llamador: esas llamadas no se cachean
+BYPASS_ARGS = ('facts',)
+
+# Tope del reintento exponencial cuando el sondeo de versiones falla
+MAX_SYNC_BACKOFF = 300.0
+
+_MISSING = object()
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class ResultCache:
+    """
+    LRU cache with per-entry TTL and an entity -> keys index.
+
+    Keys are ``(name, normalized_args)``. Invalidating an entity drops its
+    entries and the all-entities ones (``company_id=None`` aggregates
+    include every entity's rows).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, sync_interval: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.enabled = True
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, str, Any]]' = OrderedDict()
+        self._by_entity: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+        self._per_name: Dict[str, Dict[str, int]] = {}
+        # Un solo hilo sondea a la vez; los demás siguen con lo que hay en caché
+        self._sync_lock = threading.Lock()
+        self._next_sync = 0.0
+        self._sync_failures = 0
+        self._version_table_ready = False
+        self._synced = False
+        self._last_version: Optional[Any] = None
+        self._listeners: List[Callable[[str], None]] = []
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        cache = cls(
+            maxsize=int(os.getenv('RESULT_CACHE_SIZE', 1024)),
+            ttl=_env_float('RESULT_CACHE_TTL', 60.0),
+            sync_interval=_env_float('RESULT_CACHE_SYNC_INTERVAL', 5.0),
+        )
+        cache.enabled = os.getenv('RESULT_CACHE_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+        return cache
+
+    def _count(self, name: str, field: str) -> None:
+        self._stats[field] += 1
+        per_name = self._per_name.setdefault(name, {'hits': 0, 'misses': 0})
+        per_name[field] += 1
+
+    def _drop_locked(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_entity.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_entity[entry[1]]
+
+    def get(self, key: Tuple[str, str], sync: bool = True) -> Any:
+        if sync:
+            self._maybe_sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(key[0], 'misses')
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                self._drop_locked(key)
+                self._stats['expirations'] += 1
+                self._count(key[0], 'misses')
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._count(key[0], 'hits')
+            return copy.deepcopy(entry[2])
+
+    def set(self, key: Tuple[str, str], entity: str, value: Any, ttl: float = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._drop_locked(key)
+            self._entries[key] = (expires, entity, copy.deepcopy(value))
+            self._by_entity.setdefault(entity, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._drop_locked(oldest)
+                self._stats['evictions'] += 1
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(entity_id)`` whenever an entity is invalidated (locally or by sync)."""
+        self._listeners.append(listener)
+
+    def invalidate_entity(self, entity_id: Any) -> int:
+        """Drop every entry for ``entity_id`` plus the all-entities aggregates."""
+        with self._lock:
+            keys = set(self._by_entity.get(str(entity_id), ()))
+            keys |= self._by_entity.get(ALL_ENTITIES, set())
+            for key in keys:
+                self._drop_locked(key)
+            self._stats['invalidations'] += len(keys)
+        for listener in self._listeners:
+            listener(str(entity_id))
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._by_entity.clear()
+
+    def _maybe_sync(self) -> None:
+        """
+        Poll the shared version table so writes from other processes invalidate us.
+
+        The table is created on first use (a server may start before the
+        first load). A failed poll is retried with exponential backoff up to
+        MAX_SYNC_BACKOFF; meanwhile entries are bounded only by their TTL.
+        Only one thread polls at a time; concurrent callers do not wait for it.
+        """
+        if self.sync_interval <= 0 or time.monotonic() < self._next_sync:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._sync_locked()
+        finally:
+            self._sync_lock.release()
+
+    def _sync_locked(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        try:
+            from .connection import get_db_connection
+
+            db = get_db_connection()
+            if not self._version_table_ready:
+                db.execute_query(CREATE_VERSION_TABLE, fetch=False)
+                self._version_table_ready = True
+            if not self._synced:
+                # Primer sondeo: solo fijar la versión actual, sin invalidar
+                rows = db.execute_query(
+                    f"SELECT NULL AS entity_id, MAX(updated_at) AS updated_at FROM {VERSION_TABLE}"
+                )
+            elif self._last_version is None:
+                # La tabla estaba vacía: toda fila nueva es una escritura
+                rows = db.execute_query(f"SELECT entity_id, updated_at FROM {VERSION_TABLE}")
+            else:
+                rows = db.execute_query(
+                    f"SELECT entity_id, updated_at FROM {VERSION_TABLE} WHERE updated_at > %s",
+                    (self._last_version,)
+                )
+        except Exception as e:
+            self._sync_failures += 1
+            delay = min(self.sync_interval * 2 ** self._sync_failures, MAX_SYNC_BACKOFF)
+            self._next_sync = now + delay
+            log = logger.warning if self._sync_failures == 1 else logger.debug
+            log(f"Result cache version sync failed ({self._sync_failures}x), retrying in {delay:.0f}s: {e}")
+            return
+        if self._sync_failures:
+            logger.info(f"Result cache version sync recovered after {self._sync_failures} failures")
+            self._sync_failures = 0
+
+        self._synced = True
+        for row in rows:
+            if row['entity_id'] is not None:
+                self.invalidate_entity(row['entity_id'])
+            if row['updated_at'] is not None and (
+                self._last_version is None or row['updated_at'] > self._last_version
+            ):
+                self._last_version = row['updated_at']
+
+    def stats(self) -> Dict[str, Any]:
+        """Global and per-name hit/miss counters."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'sync_failures': self._sync_failures,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                **self._stats,
+                'by_name': {name: dict(counts) for name, counts in self._per_name.items()},
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache singleton."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache.from_env()
+    return _cache
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _backend(args: tuple) -> Tuple[Optional[str], bool]:
+    """
+    (scope, syncs) of the database a query method runs on.
+
+    Methods of an object with ``db`` (FinancialDataQueries) are scoped to
+    that backend, so a DuckDB replica or test database never shares entries
+    with MySQL. The sync and async MySQL connections reach the same
+    database, so they share one scope. Only MySQL results follow the
+    version table.
+    """
+    db = getattr(args[0], 'db', None) if args else None
+    if db is None:
+        return None, True
+    dialect = getattr(getattr(db, 'dialect', None), 'name', 'mysql')
+    if dialect == 'mysql':
+        return dialect, True
+    return f"{dialect}:{type(db).__name__}:{id(db):x}", False
+
+
+def _cache_key(name: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> Tuple[Optional[Tuple[str, str]], str]:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    if any(bound.arguments.get(arg) is not None for arg in BYPASS_ARGS):
+        return None, ALL_ENTITIES
+    arguments = {k: _normalize(v) for k, v in bound.arguments.items() if k != 'self'}
+    scope, _ = _backend(args)
+    if scope is not None:
+        arguments['__db__'] = scope
+    entity = ALL_ENTITIES
+    for arg in ENTITY_ARGS:
+        if arguments.get(arg) not in (None, ''):
+            entity = str(arguments[arg])
+            break
+    return (name, json.dumps(arguments, sort_keys=True, default=str)), entity
+
+
+def _cacheable(result: Any) -> bool:
+    # Los dicts de error de las herramientas no se cachean
+    return not (isinstance(result, dict) and result.get('success') is False)
+
+
+def cached(name: str = None, ttl: float = None) -> Callable:
+    """
+    Cache a query method or tool function by name plus normalized arguments.
+
+    The owning entity is the first non-empty of company_id / entity_id /
+    user_id. Query methods are also keyed by their backend (see _backend). Works on sync and async callables; a ``.plan`` attribute (query
+    plans) is preserved by functools.wraps.
+    """
+    def decorator(func: Callable) -> Callable:
+        cache_name = name or func.__qualname__
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache = get_result_cache()
+                if not cache.enabled:
+                    return await func(*args, **kwargs)
+                key, entity = _cache_key(cache_name, signature, args, kwargs)
+                if key is None:
+                    return await func(*args, **kwargs)
+                # El sondeo de versiones es bloqueante: fuera del event loop
+                if _backend(args)[1]:
+                    await asyncio.to_thread(cache._maybe_sync)
+                value = cache.get(key, sync=False)
+                if value is _MISSING:
+                    value = await func(*args, **kwargs)
+                    if _cacheable(value):
+                        cache.set(key, entity, value, ttl)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_result_cache()
+            if not cache.enabled:
+                return func(*args, **kwargs)
+            key, entity = _cache_key(cache_name, signature, args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            value = cache.get(key, sync=_backend(args)[1])
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                if _cacheable(value):
+                    cache.set(key, entity, value, ttl)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def mark_entities_changed(entity_ids: Iterable[Any], db=None) -> None:
+    """
+    Record a write to these entities: invalidate locally and bump their
+    version so other processes drop their cached results too.
+    """
+    entity_ids = sorted({str(e) for e in entity_ids if e not in (None, '')})
+    if not entity_ids:
+        return
+    cache = get_result_cache()
+    for entity_id in entity_ids:
+        cache.invalidate_entity(entity_id)
+
+    from .connection import get_db_connection
+
+    db = db or get_db_connection()
+    try:
+        with db.session() as session:
+            session.execute_query(CREATE_VERSION_TABLE, fetch=False)
+            for entity_id in entity_ids:
+                session.execute_query(
+                    f"INSERT INTO {VERSION_TABLE} (entity_id) VALUES (%s) "
+                    f"ON DUPLICATE KEY UPDATE updated_at = CURRENT_TIMESTAMP(6)",
+                    (entity_id,),
+                    fetch=False
+                )
+    except Exception as e:
+        logger.warning(f"Could not publish cache invalidation for {entity_ids}: {e}")
@@ -0,0 +1,413 @@
+"""Per-entity columnar transaction cache (NumPy arrays) with vectorized group-bys."""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .connection import get_db_connection
+from .sql import month_floor
+
+logger = logging.getLogger(__name__)
+
+# Código de tipo: gasto=0, ingreso=1, cualquier otro=-1
+KIND_CODES = {'gasto': 0, 'ingreso': 1}
+
+
+@dataclass(frozen=True)
+class ColumnSource:
+    """Where an entity type's transactions live."""
+
+    table: str
+    id_column: str
+    counterparty: str
+
+
+SOURCES = {
+    'company': ColumnSource('finanzas_empresa', 'empresa_id', 'COALESCE(contraparte, descripcion)'),
+    'personal': ColumnSource('transacciones_personales', 'usuario_id', 'descripcion'),
+}
+
+
+def encode(values: Iterable[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """Dictionary-encode ``values``: int32 codes plus the distinct values in first-seen order."""
+    mapping: Dict[Any, int] = {}
+    codes = np.fromiter((mapping.setdefault(v, len(mapping)) for v in values), dtype=np.int32)
+    return codes, list(mapping)
+
+
+def month_index(value: date) -> int:
+    """Months since year 0 (``year * 12 + month - 1``); consecutive months differ by 1."""
+    return value.year * 12 + value.month - 1
+
+
+def month_label(index: int) -> str:
+    """Inverse of month_index as 'YYYY-MM-01' (the ``mes`` format of the query plans)."""
+    year, month = divmod(int(index), 12)
+    return f"{year:04d}-{month + 1:02d}-01"
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def group_totals(codes: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(sum of values, row count) per code, for codes in [0, size)."""
+    return (
+        np.bincount(codes, weights=values, minlength=size),
+        np.bincount(codes, minlength=size),
+    )
+
+
+def distinct_per_group(codes: np.ndarray, keys: np.ndarray, size: int) -> np.ndarray:
+    """Number of distinct ``keys`` per code (e.g. months in which each counterparty appears)."""
+    if len(codes) == 0:
+        return np.zeros(size, dtype=np.int64)
+    pairs = np.unique(np.stack([codes.astype(np.int64), keys.astype(np.int64)], axis=1), axis=0)
+    return np.bincount(pairs[:, 0], minlength=size)
+
+
+class EntityColumns:
+    """
+    One entity's transactions as parallel NumPy arrays.
+
+    ``day`` is the proleptic ordinal of ``fecha``, ``month`` its month_index,
+    ``kind`` a KIND_CODES code and ``category``/``counterparty`` indexes into
+    ``categories``/``counterparties``. Rows are sorted by date.
+    """
+
+    def __init__(
+        self,
+        key: Tuple[str, Optional[str]],
+        day: np.ndarray,
+        month: np.ndarray,
+        amount: np.ndarray,
+        kind: np.ndarray,
+        category: np.ndarray,
+        categories: List[str],
+        counterparty: np.ndarray,
+        counterparties: List[str],
+    ):
+        self.key = key
+        self.day = day
+        self.month = month
+        self.amount = amount
+        self.kind = kind
+        self.category = category
+        self.categories = categories
+        self.counterparty = counterparty
+        self.counterparties = counterparties
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, key: Tuple[str, Optional[str]], rows: Sequence[Dict[str, Any]]) -> 'EntityColumns':
+        """Build from rows with fecha, tipo, monto, categoria and contraparte."""
+        dates = [_as_date(r['fecha']) for r in rows]
+        day = np.fromiter((d.toordinal() for d in dates), dtype=np.int32, count=len(rows))
+        order = np.argsort(day, kind='stable')
+        category, categories = encode(r['categoria'] or 'Sin categoría' for r in rows)
+        counterparty, counterparties = encode(r['contraparte'] or 'N/A' for r in rows)
+        return cls(
+            key=key,
+            day=day[order],
+            month=np.fromiter((month_index(d) for d in dates), dtype=np.int32, count=len(rows))[order],
+            amount=np.fromiter((float(r['monto'] or 0) for r in rows), dtype=np.float64, count=len(rows))[order],
+            kind=np.fromiter((KIND_CODES.get(r['tipo'], -1) for r in rows), dtype=np.int8, count=len(rows))[order],
+            category=category[order],
+            categories=categories,
+            counterparty=counterparty[order],
+            counterparties=counterparties,
+        )
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.day, self.month, self.amount, self.kind, self.category, self.counterparty)
+        # Las etiquetas cuentan aproximadamente (64 bytes por string)
+        return sum(a.nbytes for a in arrays) + 64 * (len(self.categories) + len(self.counterparties))
+
+    def select(
+        self,
+        tipo: Optional[str] = None,
+        since: Optional[date] = None,
+        category: Optional[str] = None,
+    ) -> np.ndarray:
+        """Boolean mask of the rows matching every given filter."""
+        mask = np.ones(len(self), dtype=bool)
+        if tipo is not None:
+            mask &= self.kind == KIND_CODES.get(tipo, -1)
+        if since is not None:
+            # Filas ordenadas por fecha: el corte es un searchsorted
+            mask[:np.searchsorted(self.day, since.toordinal(), side='left')] = False
+        if category is not None:
+            code = self.categories.index(category) if category in self.categories else -1
+            mask &= self.category == code
+        return mask
+
+    def by_month(
+        self,
+        mask: Optional[np.ndarray] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Dense monthly totals between month indexes ``start`` and ``end``.
+
+        Returns:
+            (month indexes, totals, counts); months without rows are zero
+        """
+        months = self.month if mask is None else self.month[mask]
+        amounts = self.amount if mask is None else self.amount[mask]
+        if start is None:
+            start = int(months.min()) if len(months) else month_index(date.today())
+        if end is None:
+            end = int(months.max()) if len(months) else start
+        inside = (months >= start) & (months <= end)
+        totals, counts = group_totals(months[inside] - start, amounts[inside], end - start + 1)
+        return np.arange(start, end + 1), totals, counts
+
+    def _by_code(
+        self, codes: np.ndarray, labels: List[str], mask: Optional[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        if mask is not None:
+            codes = codes[mask]
+        amounts = self.amount if mask is None else self.amount[mask]
+        totals, counts = group_totals(codes, amounts, len(labels))
+        order = np.argsort(-totals, kind='stable')
+        return [
+            {'name': labels[i], 'total': float(totals[i]), 'count': int(counts[i])}
+            for i in order if counts[i]
+        ]
+
+    def by_category(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Totals and counts per category, largest first."""
+        return self._by_code(self.category, self.categories, mask)
+
+    def by_counterparty(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Totals and counts per counterparty, largest first."""
+        return self._by_code(self.counterparty, self.counterparties, mask)
+
+    def month_matrix(
+        self,
+        mask: Optional[np.ndarray] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Category × month totals in one bincount.
+
+        Returns:
+            (category names, month indexes, matrix of shape (categories, months))
+        """
+        months, _, _ = self.by_month(mask, start, end)
+        codes = self.category if mask is None else self.category[mask]
+        month_col = (self.month if mask is None else self.month[mask]) - months[0]
+        amounts = self.amount if mask is None else self.amount[mask]
+        inside = (month_col >= 0) & (month_col < len(months))
+        flat = codes[inside].astype(np.int64) * len(months) + month_col[inside]
+        totals = np.bincount(flat, weights=amounts[inside], minlength=len(self.categories) * len(months))
+        return self.categories, months, totals.reshape(len(self.categories), len(months))
+
+    def periodic_series(
+        self,
+        mask: Optional[np.ndarray] = None,
+        min_gap: int = 28,
+        max_gap: int = 32,
+    ) -> List[Dict[str, Any]]:
+        """
+        Charges repeated with a regular spacing: rows grouped by counterparty
+        and amount rounded to units, kept when there are at least two and every
+        gap between consecutive dates is within [min_gap, max_gap] days.
+
+        Returns:
+            One {'counterparty', 'amount', 'last_day', 'mean_gap'} per series
+        """
+        idx = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if len(idx) < 2:
+            return []
+        rounded, _ = encode(np.round(self.amount[idx]).tolist())
+        group = self.counterparty[idx].astype(np.int64) * (int(rounded.max()) + 1) + rounded
+        order = np.lexsort((self.day[idx], group))
+        group, rows = group[order], idx[order]
+        days = self.day[rows]
+
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        ends = np.r_[starts[1:], len(group)]
+        sizes = ends - starts
+        # Huecos entre filas consecutivas del mismo grupo
+        same = group[1:] == group[:-1]
+        gaps = np.diff(days)
+        segment = np.cumsum(np.r_[True, ~same])[:-1] - 1
+        bad = np.bincount(segment[same], weights=((gaps < min_gap) | (gaps > max_gap))[same], minlength=len(starts))
+        gap_sum = np.bincount(segment[same], weights=gaps[same], minlength=len(starts))
+
+        result = []
+        for s in np.flatnonzero((sizes > 1) & (bad == 0)):
+            last = rows[ends[s] - 1]
+            result.append({
+                'counterparty': self.counterparties[self.counterparty[last]],
+                'amount': float(self.amount[last]),
+                'last_day': date.fromordinal(int(self.day[last])),
+                'mean_gap': float(gap_sum[s] / (sizes[s] - 1)),
+            })
+        return result
+
+
+class ColumnarStore:
+    """
+    LRU of EntityColumns keyed by (entity_type, entity_id), within a memory budget.
+
+    Entities load lazily on first use (the last ``history_months`` of rows)
+    and expire after ``ttl`` seconds. Writes published with
+    mark_entities_changed drop the entity here too, through the result
+    cache's invalidation listeners. An entity larger than the whole budget is
+    returned but not kept.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20, ttl: float = 300.0, history_months: int = 24, db=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.history_months = history_months
+        self._db = db
+        self._entries: 'OrderedDict[Tuple[str, Optional[str]], EntityColumns]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._stats = {'hits': 0, 'loads': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    @classmethod
+    def from_env(cls) -> 'ColumnarStore':
+        return cls(
+            max_bytes=int(float(os.getenv('COLUMNAR_CACHE_MB', 256)) * 2 ** 20),
+            ttl=float(os.getenv('COLUMNAR_CACHE_TTL', 300)),
+            history_months=int(os.getenv('COLUMNAR_CACHE_MONTHS', 24)),
+        )
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_db_connection()
+        return self._db
+
+    def _load(self, entity_type: str, entity_id: Optional[str]) -> EntityColumns:
+        source = SOURCES[entity_type]
+        query = (
+            f"SELECT fecha, tipo, monto, categoria, {source.counterparty} AS contraparte "
+            f"FROM {source.table} WHERE fecha >= %s"
+        )
+        params: List[Any] = [month_floor(months_back=self.history_months)]
+        if entity_id:
+            query += f" AND {source.id_column} = %s"
+            params.append(entity_id)
+        started = time.perf_counter()
+        rows = self.db.execute_query(query, tuple(params))
+        columns = EntityColumns.from_rows((entity_type, entity_id), rows)
+        logger.debug(
+            f"Columnar {entity_type}:{entity_id or '*'}: {len(columns)} filas, "
+            f"{columns.nbytes / 1024:.0f} KiB en {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return columns
+
+    def get(self, entity_type: str, entity_id: Optional[str] = None) -> EntityColumns:
+        """Columns of one entity (``entity_id=None``: every entity of the type), loading on a miss."""
+        if entity_type not in SOURCES:
+            raise ValueError(f"Tipo de entidad no soportado: {entity_type}")
+        from .cache import get_result_cache
+
+        # Las invalidaciones de otros procesos llegan por el sondeo de la caché de resultados
+        get_result_cache()._maybe_sync()
+        key = (entity_type, entity_id or None)
+        with self._lock:
+            columns = self._fresh_locked(key)
+            if columns is not None:
+                return columns
+            loading = self._loading.setdefault(key, threading.Lock())
+        # Una sola carga por entidad aunque lleguen varias herramientas a la vez
+        with loading:
+            with self._lock:
+                columns = self._fresh_locked(key)
+                if columns is not None:
+                    return columns
+            columns = self._load(*key)
+            with self._lock:
+                self._stats['loads'] += 1
+                self._store_locked(key, columns)
+                self._loading.pop(key, None)
+            return columns
+
+    def _fresh_locked(self, key) -> Optional[EntityColumns]:
+        columns = self._entries.get(key)
+        if columns is None:
+            return None
+        if time.monotonic() - columns.loaded_at > self.ttl:
+            self._drop_locked(key)
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats['hits'] += 1
+        return columns
+
+    def _store_locked(self, key, columns: EntityColumns) -> None:
+        self._drop_locked(key)
+        if columns.nbytes > self.max_bytes:
+            return
+        self._entries[key] = columns
+        self._bytes += columns.nbytes
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop_locked(oldest)
+            self._stats['evictions'] += 1
+
+    def _drop_locked(self, key) -> None:
+        columns = self._entries.pop(key, None)
+        if columns is not None:
+            self._bytes -= columns.nbytes
+
+    def invalidate_entity(self, entity_id: Any) -> None:
+        """Drop this entity and the all-entities aggregates."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] is None or k[1] == str(entity_id)]:
+                self._drop_locked(key)
+                self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats,
+                entities=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+_store: Optional[ColumnarStore] = None
+_store_lock = threading.Lock()
+
+
+def get_columnar_store() -> ColumnarStore:
+    """Get the process-wide columnar store singleton."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from .cache import get_result_cache
+
+                _store = ColumnarStore.from_env()
+                get_result_cache().add_invalidation_listener(_store.invalidate_entity)
+    return _store
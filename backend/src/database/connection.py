@@ -1,21 +1,121 @@
 """Database connection management."""
 import os
 import logging
-from typing import Optional
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
 import mysql.connector
-from mysql.connector import pooling
 from dotenv import load_dotenv
 
+from .pool import ElasticConnectionPool, PoolSettings
+from .slowlog import get_slow_query_log
+from .sql import MYSQL
+from utils.metrics import record_query
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+def get_db_config() -> dict:
+    """Connection settings shared by the sync and async pools."""
+    return {
+        'host': os.getenv('DB_HOST', '72.60.123.201'),
+        'port': int(os.getenv('DB_PORT', 5441)),
+        'user': os.getenv('DB_USER', 'mysql'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME', 'oi_banorte'),
+    }
+
+
+class DatabaseSession:
+    """
+    Unit of work over a single pooled connection.
+
+    Every statement runs on the same connection and cursor, so a tool that
+    issues several queries pays for one pool checkout instead of one per query.
+    Writes are committed once when the session closes.
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.cursor(dictionary=True)
+        self._pending_commit = False
+    
+    def execute_query(self, query: str, params: tuple = None, fetch: bool = True):
+        """Same contract as DatabaseConnection.execute_query, on this session's connection."""
+        started = time.perf_counter()
+        self.cursor.execute(query, params or ())
+        if fetch:
+            rows = self.cursor.fetchall()
+            self._record(query, params, started, len(rows))
+            return rows
+        self._pending_commit = True
+        self._record(query, params, started, max(self.cursor.rowcount, 0))
+        return self.cursor.rowcount
+    
+    def _record(self, query: str, params, started: float, rows: int) -> None:
+        """Feed the metrics and the slow-query log with one finished statement."""
+        elapsed = time.perf_counter() - started
+        record_query(query, elapsed, rows)
+        get_slow_query_log().observe(query, params, elapsed, rows, self._explain)
+    
+    def _explain(self, query: str, params: tuple = None) -> List[dict]:
+        """EXPLAIN on this session's connection, with its own cursor."""
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {query}", params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    
+    def execute_many_queries(
+        self, statements: Sequence[Tuple[str, Optional[tuple]]]
+    ) -> List[List[dict]]:
+        """Run several SELECTs back to back and return their rows in order."""
+        return [self.execute_query(query, params) for query, params in statements]
+    
+    def stream_query(self, query: str, params: tuple = None, batch_size: int = 1000) -> Iterator[List[dict]]:
+        """
+        Yield the rows of a SELECT in lists of ``batch_size``.
+
+        Uses an unbuffered cursor (server-side result), so memory stays flat
+        no matter how many rows the statement returns. The connection stays
+        busy until the generator is exhausted or closed; closing it early
+        drains the remaining rows so the connection can go back to the pool.
+        """
+        started = time.perf_counter()
+        cursor = self.connection.cursor(dictionary=True, buffered=False)
+        rows = 0
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                rows += len(batch)
+                yield batch
+        finally:
+            if self.connection.unread_result:
+                self.connection.consume_results()
+            cursor.close()
+            self._record(query, params, started, rows)
+    
+    def execute_batch(self, query: str, seq_params: Sequence[tuple]) -> int:
+        """Run one INSERT/UPDATE for many parameter tuples (cursor.executemany)."""
+        started = time.perf_counter()
+        self.cursor.executemany(query, seq_params)
+        self._pending_commit = True
+        self._record(query, seq_params[0] if seq_params else None, started, max(self.cursor.rowcount, 0))
+        return self.cursor.rowcount
+
+
 class DatabaseConnection:
     """Manages MySQL database connections with connection pooling."""
     
+    dialect = MYSQL
     _instance: Optional['DatabaseConnection'] = None
-    _pool: Optional[pooling.MySQLConnectionPool] = None
+    _pool: Optional[ElasticConnectionPool] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -30,27 +130,28 @@ class DatabaseConnection:
         """Initialize the connection pool."""
         try:
             db_config = {
-                'host': os.getenv('DB_HOST', '72.60.123.201'),
-                'port': int(os.getenv('DB_PORT', 5441)),
-                'user': os.getenv('DB_USER', 'mysql'),
-                'password': os.getenv('DB_PASSWORD'),
-                'database': os.getenv('DB_NAME', 'oi_banorte'),
-                'pool_name': 'mcp_pool',
-                'pool_size': 5,
-                'pool_reset_session': True,
+                **get_db_config(),
                 'charset': 'utf8mb4',
                 'use_unicode': True
             }
+            settings = PoolSettings.from_env()
             
-            self._pool = pooling.MySQLConnectionPool(**db_config)
-            logger.info("Database connection pool initialized successfully")
+            self._pool = ElasticConnectionPool(
+                lambda: mysql.connector.connect(**db_config),
+                settings,
+            )
+            logger.info(
+                f"Database connection pool initialized successfully "
+                f"(min={settings.min_size}, max={settings.max_size}, "
+                f"timeout={settings.wait_timeout}s, reset_session={settings.reset_session})"
+            )
             
         except Exception as e:
             logger.error(f"Error initializing database pool: {e}")
             raise
     
     def get_connection(self):
-        """Get a connection from the pool."""
+        """Get a connection from the pool (waits up to DB_POOL_TIMEOUT if busy)."""
         try:
             return self._pool.get_connection()
         except Exception as e:
@@ -69,33 +170,67 @@ class DatabaseConnection:
         Returns:
             Query results or affected rows count
         """
-        connection = None
-        cursor = None
+        with self.session() as session:
+            return session.execute_query(query, params, fetch)
+    
+    def execute_many_queries(
+        self, statements: Sequence[Tuple[str, Optional[tuple]]]
+    ) -> List[List[dict]]:
+        """
+        Execute several SELECTs with a single connection checkout.
+        
+        Args:
+            statements: Sequence of (query, params) tuples
+        
+        Returns:
+            One list of rows per statement, in the same order
+        """
+        with self.session() as session:
+            return session.execute_many_queries(statements)
+    
+    def stream_query(self, query: str, params: tuple = None, batch_size: int = 1000) -> Iterator[List[dict]]:
+        """
+        Stream a SELECT in batches on one pooled connection (see DatabaseSession.stream_query).
+        
+        The connection is held until the generator finishes or is closed.
+        """
+        with self.session() as session:
+            yield from session.stream_query(query, params, batch_size)
+    
+    @contextmanager
+    def session(self) -> Iterator[DatabaseSession]:
+        """
+        Check out one connection for a group of statements.
+        
+        Usage:
+            with db.session() as s:
+                totals = s.execute_query(q1, p1)
+                page = s.execute_query(q2, p2)
+        
+        Writes are committed on exit; any error rolls the session back.
+        """
+        connection = self.get_connection()
+        session = None
         
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            cursor.execute(query, params or ())
-            
-            if fetch:
-                results = cursor.fetchall()
-                return results
-            else:
+            session = DatabaseSession(connection)
+            yield session
+            if session._pending_commit:
                 connection.commit()
-                return cursor.rowcount
                 
         except Exception as e:
             logger.error(f"Error executing query: {e}")
-            if connection:
-                connection.rollback()
+            connection.rollback()
             raise
             
         finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                connection.close()
+            if session:
+                session.cursor.close()
+            connection.close()
+    
+    def pool_stats(self) -> dict:
+        """Pool occupancy, wait/checkout timings and exhaustion counters."""
+        return self._pool.stats()
     
     def test_connection(self) -> bool:
         """Test database connection."""
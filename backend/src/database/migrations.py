@@ -0,0 +1,219 @@
+"""Schema migrations for the finanzas tables (composite indexes, month columns)."""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+CREATE_MIGRATIONS_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+        id VARCHAR(64) PRIMARY KEY,
+        description VARCHAR(255),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+@dataclass(frozen=True)
+class AddColumn:
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+
+    table: str
+    column: str
+    definition: str
+
+    def exists(self, session) -> bool:
+        rows = session.execute_query(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+            (self.table, self.column),
+        )
+        return bool(rows)
+
+    def sql(self) -> str:
+        return f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}"
+
+
+@dataclass(frozen=True)
+class AddIndex:
+    """CREATE INDEX, skipped when an index with that name already exists."""
+
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+
+    def exists(self, session) -> bool:
+        rows = session.execute_query(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (self.table, self.name),
+        )
+        return bool(rows)
+
+    def sql(self) -> str:
+        return f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+@dataclass(frozen=True)
+class Migration:
+    id: str
+    description: str
+    operations: Tuple[Any, ...] = field(default_factory=tuple)
+
+
+# `year_month` es palabra reservada en MySQL; como en el rollup, la columna
+# generada se llama `anio_mes` ('YYYY-MM'). Es STORED para poder indexarla y
+# que GROUP BY anio_mes no evalúe DATE_FORMAT fila por fila.
+_ANIO_MES = "CHAR(7) GENERATED ALWAYS AS (DATE_FORMAT(fecha, '%Y-%m')) STORED"
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        id='001_finanzas_empresa_indexes',
+        description='Índices compuestos (empresa, tipo, fecha) y (empresa, categoría, fecha) en finanzas_empresa',
+        operations=(
+            # Balance, burn rate, flujos: filtro por empresa + tipo + rango de fecha, SUM(monto) sin tocar la fila
+            AddIndex('finanzas_empresa', 'idx_emp_tipo_fecha_monto', ('empresa_id', 'tipo', 'fecha', 'monto')),
+            AddIndex('finanzas_empresa', 'idx_emp_cat_fecha', ('empresa_id', 'categoria', 'fecha')),
+            # Consultas sin empresa_id (totales globales)
+            AddIndex('finanzas_empresa', 'idx_tipo_fecha_monto', ('tipo', 'fecha', 'monto')),
+            # Resúmenes por ventana de fechas que suman ingresos y gastos a la vez;
+            # InnoDB añade el id al final, lo que también sirve a la paginación por cursor
+            AddIndex('finanzas_empresa', 'idx_emp_fecha_tipo_monto', ('empresa_id', 'fecha', 'tipo', 'monto')),
+        ),
+    ),
+    Migration(
+        id='002_finanzas_empresa_anio_mes',
+        description='Columna generada anio_mes e índice para agrupar por mes en finanzas_empresa',
+        operations=(
+            AddColumn('finanzas_empresa', 'anio_mes', _ANIO_MES),
+            AddIndex(
+                'finanzas_empresa', 'idx_emp_tipo_mes_cat',
+                ('empresa_id', 'tipo', 'anio_mes', 'categoria', 'monto'),
+            ),
+        ),
+    ),
+    Migration(
+        id='003_finanzas_personales_indexes',
+        description='Índices compuestos y columna anio_mes en finanzas_personales',
+        operations=(
+            AddIndex('finanzas_personales', 'idx_usr_tipo_fecha_monto', ('id_usuario', 'tipo', 'fecha', 'monto')),
+            AddIndex('finanzas_personales', 'idx_usr_cat_fecha', ('id_usuario', 'categoria', 'fecha')),
+            AddColumn('finanzas_personales', 'anio_mes', _ANIO_MES),
+            AddIndex(
+                'finanzas_personales', 'idx_usr_tipo_mes_cat',
+                ('id_usuario', 'tipo', 'anio_mes', 'categoria', 'monto'),
+            ),
+        ),
+    ),
+)
+
+
+def planned_indexes(migrations: Sequence[Migration] = MIGRATIONS) -> Dict[str, Dict[str, Tuple[str, ...]]]:
+    """Indexes the migrations create, as {table: {index_name: columns}}."""
+    out: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+    for migration in migrations:
+        for op in migration.operations:
+            if isinstance(op, AddIndex):
+                out.setdefault(op.table, {})[op.name] = op.columns
+    return out
+
+
+def existing_indexes(tables: Sequence[str], db=None) -> Dict[str, Dict[str, Tuple[str, ...]]]:
+    """Indexes currently defined in the database, as {table: {index_name: columns}}."""
+    db = db or get_db_connection()
+    if not tables:
+        return {}
+    placeholders = ', '.join(['%s'] * len(tables))
+    rows = db.execute_query(
+        "SELECT table_name AS t, index_name AS i, column_name AS c, seq_in_index AS s "
+        "FROM information_schema.statistics "
+        f"WHERE table_schema = DATABASE() AND table_name IN ({placeholders}) "
+        "ORDER BY table_name, index_name, seq_in_index",
+        tuple(tables),
+    )
+    out: Dict[str, Dict[str, List[str]]] = {}
+    for row in rows:
+        out.setdefault(row['t'], {}).setdefault(row['i'], []).append(row['c'])
+    return {t: {i: tuple(cols) for i, cols in idx.items()} for t, idx in out.items()}
+
+
+class MigrationRunner:
+    """
+    Applies MIGRATIONS in order and records them in schema_migrations.
+
+    Every operation checks information_schema first, so a migration that was
+    partially applied by hand (or interrupted) can simply be run again.
+    Tables that do not exist are skipped with a warning.
+    """
+
+    def __init__(self, db=None, migrations: Sequence[Migration] = MIGRATIONS):
+        self.db = db or get_db_connection()
+        self.migrations = tuple(migrations)
+
+    def applied(self) -> List[str]:
+        self.db.execute_query(CREATE_MIGRATIONS_TABLE, fetch=False)
+        rows = self.db.execute_query(f"SELECT id FROM {MIGRATIONS_TABLE} ORDER BY id")
+        return [r['id'] for r in rows]
+
+    def pending(self) -> List[Migration]:
+        done = set(self.applied())
+        return [m for m in self.migrations if m.id not in done]
+
+    def _table_exists(self, session, table: str) -> bool:
+        rows = session.execute_query(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,),
+        )
+        return bool(rows)
+
+    def plan(self) -> List[Tuple[str, str]]:
+        """(migration id, SQL) for every operation that would run now."""
+        steps = []
+        with self.db.session() as session:
+            for migration in self.pending():
+                for op in migration.operations:
+                    if self._table_exists(session, op.table) and not op.exists(session):
+                        steps.append((migration.id, op.sql()))
+        return steps
+
+    def migrate(self, target: Optional[str] = None) -> List[str]:
+        """
+        Apply pending migrations up to and including ``target`` (all by default).
+
+        Returns:
+            Ids of the migrations applied
+        """
+        applied = []
+        for migration in self.pending():
+            logger.info(f"Aplicando migración {migration.id}: {migration.description}")
+            # DDL en MySQL hace commit implícito: cada operación es su propia unidad
+            with self.db.session() as session:
+                for op in migration.operations:
+                    if not self._table_exists(session, op.table):
+                        logger.warning(f"  Tabla {op.table} no existe; se omite {op.sql()}")
+                        continue
+                    if op.exists(session):
+                        logger.info(f"  Ya existe: {op.sql()}")
+                        continue
+                    logger.info(f"  {op.sql()}")
+                    session.execute_query(op.sql(), fetch=False)
+                session.execute_query(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (id, description) VALUES (%s, %s)",
+                    (migration.id, migration.description),
+                    fetch=False,
+                )
+            applied.append(migration.id)
+            if migration.id == target:
+                break
+        return applied
+
+    def status(self) -> List[Dict[str, Any]]:
+        done = set(self.applied())
+        return [
+            {'id': m.id, 'description': m.description, 'applied': m.id in done}
+            for m in self.migrations
+        ]
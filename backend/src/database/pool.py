@@ -0,0 +1,289 @@
+"""Elastic, instrumented connection pool for the MySQL backend."""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the wait timeout."""
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+@dataclass
+class PoolSettings:
+    """Pool sizing and behaviour, read from the environment by default."""
+
+    min_size: int = 2
+    max_size: int = 10
+    wait_timeout: float = 10.0
+    max_waiters: int = 64
+    reset_session: bool = True
+    healthcheck_after: float = 30.0
+    max_idle: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> 'PoolSettings':
+        """
+        Build settings from DB_POOL_* variables.
+
+        DB_POOL_SIZE is still honoured as the max size for older deployments.
+        """
+        max_size = int(os.getenv('DB_POOL_MAX', os.getenv('DB_POOL_SIZE', cls.max_size)))
+        min_size = min(int(os.getenv('DB_POOL_MIN', cls.min_size)), max_size)
+        return cls(
+            min_size=min_size,
+            max_size=max_size,
+            wait_timeout=float(os.getenv('DB_POOL_TIMEOUT', cls.wait_timeout)),
+            max_waiters=int(os.getenv('DB_POOL_MAX_WAITERS', cls.max_waiters)),
+            reset_session=_env_bool('DB_POOL_RESET_SESSION', cls.reset_session),
+            healthcheck_after=float(os.getenv('DB_POOL_HEALTHCHECK_AFTER', cls.healthcheck_after)),
+            max_idle=float(os.getenv('DB_POOL_MAX_IDLE', cls.max_idle)),
+        )
+
+
+class _Timings:
+    """Running count/sum/max plus a bounded window of samples for percentiles."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self._samples)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(pct(50) * 1000, 3),
+            'p99_ms': round(pct(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PooledConnection:
+    """
+    Proxy around a raw connection checked out from ElasticConnectionPool.
+
+    Everything is forwarded to the underlying connection except ``close()``,
+    which hands it back to the pool (same contract as mysql-connector's
+    PooledMySQLConnection, so existing ``connection.close()`` calls keep working).
+    """
+
+    def __init__(self, pool: 'ElasticConnectionPool', raw: Any):
+        self._pool = pool
+        self._raw = raw
+        self._checked_out_at = time.monotonic()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def close(self) -> None:
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, time.monotonic() - self._checked_out_at)
+
+
+class ElasticConnectionPool:
+    """
+    Thread-safe pool that grows from min_size to max_size on demand.
+
+    When every connection is busy, callers queue (bounded by max_waiters) for
+    up to wait_timeout seconds instead of failing immediately. Idle connections
+    older than healthcheck_after are pinged before being handed out, and those
+    idle for longer than max_idle are closed while the pool is above min_size.
+    """
+
+    def __init__(self, connect: Callable[[], Any], settings: PoolSettings = None):
+        self._connect = connect
+        self.settings = settings or PoolSettings.from_env()
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiters = 0
+
+        self._wait_times = _Timings()
+        self._checkout_times = _Timings()
+        self._counters = {
+            'checkouts': 0,
+            'created': 0,
+            'closed': 0,
+            'exhausted': 0,
+            'queue_full': 0,
+            'healthcheck_failures': 0,
+            'reset_failures': 0,
+        }
+
+        for _ in range(self.settings.min_size):
+            self._idle.append((self._create(), time.monotonic()))
+
+    def _create(self) -> Any:
+        raw = self._connect()
+        with self._cond:
+            self._size += 1
+            self._counters['created'] += 1
+        return raw
+
+    def _discard(self, raw: Any) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._counters['closed'] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, raw: Any) -> bool:
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding stale pooled connection: {e}")
+            with self._cond:
+                self._counters['healthcheck_failures'] += 1
+            return False
+
+    def _shrink_locked(self, now: float) -> list:
+        """Pop connections idle for too long while above min_size (caller closes them)."""
+        expired = []
+        while (
+            self._idle
+            and self._size - len(expired) > self.settings.min_size
+            and now - self._idle[0][1] > self.settings.max_idle
+        ):
+            expired.append(self._idle.popleft()[0])
+        return expired
+
+    def get_connection(self, timeout: float = None) -> PooledConnection:
+        """
+        Check out a connection, waiting in a bounded queue if the pool is busy.
+
+        Raises:
+            PoolExhaustedError: if the wait queue is full or the timeout expires
+        """
+        timeout = self.settings.wait_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            raw = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._idle:
+                        raw, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.settings.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    if self._waiters >= self.settings.max_waiters:
+                        self._counters['queue_full'] += 1
+                        self._counters['exhausted'] += 1
+                        raise PoolExhaustedError(
+                            f"Connection pool queue is full ({self._waiters} waiters)"
+                        )
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['exhausted'] += 1
+                        raise PoolExhaustedError(
+                            f"No connection available after {timeout:.1f}s "
+                            f"(max_size={self.settings.max_size})"
+                        )
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+
+            if create:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._counters['created'] += 1
+            elif time.monotonic() - idle_since > self.settings.healthcheck_after and not self._is_healthy(raw):
+                self._discard(raw)
+                continue
+
+            with self._cond:
+                self._in_use += 1
+                self._counters['checkouts'] += 1
+                self._wait_times.add(time.monotonic() - started)
+            return PooledConnection(self, raw)
+
+    def _release(self, raw: Any, held_for: float) -> None:
+        if self.settings.reset_session:
+            try:
+                raw.reset_session()
+            except Exception as e:
+                logger.warning(f"Session reset failed, discarding connection: {e}")
+                with self._cond:
+                    self._in_use -= 1
+                    self._counters['reset_failures'] += 1
+                    self._checkout_times.add(held_for)
+                self._discard(raw)
+                return
+
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._checkout_times.add(held_for)
+            self._idle.append((raw, now))
+            expired = self._shrink_locked(now)
+            self._cond.notify()
+        for stale in expired:
+            self._discard(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy, wait/checkout timings and counters."""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiters,
+                'min_size': self.settings.min_size,
+                'max_size': self.settings.max_size,
+                'wait_time': self._wait_times.summary(),
+                'checkout_time': self._checkout_times.summary(),
+                **self._counters,
+            }
+
+    def close_all(self) -> None:
+        """Close idle connections (in-use ones are closed when returned)."""
+        with self._cond:
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+        for raw in idle:
+            self._discard(raw)
@@ -1,19 +1,310 @@
 """Financial data queries for the MCP server."""
+import base64
+import functools
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional, Generator, Sequence
 from datetime import datetime, timedelta
+
+import numpy as np
+
+from .cache import ALL_ENTITIES, cached, get_result_cache
+from .columnar import distinct_per_group, encode, group_totals
 from .connection import get_db_connection
+from .replica import get_analytical_replica
+from .rollup import ROLLUP_TABLE, rollup_enabled
+from .sql import MYSQL, month_floor, month_key_since, month_window, months_ago, since, since_month
 from typing import Tuple
 
 logger = logging.getLogger(__name__)
 
+# Un plan es un generador que hace ``rows = yield query, params`` por cada
+# sentencia y termina con ``return resultado``.
+QueryPlan = Generator[Tuple[str, Optional[tuple]], List[Dict[str, Any]], Any]
+
+
+def query_plan(func):
+    """
+    Turn a query-plan generator into a regular (synchronous) query method.
+
+    The generator never touches the database itself: it yields
+    ``(query, params)`` and receives the fetched rows back. That keeps the SQL
+    and the row shaping in one place while letting both FinancialDataQueries
+    and AsyncFinancialDataQueries drive it. The raw generator function is
+    exposed as ``method.plan``.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self._run_routed(func, args, kwargs)
+
+    wrapper.plan = func
+    return wrapper
+
+
+def analytical(func):
+    """
+    Mark a query plan as an aggregate read the analytical replica may serve.
+
+    Goes under ``@query_plan``. Only plans that read the replicated tables
+    (finanzas_empresa, finanzas_personales) and tolerate a few minutes of lag
+    should be marked; balances and listings stay on MySQL.
+    """
+    func.analytical = True
+    return func
+
+
+# Conteos de list_transactions cacheados por filtro, para que paginar con
+# cursor no vuelva a escanear la tabla en cada página. Cada entrada guarda
+# su entidad: mark_entities_changed (local o vía el sondeo de la caché de
+# resultados) la descarta.
+_COUNT_CACHE_TTL = 60.0
+_count_cache: Dict[Tuple[str, tuple], Tuple[float, str, int]] = {}
+_count_cache_lock = threading.Lock()
+_count_listener_registered = False
+
+
+def encode_cursor(fecha: Any, row_id: Any) -> str:
+    """Encode the (fecha, id) of the last row of a page as an opaque cursor."""
+    fecha_str = fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha)
+    payload = json.dumps({'f': fecha_str, 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Inverse of encode_cursor; raises ValueError on malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['f']), payload['i']
+    except Exception:
+        raise ValueError('Cursor de paginación inválido')
+
+
+def _cached_count(key: Tuple[str, tuple]) -> Optional[int]:
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[2]
+        _count_cache.pop(key, None)
+        return None
+
+
+def _invalidate_counts(entity_id: str) -> None:
+    """Drop the cached counts of an entity and the all-entities ones."""
+    with _count_cache_lock:
+        for key in [k for k, entry in _count_cache.items() if entry[1] in (entity_id, ALL_ENTITIES)]:
+            del _count_cache[key]
+
+
+def _store_count(key: Tuple[str, tuple], entity: str, total: int) -> None:
+    global _count_listener_registered
+    with _count_cache_lock:
+        if not _count_listener_registered:
+            get_result_cache().add_invalidation_listener(_invalidate_counts)
+            _count_listener_registered = True
+        _count_cache[key] = (time.monotonic() + _COUNT_CACHE_TTL, entity, total)
+
+
+TRANSACTION_COLUMNS = "id, fecha, tipo, monto, categoria, descripcion, contraparte"
+
+
+def transaction_filters(
+    entity_type: str,
+    entity_id: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[str],
+    min_amount: Optional[float],
+    max_amount: Optional[float],
+    txn_type: Optional[str],
+) -> Tuple[List[str], List[Any]]:
+    """WHERE conditions and params shared by list_transactions and stream_transactions."""
+    where = []
+    params: list[Any] = []
+    if entity_type == 'company' and entity_id:
+        where.append("empresa_id = %s")
+        params.append(entity_id)
+    elif entity_type == 'personal' and entity_id:
+        # Si tu esquema usa `usuario_id` en otra tabla, ajusta este filtro
+        where.append("usuario_id = %s")
+        params.append(entity_id)
+    if start_date:
+        where.append("fecha >= %s")
+        params.append(start_date)
+    if end_date:
+        where.append("fecha <= %s")
+        params.append(end_date)
+    if category:
+        where.append("categoria = %s")
+        params.append(category)
+    if min_amount is not None:
+        where.append("monto >= %s")
+        params.append(min_amount)
+    if max_amount is not None:
+        where.append("monto <= %s")
+        params.append(max_amount)
+    if txn_type in ('ingreso', 'gasto'):
+        where.append("tipo = %s")
+        params.append(txn_type)
+    return where, params
+
+
+def transaction_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    """One transaction row as the tools return it (ISO date, float amount)."""
+    fecha = row.get('fecha')
+    return {
+        'id': row.get('id'),
+        'fecha': fecha.isoformat() if fecha else None,
+        'tipo': row.get('tipo'),
+        'monto': float(row.get('monto') or 0),
+        'categoria': row.get('categoria'),
+        'descripcion': row.get('descripcion'),
+        'contraparte': row.get('contraparte'),
+    }
+
 
-class FinancialDataQueries:
+def build_multi_window_summary(
+    windows: Sequence[Tuple[Optional[datetime], Optional[datetime]]],
+    table: str = 'finanzas_empresa',
+    id_column: Optional[str] = None,
+    entity_id: Optional[str] = None,
+) -> Tuple[str, tuple]:
+    """
+    Build one query that sums income, expenses and counts for N date windows.
+
+    Each window becomes a set of ``SUM(CASE WHEN fecha >= .. AND fecha <= ..)``
+    columns suffixed with its position (``ingresos_0``, ``gastos_0``,
+    ``transacciones_0``, ...), and the WHERE clause only scans the union range
+    of all windows, so comparing periods costs a single pass over
+    ``(entity, fecha)`` instead of one query per window and type.
+
+    Args:
+        windows: Sequence of (start, end) pairs; either bound may be None (open)
+        table: Transactions table to read
+        id_column: Entity column to filter on (e.g. 'empresa_id')
+        entity_id: Entity value; ignored if id_column or entity_id is empty
+
+    Returns:
+        Tuple of (query, params)
+    """
+    columns = []
+    params: list[Any] = []
+    for i, (start, end) in enumerate(windows):
+        bounds = []
+        bound_params: list[Any] = []
+        if start:
+            bounds.append("fecha >= %s")
+            bound_params.append(start)
+        if end:
+            bounds.append("fecha <= %s")
+            bound_params.append(end)
+        in_window = " AND ".join(bounds) or "1=1"
+        columns.append(f"SUM(CASE WHEN tipo = 'ingreso' AND {in_window} THEN monto ELSE 0 END) AS ingresos_{i}")
+        columns.append(f"SUM(CASE WHEN tipo = 'gasto' AND {in_window} THEN monto ELSE 0 END) AS gastos_{i}")
+        columns.append(f"SUM(CASE WHEN {in_window} THEN 1 ELSE 0 END) AS transacciones_{i}")
+        params.extend(bound_params * 3)
+
+    where = []
+    if id_column and entity_id:
+        where.append(f"{id_column} = %s")
+        params.append(entity_id)
+    # Solo acotar el rango cuando todas las ventanas son cerradas
+    starts = [start for start, _ in windows]
+    ends = [end for _, end in windows]
+    if starts and all(starts):
+        where.append("fecha >= %s")
+        params.append(min(starts))
+    if ends and all(ends):
+        where.append("fecha <= %s")
+        params.append(max(ends))
+
+    query = (
+        "SELECT " + ", ".join(columns) + f" FROM {table}"
+        + (" WHERE " + " AND ".join(where) if where else "")
+    )
+    return query, tuple(params)
+
+
+def parse_multi_window_summary(row: Optional[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Split the single row returned by build_multi_window_summary into one dict per window."""
+    row = row or {}
+    windows = []
+    for i in range(count):
+        ingresos = float(row.get(f'ingresos_{i}') or 0)
+        gastos = float(row.get(f'gastos_{i}') or 0)
+        windows.append({
+            'ingresos': ingresos,
+            'gastos': gastos,
+            'balance': ingresos - gastos,
+            'transacciones': int(row.get(f'transacciones_{i}') or 0),
+        })
+    return windows
+
+
+class QueryPlanHost:
+    """
+    State the shared query plans read from ``self``.
+
+    Base of FinancialDataQueries and AsyncFinancialDataQueries: a plan only
+    uses ``self.dialect`` and ``self._use_rollup()``, so both drivers run the
+    same SQL.
+    """
+
+    dialect = MYSQL
+
+    def _use_rollup(self) -> bool:
+        """The MySQL rollup table is not replicated; the replica aggregates raw rows."""
+        return rollup_enabled() and self.dialect.name == 'mysql'
+
+
+class FinancialDataQueries(QueryPlanHost):
     """Handles all financial data queries."""
     
-    def __init__(self):
-        self.db = get_db_connection()
+    def __init__(self, db=None, replica=None):
+        # Con un db explícito (réplica, pruebas, advisor) no se enruta a la réplica
+        if replica is None and db is None:
+            replica = get_analytical_replica()
+        self.db = db or get_db_connection()
+        # Los planes construyen el SQL con el dialecto del backend que los ejecuta
+        self.dialect = getattr(self.db, 'dialect', MYSQL)
+        self.replica = replica if replica is not None and replica.enabled else None
+        self._replica_queries: Optional['FinancialDataQueries'] = None
 
+    def _run_routed(self, plan_func, args: tuple, kwargs: dict) -> Any:
+        """Run a plan on the analytical replica when marked and fresh, else on MySQL."""
+        if self.replica is not None and getattr(plan_func, 'analytical', False) and self.replica.is_fresh():
+            if self._replica_queries is None:
+                self._replica_queries = FinancialDataQueries(db=self.replica)
+            try:
+                result = self._replica_queries._run_plan(plan_func(self._replica_queries, *args, **kwargs))
+                self.replica.record_route()
+                return result
+            except Exception as e:
+                self.replica.record_route(fallback=True)
+                logger.warning(f"Réplica analítica falló en {plan_func.__name__}, se usa MySQL: {e}")
+        return self._run_plan(plan_func(self, *args, **kwargs))
+
+    def _run_plan(self, plan: QueryPlan) -> Any:
+        """Drive a query plan, running all of its statements on one pooled connection."""
+        try:
+            statement = next(plan)
+        except StopIteration as done:
+            return done.value
+        with self.db.session() as session:
+            try:
+                while True:
+                    try:
+                        rows = session.execute_query(*statement)
+                    except Exception as e:
+                        statement = plan.throw(e)
+                    else:
+                        statement = plan.send(rows)
+            except StopIteration as done:
+                return done.value
+
+    @query_plan
     def list_transactions(
         self,
         entity_type: str,
@@ -26,73 +317,110 @@ class FinancialDataQueries:
         txn_type: str | None,  # 'ingreso' | 'gasto'
         limit: int = 50,
         offset: int = 0,
+        cursor: str | None = None,
+        include_total: bool = True,
     ) -> Dict[str, Any]:
         """Lista transacciones con filtros y paginación.
         Asume tabla `finanzas_empresa(empresa_id, user_id?, fecha, tipo, monto, categoria, descripcion, contraparte)`.
         Si no hay `user_id` en la tabla (solo empresa), `entity_type` personal no aplicará.
+
+        Con `cursor` (el `next_cursor` de la página anterior) se pagina por
+        keyset sobre `(fecha, id)` en vez de OFFSET, así cada página cuesta lo
+        mismo sin importar su profundidad. En ese modo el total sale de un
+        conteo cacheado por filtro (`total_cached=True`). Con
+        `include_total=False` no se ejecuta el COUNT(*) en ninguna página y
+        `total` es None.
         """
-        where = []
-        params: list[Any] = []
-        if entity_type == 'company' and entity_id:
-            where.append("empresa_id = %s")
-            params.append(entity_id)
-        elif entity_type == 'personal' and entity_id:
-            # Si tu esquema usa `usuario_id` en otra tabla, ajusta este filtro
-            where.append("usuario_id = %s")
-            params.append(entity_id)
-        if start_date:
-            where.append("fecha >= %s")
-            params.append(start_date)
-        if end_date:
-            where.append("fecha <= %s")
-            params.append(end_date)
-        if category:
-            where.append("categoria = %s")
-            params.append(category)
-        if min_amount is not None:
-            where.append("monto >= %s")
-            params.append(min_amount)
-        if max_amount is not None:
-            where.append("monto <= %s")
-            params.append(max_amount)
-        if txn_type in ('ingreso', 'gasto'):
-            where.append("tipo = %s")
-            params.append(txn_type)
+        where, params = transaction_filters(
+            entity_type, entity_id, start_date, end_date, category, min_amount, max_amount, txn_type
+        )
 
         base = "FROM finanzas_empresa"
         where_clause = (" WHERE " + " AND ".join(where)) if where else ""
 
         # Total
-        total_q = f"SELECT COUNT(*) AS c {base}{where_clause}"
-        total_res = self.db.execute_query(total_q, tuple(params) if params else None)
-        total = int(total_res[0]['c']) if total_res else 0
+        total = None
+        total_cached = False
+        if include_total:
+            total_q = f"SELECT COUNT(*) AS c {base}{where_clause}"
+            count_params = tuple(params) if params else None
+            if cursor is not None:
+                total = _cached_count((total_q, count_params or ()))
+                total_cached = total is not None
+            if total is None:
+                total_res = (yield total_q, count_params)
+                total = int(total_res[0]['c']) if total_res else 0
+                _store_count((total_q, count_params or ()), str(entity_id or ALL_ENTITIES), total)
 
         # Page
-        page_q = (
-            f"SELECT id, fecha, tipo, monto, categoria, descripcion, contraparte "
-            f"{base}{where_clause} "
-            f"ORDER BY fecha DESC, id DESC LIMIT %s OFFSET %s"
-        )
-        page_params = params + [limit, offset]
-        rows = self.db.execute_query(page_q, tuple(page_params))
+        if cursor is not None:
+            after_fecha, after_id = decode_cursor(cursor)
+            page_where = where + ["(fecha < %s OR (fecha = %s AND id < %s))"]
+            page_q = (
+                f"SELECT {TRANSACTION_COLUMNS} "
+                f"{base} WHERE {' AND '.join(page_where)} "
+                f"ORDER BY fecha DESC, id DESC LIMIT %s"
+            )
+            # Una fila extra indica si existe otra página
+            page_params = params + [after_fecha, after_fecha, after_id, limit + 1]
+        else:
+            page_q = (
+                f"SELECT {TRANSACTION_COLUMNS} "
+                f"{base}{where_clause} "
+                f"ORDER BY fecha DESC, id DESC LIMIT %s OFFSET %s"
+            )
+            page_params = params + [limit + 1, offset]
+        rows = (yield page_q, tuple(page_params))
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor(rows[-1].get('fecha'), rows[-1].get('id'))
 
-        items = [
-            {
-                'id': r.get('id'),
-                'fecha': r.get('fecha').isoformat() if r.get('fecha') else None,
-                'tipo': r.get('tipo'),
-                'monto': float(r.get('monto') or 0),
-                'categoria': r.get('categoria'),
-                'descripcion': r.get('descripcion'),
-                'contraparte': r.get('contraparte'),
-            }
-            for r in rows
-        ]
         return {
-            'items': items,
+            'items': [transaction_item(r) for r in rows],
             'total': total,
+            'total_cached': total_cached,
+            'next_cursor': next_cursor,
         }
 
+    def stream_transactions(
+        self,
+        entity_type: str,
+        entity_id: str | None,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        category: str | None,
+        min_amount: float | None,
+        max_amount: float | None,
+        txn_type: str | None,
+        batch_size: int = 1000,
+        max_rows: int | None = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Transactions matching the list_transactions filters, in batches.
+
+        One ordered SELECT over an unbuffered cursor instead of page after
+        page: memory stays at one batch and the first batch is available as
+        soon as MySQL sends it. Not a query plan, since it yields many times.
+        """
+        where, params = transaction_filters(
+            entity_type, entity_id, start_date, end_date, category, min_amount, max_amount, txn_type
+        )
+        q = (
+            f"SELECT {TRANSACTION_COLUMNS} FROM finanzas_empresa"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY fecha DESC, id DESC"
+        )
+        if max_rows:
+            q += " LIMIT %s"
+            params.append(max_rows)
+        for batch in self.db.stream_query(q, tuple(params), batch_size):
+            yield [transaction_item(r) for r in batch]
+
+    @query_plan
+    @analytical
     def get_top_categories(
         self,
         entity_type: str,
@@ -126,7 +454,7 @@ class FinancialDataQueries:
             + " GROUP BY categoria ORDER BY total DESC LIMIT %s"
         )
         params.append(top_n)
-        rows = self.db.execute_query(q, tuple(params))
+        rows = (yield q, tuple(params))
         return [
             {
                 'categoria': r['categoria'],
@@ -136,6 +464,8 @@ class FinancialDataQueries:
             for r in rows
         ]
 
+    @query_plan
+    @analytical
     def get_monthly_summary(
         self,
         entity_type: str,
@@ -166,32 +496,24 @@ class FinancialDataQueries:
             prev_end = start_date - timedelta(days=1)
             prev_start = (start_date - timedelta(days=(end_date - start_date).days + 1))
 
-        def sum_by_type(tipo: str, a: datetime, b: datetime) -> float:
-            where = ["tipo = %s"]
-            params: list[Any] = [tipo]
-            if entity_type == 'company' and entity_id:
-                where.append("empresa_id = %s")
-                params.append(entity_id)
-            elif entity_type == 'personal' and entity_id:
-                where.append("usuario_id = %s")
-                params.append(entity_id)
-            where.append("fecha >= %s")
-            where.append("fecha <= %s")
-            params.extend([a, b])
-            q = (
-                "SELECT SUM(monto) AS total FROM finanzas_empresa WHERE "
-                + " AND ".join(where)
-            )
-            res = self.db.execute_query(q, tuple(params))
-            return float(res[0]['total'] or 0) if res else 0.0
+        id_column = None
+        if entity_type == 'company':
+            id_column = 'empresa_id'
+        elif entity_type == 'personal':
+            id_column = 'usuario_id'
+        windows = [(start_date, end_date), (prev_start, prev_end)]
+        # Periodo actual y previo en una sola pasada
+        q, params = build_multi_window_summary(windows, id_column=id_column, entity_id=entity_id)
+        res = (yield q, params)
+        current, previous = parse_multi_window_summary(res[0] if res else None, len(windows))
 
-        ingresos = sum_by_type('ingreso', start_date, end_date)
-        gastos = sum_by_type('gasto', start_date, end_date)
-        balance = ingresos - gastos
+        ingresos = current['ingresos']
+        gastos = current['gastos']
+        balance = current['balance']
 
-        prev_ingresos = sum_by_type('ingreso', prev_start, prev_end)
-        prev_gastos = sum_by_type('gasto', prev_start, prev_end)
-        prev_balance = prev_ingresos - prev_gastos
+        prev_ingresos = previous['ingresos']
+        prev_gastos = previous['gastos']
+        prev_balance = previous['balance']
 
         def var_pct(curr: float, prev: float) -> float:
             return round(((curr - prev) / prev * 100) if prev else (100.0 if curr > 0 else 0.0), 2)
@@ -211,6 +533,8 @@ class FinancialDataQueries:
             },
         }
 
+    @query_plan
+    @analytical
     def get_recent_burn_rate(
         self,
         entity_type: str,
@@ -228,22 +552,34 @@ class FinancialDataQueries:
             params.append(entity_id)
         where_clause = (" WHERE " + " AND ".join(where)) if where else ""
         # Gastos por mes últimos N
-        q = (
-            "SELECT DATE_FORMAT(fecha, '%Y-%m-01') AS mes, "
-            "SUM(CASE WHEN tipo='gasto' THEN monto ELSE 0 END) AS gastos, "
-            "SUM(CASE WHEN tipo='ingreso' THEN monto ELSE 0 END) AS ingresos "
-            "FROM finanzas_empresa"
-            f"{where_clause} "
-            "GROUP BY mes ORDER BY mes DESC LIMIT %s"
-        )
+        if entity_type == 'company' and self._use_rollup():
+            q = (
+                f"SELECT {self.dialect.key_to_month_start('anio_mes')} AS mes, "
+                "SUM(CASE WHEN tipo='gasto' THEN total ELSE 0 END) AS gastos, "
+                "SUM(CASE WHEN tipo='ingreso' THEN total ELSE 0 END) AS ingresos "
+                f"FROM {ROLLUP_TABLE}"
+                f"{where_clause} "
+                "GROUP BY anio_mes ORDER BY anio_mes DESC LIMIT %s"
+            )
+        else:
+            q = (
+                f"SELECT {self.dialect.month_start()} AS mes, "
+                "SUM(CASE WHEN tipo='gasto' THEN monto ELSE 0 END) AS gastos, "
+                "SUM(CASE WHEN tipo='ingreso' THEN monto ELSE 0 END) AS ingresos "
+                "FROM finanzas_empresa"
+                f"{where_clause} "
+                "GROUP BY mes ORDER BY mes DESC LIMIT %s"
+            )
         params2 = params + [months]
-        rows = self.db.execute_query(q, tuple(params2))
+        rows = (yield q, tuple(params2))
         if not rows:
             return 0.0, 0.0
         avg_exp = sum(float(r['gastos'] or 0) for r in rows) / len(rows)
         avg_inc = sum(float(r['ingresos'] or 0) for r in rows) / len(rows)
         return avg_exp, avg_inc
 
+    @query_plan
+    @analytical
     def get_monthly_totals_by_category(
         self,
         entity_type: str,
@@ -260,13 +596,20 @@ class FinancialDataQueries:
         elif entity_type == 'personal' and entity_id:
             where.append("usuario_id = %s")
             params.append(entity_id)
-        q = (
-            "SELECT DATE_FORMAT(fecha, '%Y-%m-01') AS mes, SUM(monto) AS total "
-            "FROM finanzas_empresa WHERE tipo = 'gasto' AND " + " AND ".join(where) + " "
-            "GROUP BY mes ORDER BY mes DESC LIMIT %s"
-        )
+        if entity_type == 'company' and self._use_rollup():
+            q = (
+                f"SELECT {self.dialect.key_to_month_start('anio_mes')} AS mes, SUM(total) AS total "
+                f"FROM {ROLLUP_TABLE} WHERE tipo = 'gasto' AND " + " AND ".join(where) + " "
+                "GROUP BY anio_mes ORDER BY anio_mes DESC LIMIT %s"
+            )
+        else:
+            q = (
+                f"SELECT {self.dialect.month_start()} AS mes, SUM(monto) AS total "
+                "FROM finanzas_empresa WHERE tipo = 'gasto' AND " + " AND ".join(where) + " "
+                "GROUP BY mes ORDER BY mes DESC LIMIT %s"
+            )
         params.append(months_back)
-        rows = self.db.execute_query(q, tuple(params))
+        rows = (yield q, tuple(params))
         # Devolver en orden cronológico ascendente
         return [
             {
@@ -276,45 +619,50 @@ class FinancialDataQueries:
             for r in reversed(rows)
         ]
 
+    @query_plan
+    @analytical
     def detect_recurring_payments(
         self,
         user_id: str,
         months_back: int = 12,
         min_occurrences: int = 3,
     ) -> List[Dict[str, Any]]:
-        """Heurística simple de pagos recurrentes por 'contraparte' o 'descripcion'."""
+        """
+        Heurística simple de pagos recurrentes por 'contraparte' o 'descripcion'.
+
+        Solo mira los gastos de los últimos ``months_back`` meses (antes el
+        parámetro se ignoraba y se recorría toda la historia), así que un
+        pago que dejó de repetirse hace más de un año ya no aparece.
+        """
         # Tomar últimos N meses para el usuario personal
+        window, window_params = since(months_back)
         q = (
-            "SELECT contraparte, descripcion, DATE_FORMAT(fecha, '%Y-%m') AS ym, "
+            f"SELECT contraparte, descripcion, {self.dialect.month_key()} AS ym, "
             "ROUND(AVG(monto), 2) AS avg_monto, COUNT(*) AS n "
             "FROM finanzas_empresa "
-            "WHERE usuario_id = %s AND tipo='gasto' "
+            f"WHERE usuario_id = %s AND tipo='gasto' AND {window} "
             "GROUP BY contraparte, descripcion, ym"
         )
-        rows = self.db.execute_query(q, (user_id,))
+        rows = (yield q, (user_id, *window_params))
         # Agregar por contraparte/descripcion y contar meses únicos
-        from collections import defaultdict
-        groups = defaultdict(lambda: {'months': set(), 'sum_monto': 0.0, 'count': 0})
-        for r in rows:
-            key = r.get('contraparte') or r.get('descripcion') or 'N/A'
-            ym = r['ym']
-            groups[key]['months'].add(ym)
-            groups[key]['sum_monto'] += float(r['avg_monto'] or 0)
-            groups[key]['count'] += 1
-        result = []
-        for key, g in groups.items():
-            occ = len(g['months'])
-            if occ >= min_occurrences:
-                avg_monthly = g['sum_monto'] / occ
-                result.append({
-                    'comercio': key,
-                    'ocurrencias_mensuales': occ,
-                    'costo_mensual_estimado': round(avg_monthly, 2),
-                })
+        keys, names = encode(r.get('contraparte') or r.get('descripcion') or 'N/A' for r in rows)
+        months, _ = encode(r['ym'] for r in rows)
+        sums, _ = group_totals(keys, np.array([float(r['avg_monto'] or 0) for r in rows]), len(names))
+        occurrences = distinct_per_group(keys, months, len(names))
+        result = [
+            {
+                'comercio': names[i],
+                'ocurrencias_mensuales': int(occurrences[i]),
+                'costo_mensual_estimado': round(float(sums[i] / occurrences[i]), 2),
+            }
+            for i in np.flatnonzero(occurrences >= min_occurrences)
+        ]
         # Ordenar por costo
         result.sort(key=lambda x: x['costo_mensual_estimado'], reverse=True)
         return result
     
+    @cached('get_company_balance')
+    @query_plan
     def get_company_balance(self, company_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get current balance for a company.
@@ -340,7 +688,7 @@ class FinancialDataQueries:
                 query += " WHERE empresa_id = %s"
                 params = (company_id,)
             
-            result = self.db.execute_query(query, params)
+            result = (yield query, params)
             
             if result:
                 return {
@@ -355,6 +703,8 @@ class FinancialDataQueries:
             logger.error(f"Error getting company balance: {e}")
             raise
     
+    @query_plan
+    @analytical
     def get_expenses_by_category(
         self, 
         company_id: Optional[str] = None,
@@ -403,7 +753,7 @@ class FinancialDataQueries:
             
             query += " GROUP BY categoria ORDER BY total DESC"
             
-            results = self.db.execute_query(query, tuple(params) if params else None)
+            results = (yield query, tuple(params) if params else None)
             
             return [
                 {
@@ -418,6 +768,8 @@ class FinancialDataQueries:
             logger.error(f"Error getting expenses by category: {e}")
             raise
     
+    @query_plan
+    @analytical
     def get_cash_flow_projection(
         self,
         company_id: Optional[str] = None,
@@ -435,22 +787,22 @@ class FinancialDataQueries:
         """
         try:
             # Get last 6 months average
-            query = """
+            window, params = since(6)
+            query = f"""
                 SELECT 
                     AVG(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as avg_ingresos,
                     AVG(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as avg_gastos
                 FROM finanzas_empresa
-                WHERE fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+                WHERE {window}
             """
             
-            params = None
             if company_id:
                 query += " AND empresa_id = %s"
-                params = (company_id,)
+                params.append(company_id)
             
-            query += " GROUP BY MONTH(fecha)"
+            query += f" GROUP BY {self.dialect.month_start()}"
             
-            results = self.db.execute_query(query, params)
+            results = (yield query, tuple(params))
             
             if not results:
                 return {
@@ -475,6 +827,8 @@ class FinancialDataQueries:
             logger.error(f"Error projecting cash flow: {e}")
             raise
     
+    @cached('get_personal_balance')
+    @query_plan
     def get_personal_balance(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get current balance for personal finances.
@@ -499,7 +853,7 @@ class FinancialDataQueries:
                 query += " WHERE id_usuario = %s"
                 params = (user_id,)
             
-            result = self.db.execute_query(query, params)
+            result = (yield query, params)
             
             if result:
                 return {
@@ -514,6 +868,7 @@ class FinancialDataQueries:
             logger.error(f"Error getting personal balance: {e}")
             raise
     
+    @query_plan
     def compare_budget_vs_actual(
         self,
         company_id: Optional[str] = None,
@@ -538,17 +893,16 @@ class FinancialDataQueries:
                 year = datetime.now().year
             
             # This assumes you have a budget table - adjust as needed
-            query = """
+            window, params = month_window(year, month)
+            query = f"""
                 SELECT 
                     categoria,
                     SUM(monto) as gasto_real
                 FROM finanzas_empresa
                 WHERE tipo = 'gasto'
-                    AND MONTH(fecha) = %s
-                    AND YEAR(fecha) = %s
+                    AND {window}
             """
             
-            params = [month, year]
             
             if company_id:
                 query += " AND empresa_id = %s"
@@ -556,7 +910,7 @@ class FinancialDataQueries:
             
             query += " GROUP BY categoria"
             
-            results = self.db.execute_query(query, tuple(params))
+            results = (yield query, tuple(params))
             
             return {
                 'mes': month,
@@ -574,6 +928,8 @@ class FinancialDataQueries:
             logger.error(f"Error comparing budget: {e}")
             raise
     
+    @query_plan
+    @analytical
     def get_monthly_trends(
         self,
         company_id: Optional[str] = None,
@@ -590,26 +946,41 @@ class FinancialDataQueries:
             List of monthly summaries
         """
         try:
-            query = """
-                SELECT 
-                    YEAR(fecha) as año,
-                    MONTH(fecha) as mes,
-                    SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as ingresos,
-                    SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as gastos,
-                    SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance
-                FROM finanzas_empresa
-                WHERE fecha >= DATE_SUB(NOW(), INTERVAL %s MONTH)
-            """
+            if self._use_rollup():
+                query = f"""
+                    SELECT 
+                        CAST(LEFT(anio_mes, 4) AS UNSIGNED) as año,
+                        CAST(RIGHT(anio_mes, 2) AS UNSIGNED) as mes,
+                        SUM(CASE WHEN tipo = 'ingreso' THEN total ELSE 0 END) as ingresos,
+                        SUM(CASE WHEN tipo = 'gasto' THEN total ELSE 0 END) as gastos,
+                        SUM(CASE WHEN tipo = 'ingreso' THEN total ELSE -total END) as balance
+                    FROM {ROLLUP_TABLE}
+                    WHERE anio_mes >= %s
+                """
+                group_by = " GROUP BY anio_mes ORDER BY anio_mes"
+                params = [month_key_since(months_back)]
+            else:
+                window, params = since_month(months_back)
+                query = f"""
+                    SELECT 
+                        {self.dialect.year()} as año,
+                        {self.dialect.month()} as mes,
+                        SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as ingresos,
+                        SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as gastos,
+                        SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance
+                    FROM finanzas_empresa
+                    WHERE {window}
+                """
+                group_by = f" GROUP BY {self.dialect.year()}, {self.dialect.month()} ORDER BY año, mes"
             
-            params = [months_back]
             
             if company_id:
                 query += " AND empresa_id = %s"
                 params.append(company_id)
             
-            query += " GROUP BY YEAR(fecha), MONTH(fecha) ORDER BY año, mes"
+            query += group_by
             
-            results = self.db.execute_query(query, tuple(params))
+            results = (yield query, tuple(params))
             
             return [
                 {
@@ -626,6 +997,240 @@ class FinancialDataQueries:
             logger.error(f"Error getting monthly trends: {e}")
             raise
     
+    @query_plan
+    @analytical
+    def get_monthly_series(
+        self,
+        company_id: Optional[str],
+        tipo: str,
+        months_back: int = 24,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Monthly totals of one transaction type over the last N months.
+        
+        Args:
+            company_id: Optional company ID filter
+            tipo: 'ingreso' or 'gasto'
+            months_back: Number of months to include
+            category: Optional category filter
+        
+        Returns:
+            List of {'mes': 'YYYY-MM-01', 'total'} in chronological order
+        """
+        if self._use_rollup():
+            query = (
+                f"SELECT {self.dialect.key_to_month_start('anio_mes')} AS mes, SUM(total) AS total "
+                f"FROM {ROLLUP_TABLE} "
+                "WHERE tipo = %s AND anio_mes >= %s"
+            )
+            group_by = " GROUP BY anio_mes ORDER BY anio_mes"
+            window = month_key_since(months_back)
+        else:
+            query = (
+                f"SELECT {self.dialect.month_start()} AS mes, SUM(monto) AS total "
+                "FROM finanzas_empresa "
+                "WHERE tipo = %s AND fecha >= %s"
+            )
+            group_by = " GROUP BY mes ORDER BY mes"
+            window = month_floor(months_back=months_back)
+        
+        params: list[Any] = [tipo, window]
+        if company_id:
+            query += " AND empresa_id = %s"
+            params.append(company_id)
+        if category:
+            query += " AND categoria = %s"
+            params.append(category)
+        
+        rows = (yield query + group_by, tuple(params))
+        return [{'mes': r['mes'], 'total': float(r['total'] or 0)} for r in rows]
+    
+    @query_plan
+    @analytical
+    def get_monthly_totals_all_categories(
+        self,
+        company_id: Optional[str],
+        tipo: str = 'gasto',
+        months_back: int = 24
+    ) -> List[Dict[str, Any]]:
+        """
+        Monthly totals for every category in one grouped query.
+        
+        Args:
+            company_id: Optional company ID filter
+            tipo: 'ingreso' or 'gasto'
+            months_back: Number of months to include
+        
+        Returns:
+            List of {'categoria', 'mes': 'YYYY-MM-01', 'total'}
+        """
+        if self._use_rollup():
+            query = (
+                f"SELECT categoria, {self.dialect.key_to_month_start('anio_mes')} AS mes, SUM(total) AS total "
+                f"FROM {ROLLUP_TABLE} "
+                "WHERE tipo = %s AND anio_mes >= %s"
+            )
+            group_by = " GROUP BY categoria, anio_mes"
+            window = month_key_since(months_back)
+        else:
+            query = (
+                f"SELECT categoria, {self.dialect.month_start()} AS mes, SUM(monto) AS total "
+                "FROM finanzas_empresa "
+                "WHERE tipo = %s AND fecha >= %s"
+            )
+            group_by = " GROUP BY categoria, mes"
+            window = month_floor(months_back=months_back)
+        
+        params: list[Any] = [tipo, window]
+        if company_id:
+            query += " AND empresa_id = %s"
+            params.append(company_id)
+        
+        rows = (yield query + group_by, tuple(params))
+        return [
+            {'categoria': r['categoria'] or 'Sin categoría', 'mes': r['mes'], 'total': float(r['total'] or 0)}
+            for r in rows
+        ]
+    
+    @query_plan
+    @analytical
+    def get_monthly_flows(
+        self,
+        company_id: Optional[str] = None,
+        months_back: int = 12
+    ) -> List[Dict[str, Any]]:
+        """
+        Monthly income/expense totals over the last N months.
+        
+        Args:
+            company_id: Optional company ID filter
+            months_back: Number of months to include
+        
+        Returns:
+            List of {'mes', 'ingresos', 'gastos', 'n_ingresos', 'n_gastos'} in chronological order
+        """
+        if self._use_rollup():
+            query = (
+                f"SELECT {self.dialect.key_to_month_start('anio_mes')} AS mes, "
+                "SUM(CASE WHEN tipo = 'ingreso' THEN total ELSE 0 END) AS ingresos, "
+                "SUM(CASE WHEN tipo = 'gasto' THEN total ELSE 0 END) AS gastos, "
+                "SUM(CASE WHEN tipo = 'ingreso' THEN n ELSE 0 END) AS n_ingresos, "
+                "SUM(CASE WHEN tipo = 'gasto' THEN n ELSE 0 END) AS n_gastos "
+                f"FROM {ROLLUP_TABLE} "
+                "WHERE anio_mes >= %s"
+            )
+            group_by = " GROUP BY anio_mes ORDER BY anio_mes"
+            window = month_key_since(months_back)
+        else:
+            query = (
+                f"SELECT {self.dialect.month_start()} AS mes, "
+                "SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) AS ingresos, "
+                "SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) AS gastos, "
+                "SUM(CASE WHEN tipo = 'ingreso' THEN 1 ELSE 0 END) AS n_ingresos, "
+                "SUM(CASE WHEN tipo = 'gasto' THEN 1 ELSE 0 END) AS n_gastos "
+                "FROM finanzas_empresa "
+                "WHERE fecha >= %s"
+            )
+            group_by = " GROUP BY mes ORDER BY mes"
+            window = month_floor(months_back=months_back)
+        
+        params: list[Any] = [window]
+        if company_id:
+            query += " AND empresa_id = %s"
+            params.append(company_id)
+        
+        rows = (yield query + group_by, tuple(params))
+        return [
+            {
+                'mes': r['mes'],
+                'ingresos': float(r['ingresos'] or 0),
+                'gastos': float(r['gastos'] or 0),
+                'n_ingresos': int(r['n_ingresos'] or 0),
+                'n_gastos': int(r['n_gastos'] or 0),
+            }
+            for r in rows
+        ]
+    
+    @query_plan
+    def get_financial_facts(
+        self,
+        company_id: Optional[str] = None,
+        months_back: int = 12
+    ) -> Dict[str, Any]:
+        """
+        Balance, all-time and 6-month totals plus monthly flows, on one connection.
+        
+        This is the shared input of the health-check sub-tools
+        (see tools.financial.facts).
+        
+        Args:
+            company_id: Optional company ID filter
+            months_back: Months of monthly flows to include
+        
+        Returns:
+            Dictionary with totals and 'monthly_flows'
+        """
+        six_months_ago = months_ago(6)
+        query = """
+            SELECT 
+                SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as total_ingresos,
+                SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as total_gastos,
+                SUM(CASE WHEN tipo = 'ingreso' AND fecha >= %s THEN monto ELSE 0 END) as ingresos_6m,
+                SUM(CASE WHEN tipo = 'gasto' AND fecha >= %s THEN monto ELSE 0 END) as gastos_6m
+            FROM finanzas_empresa
+        """
+        params = [six_months_ago, six_months_ago]
+        if company_id:
+            query += " WHERE empresa_id = %s"
+            params.append(company_id)
+        
+        totals = (yield query, tuple(params))
+        row = totals[0] if totals else {}
+        monthly_flows = yield from FinancialDataQueries.get_monthly_flows.plan(self, company_id, months_back)
+        
+        total_ingresos = float(row.get('total_ingresos') or 0)
+        total_gastos = float(row.get('total_gastos') or 0)
+        return {
+            'total_ingresos': total_ingresos,
+            'total_gastos': total_gastos,
+            'balance': total_ingresos - total_gastos,
+            'ingresos_6m': float(row.get('ingresos_6m') or 0),
+            'gastos_6m': float(row.get('gastos_6m') or 0),
+            'monthly_flows': monthly_flows,
+        }
+
+    @query_plan
+    def get_scenario_baseline(
+        self,
+        company_id: Optional[str] = None,
+        months_back: int = 7,
+        with_balance: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Per-category monthly income and expense (plus the balance), on one connection.
+
+        Input of the what-if scenario engine (see forecasting.scenarios).
+        Monthly totals come from the rollup when USE_MONTHLY_ROLLUP is set.
+
+        Args:
+            company_id: Optional company ID filter
+            months_back: Number of months to include
+            with_balance: Also read the current balance
+
+        Returns:
+            Dictionary with 'ingresos' and 'gastos' ({'categoria', 'mes', 'total'} rows)
+            and 'balance' (None when not requested)
+        """
+        ingresos = yield from FinancialDataQueries.get_monthly_totals_all_categories.plan(self, company_id, 'ingreso', months_back)
+        gastos = yield from FinancialDataQueries.get_monthly_totals_all_categories.plan(self, company_id, 'gasto', months_back)
+        balance = None
+        if with_balance:
+            balance = (yield from FinancialDataQueries.get_company_balance.plan(self, company_id))['balance']
+        return {'ingresos': ingresos, 'gastos': gastos, 'balance': balance}
+
+    @query_plan
+    @analytical
     def detect_spending_anomalies(
         self,
         company_id: Optional[str] = None,
@@ -656,7 +1261,7 @@ class FinancialDataQueries:
                 query += " AND empresa_id = %s"
                 params.append(company_id)
             
-            stats = self.db.execute_query(query, tuple(params) if params else None)
+            stats = (yield query, tuple(params) if params else None)
             
             if not stats or not stats[0]['promedio']:
                 return []
@@ -684,7 +1289,7 @@ class FinancialDataQueries:
             
             query += " ORDER BY monto DESC LIMIT 10"
             
-            results = self.db.execute_query(query, tuple(params))
+            results = (yield query, tuple(params))
             
             return [
                 {
@@ -702,6 +1307,42 @@ class FinancialDataQueries:
             logger.error(f"Error detecting anomalies: {e}")
             raise
     
+    @query_plan
+    @analytical
+    def get_multi_window_summary(
+        self,
+        company_id: Optional[str] = None,
+        windows: Sequence[Tuple[Optional[datetime], Optional[datetime]]] = (),
+        entity_type: str = 'company',
+    ) -> List[Dict[str, Any]]:
+        """
+        Get income, expenses, balance and transaction count for N periods in one query.
+        
+        Args:
+            company_id: Optional company ID filter (user ID when entity_type='personal')
+            windows: Sequence of (start_date, end_date) pairs; None means open-ended
+            entity_type: 'company' (finanzas_empresa) or 'personal' (finanzas_personales)
+        
+        Returns:
+            One summary dict per window, in the same order
+        """
+        try:
+            if entity_type == 'personal':
+                table, id_column = 'finanzas_personales', 'id_usuario'
+            else:
+                table, id_column = 'finanzas_empresa', 'empresa_id'
+            query, params = build_multi_window_summary(
+                windows, table=table, id_column=id_column, entity_id=company_id
+            )
+            result = (yield query, params)
+            return parse_multi_window_summary(result[0] if result else None, len(windows))
+            
+        except Exception as e:
+            logger.error(f"Error getting multi-window summary: {e}")
+            raise
+    
+    @query_plan
+    @analytical
     def get_period_summary(
         self,
         company_id: Optional[str] = None,
@@ -744,7 +1385,7 @@ class FinancialDataQueries:
                 query += " AND empresa_id = %s"
                 params.append(company_id)
             
-            result = self.db.execute_query(query, tuple(params) if params else None)
+            result = (yield query, tuple(params) if params else None)
             
             if result:
                 return {
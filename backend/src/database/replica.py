@@ -0,0 +1,358 @@
+"""Local DuckDB replica of the transaction tables for analytical reads."""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .connection import get_db_connection
+from .sql import DUCKDB
+from utils.metrics import record_query
+
+logger = logging.getLogger(__name__)
+
+REPLICATED_TABLES = ('finanzas_empresa', 'finanzas_personales')
+WATERMARK_TABLE = 'replica_watermark'
+
+CREATE_WATERMARK_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+        source_table VARCHAR PRIMARY KEY,
+        last_id BIGINT NOT NULL,
+        synced_at TIMESTAMP NOT NULL
+    )
+"""
+
+# Tipos de MySQL (information_schema.columns.data_type) a DuckDB
+_TYPE_MAP = {
+    'tinyint': 'BIGINT', 'smallint': 'BIGINT', 'mediumint': 'BIGINT', 'int': 'BIGINT', 'bigint': 'BIGINT',
+    'float': 'DOUBLE', 'double': 'DOUBLE',
+    'date': 'DATE', 'datetime': 'TIMESTAMP', 'timestamp': 'TIMESTAMP',
+    'tinyint(1)': 'BOOLEAN',
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def duckdb_type(data_type: str, precision: Optional[int] = None, scale: Optional[int] = None) -> str:
+    """DuckDB column type for a MySQL column; anything textual maps to VARCHAR."""
+    data_type = data_type.lower()
+    if data_type == 'decimal':
+        return f"DECIMAL({min(int(precision or 18), 38)}, {int(scale or 0)})"
+    return _TYPE_MAP.get(data_type, 'VARCHAR')
+
+
+class ReplicaSession:
+    """Same ``execute_query`` contract as DatabaseSession, over a DuckDB cursor."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute_query(self, query: str, params: tuple = None, fetch: bool = True):
+        started = time.perf_counter()
+        self.cursor.execute(DUCKDB.compile(query), DUCKDB.adapt_params(params))
+        if not fetch:
+            record_query(query, time.perf_counter() - started, 0)
+            return 0
+        columns = [d[0] for d in self.cursor.description]
+        rows = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+        record_query(query, time.perf_counter() - started, len(rows))
+        return rows
+
+    def execute_many_queries(self, statements: Sequence[Tuple[str, Optional[tuple]]]) -> List[List[dict]]:
+        return [self.execute_query(query, params) for query, params in statements]
+
+
+class AnalyticalReplica:
+    """
+    DuckDB file mirroring ``finanzas_empresa`` and ``finanzas_personales``.
+
+    ``sync()`` copies rows with ``id`` above each table's watermark in keyset
+    batches, so it can run often. Like the monthly rollup it only sees
+    appended rows: after editing or deleting historical transactions run
+    ``rebuild()``. FinancialDataQueries sends the plans marked ``@analytical``
+    here while the last sync is within ``max_lag`` seconds, and everything
+    else (balances, listings, budgets) to MySQL.
+
+    A DuckDB file accepts a single writer process, so the process that serves
+    reads also keeps it synced (background thread every ``sync_interval``
+    seconds); ``scripts/sync_replica.py`` is for the initial build while the
+    server is stopped.
+    """
+
+    dialect = DUCKDB
+
+    def __init__(
+        self,
+        path: str,
+        enabled: bool = True,
+        max_lag: float = 900.0,
+        sync_interval: float = 300.0,
+        tables: Sequence[str] = REPLICATED_TABLES,
+        source=None,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.max_lag = max_lag
+        self.sync_interval = sync_interval
+        self.tables = tuple(tables)
+        self._source = source
+        self._conn = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at: Optional[float] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stats = {'routed': 0, 'fallbacks': 0, 'syncs': 0, 'rows_synced': 0, 'sync_errors': 0}
+
+    @classmethod
+    def from_env(cls) -> 'AnalyticalReplica':
+        default_path = Path(__file__).resolve().parent.parent.parent / '.replica' / 'finanzas.duckdb'
+        return cls(
+            path=os.getenv('ANALYTICS_REPLICA_PATH', str(default_path)),
+            enabled=_env_bool('ANALYTICS_REPLICA', False),
+            max_lag=float(os.getenv('ANALYTICS_REPLICA_MAX_LAG', 900)),
+            sync_interval=float(os.getenv('ANALYTICS_REPLICA_SYNC_INTERVAL', 300)),
+        )
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = get_db_connection()
+        return self._source
+
+    def _connection(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    import duckdb  # dependencia opcional: solo si la réplica está activa
+
+                    if self.path != ':memory:':
+                        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = duckdb.connect(self.path)
+                    conn.execute(CREATE_WATERMARK_TABLE)
+                    row = conn.execute(f"SELECT MIN(synced_at) FROM {WATERMARK_TABLE}").fetchone()
+                    if row and row[0]:
+                        self._synced_at = row[0].timestamp()
+                    self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def session(self) -> Iterator[ReplicaSession]:
+        """Session on its own DuckDB cursor (one per thread, as DuckDB requires)."""
+        cursor = self._connection().cursor()
+        try:
+            yield ReplicaSession(cursor)
+        finally:
+            cursor.close()
+
+    def execute_query(self, query: str, params: tuple = None, fetch: bool = True):
+        with self.session() as session:
+            return session.execute_query(query, params, fetch)
+
+    # ---- Enrutamiento ----
+
+    def lag_seconds(self) -> Optional[float]:
+        """Seconds since the last completed sync (None if never synced)."""
+        if self._synced_at is None:
+            return None
+        return time.time() - self._synced_at
+
+    def is_fresh(self) -> bool:
+        """Whether analytical reads may be served here right now."""
+        if not self.enabled:
+            return False
+        try:
+            self._connection()
+        except Exception as e:
+            logger.warning(f"Réplica analítica no disponible, se desactiva: {e}")
+            self.enabled = False
+            return False
+        self.start_background_sync()
+        lag = self.lag_seconds()
+        return lag is not None and (self.max_lag <= 0 or lag <= self.max_lag)
+
+    def record_route(self, fallback: bool = False) -> None:
+        with self._lock:
+            self._stats['fallbacks' if fallback else 'routed'] += 1
+
+    def start_background_sync(self) -> None:
+        """Start the periodic sync thread once (no-op when sync_interval <= 0)."""
+        if self.sync_interval <= 0 or self._sync_thread is not None:
+            return
+        with self._lock:
+            if self._sync_thread is not None:
+                return
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='replica-sync', daemon=True)
+            self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Sincronización de la réplica analítica falló: {e}")
+            time.sleep(self.sync_interval)
+
+    # ---- Sincronización ----
+
+    def _source_columns(self, table: str) -> List[Tuple[str, str]]:
+        rows = self.source.execute_query(
+            "SELECT column_name AS c, data_type AS t, column_type AS ct, "
+            "numeric_precision AS p, numeric_scale AS s "
+            "FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s ORDER BY ordinal_position",
+            (table,),
+        )
+        columns = []
+        for r in rows:
+            data_type = 'tinyint(1)' if str(r['ct']).lower() == 'tinyint(1)' else r['t']
+            columns.append((r['c'], duckdb_type(data_type, r['p'], r['s'])))
+        return columns
+
+    def _ensure_table(self, cursor, table: str) -> bool:
+        exists = cursor.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [table]
+        ).fetchone()
+        if exists:
+            return True
+        columns = self._source_columns(table)
+        if not columns:
+            logger.warning(f"Tabla {table} no existe en MySQL; no se replica")
+            return False
+        ddl = ', '.join(f'"{name}" {kind}' for name, kind in columns)
+        cursor.execute(f'CREATE TABLE {table} ({ddl})')
+        return True
+
+    def _sync_table(self, cursor, table: str, batch_size: int) -> Dict[str, Any]:
+        import pandas as pd
+
+        row = cursor.execute(f"SELECT last_id FROM {WATERMARK_TABLE} WHERE source_table = ?", [table]).fetchone()
+        start = last_id = int(row[0]) if row else 0
+        # DuckDB infiere el DECIMAL de un objeto Decimal a partir de una muestra
+        # y falla con valores más grandes; como texto el cast es exacto
+        decimals = [
+            r[0] for r in cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = ? AND data_type LIKE 'DECIMAL%'", [table]
+            ).fetchall()
+        ]
+        copied = 0
+        while True:
+            rows = self.source.execute_query(
+                f"SELECT * FROM {table} WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch_size)
+            )
+            if not rows:
+                break
+            batch = pd.DataFrame.from_records(rows, columns=list(rows[0].keys()))
+            for column in decimals:
+                if column in batch:
+                    batch[column] = batch[column].map(lambda v: None if v is None else str(v))
+            high = int(rows[-1]['id'])
+            # Lote y watermark en la misma transacción de DuckDB
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                cursor.register('replica_batch', batch)
+                cursor.execute(f"INSERT INTO {table} BY NAME SELECT * FROM replica_batch")
+                cursor.unregister('replica_batch')
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO {WATERMARK_TABLE} VALUES (?, ?, ?)", [table, high, datetime.now()]
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            last_id = high
+            copied += len(rows)
+            if len(rows) < batch_size:
+                break
+        # Sin filas nuevas también cuenta como sincronizado
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {WATERMARK_TABLE} VALUES (?, ?, ?)", [table, last_id, datetime.now()]
+        )
+        return {'from_id': start, 'to_id': last_id, 'rows': copied}
+
+    def sync(self, batch_size: int = 50000) -> Dict[str, Dict[str, Any]]:
+        """
+        Copy rows appended since the last sync, table by table.
+
+        Returns:
+            {table: {'from_id', 'to_id', 'rows'}} for the tables replicated
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._sync_lock, self.session() as session:
+            cursor = session.cursor
+            try:
+                for table in self.tables:
+                    if self._ensure_table(cursor, table):
+                        result[table] = self._sync_table(cursor, table, batch_size)
+            except Exception:
+                with self._lock:
+                    self._stats['sync_errors'] += 1
+                raise
+            with self._lock:
+                self._synced_at = time.time()
+                self._stats['syncs'] += 1
+                self._stats['rows_synced'] += sum(r['rows'] for r in result.values())
+        copied = sum(r['rows'] for r in result.values())
+        if copied:
+            logger.info(f"Réplica analítica sincronizada: {copied} filas nuevas")
+        return result
+
+    def rebuild(self, batch_size: int = 50000) -> Dict[str, Dict[str, Any]]:
+        """Drop the replicated tables and copy everything again (after updates/deletes in MySQL)."""
+        with self._sync_lock, self.session() as session:
+            for table in self.tables:
+                session.cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            session.cursor.execute(f"DELETE FROM {WATERMARK_TABLE}")
+            self._synced_at = None
+        return self.sync(batch_size)
+
+    def status(self) -> Dict[str, Any]:
+        """Watermark and row count per table, plus lag."""
+        tables = {}
+        with self.session() as session:
+            marks = {
+                r['source_table']: r
+                for r in session.execute_query(f"SELECT source_table, last_id, synced_at FROM {WATERMARK_TABLE}")
+            }
+            for table in self.tables:
+                mark = marks.get(table)
+                tables[table] = {
+                    'last_id': int(mark['last_id']) if mark else 0,
+                    'synced_at': mark['synced_at'].isoformat() if mark else None,
+                }
+                if mark:
+                    tables[table]['rows'] = session.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n']
+        lag = self.lag_seconds()
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'lag_seconds': round(lag, 1) if lag is not None else None,
+            'tables': tables,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        lag = self.lag_seconds()
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled, lag_seconds=round(lag, 1) if lag is not None else None)
+
+
+_replica: Optional[AnalyticalReplica] = None
+_replica_lock = threading.Lock()
+
+
+def get_analytical_replica() -> AnalyticalReplica:
+    """Get the process-wide analytical replica (disabled unless ANALYTICS_REPLICA is set)."""
+    global _replica
+    if _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                _replica = AnalyticalReplica.from_env()
+    return _replica
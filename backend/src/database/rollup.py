@@ -0,0 +1,185 @@
+"""Materialized monthly rollup of finanzas_empresa."""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = 'finanzas_rollup_mensual'
+WATERMARK_TABLE = 'finanzas_rollup_watermark'
+SOURCE_TABLE = 'finanzas_empresa'
+
+# `year_month` es palabra reservada en MySQL, de ahí `anio_mes` ('YYYY-MM').
+CREATE_ROLLUP_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        empresa_id VARCHAR(50) NOT NULL DEFAULT '',
+        anio_mes CHAR(7) NOT NULL,
+        tipo VARCHAR(20) NOT NULL,
+        categoria VARCHAR(100) NOT NULL DEFAULT '',
+        total DECIMAL(18, 2) NOT NULL DEFAULT 0,
+        n INT NOT NULL DEFAULT 0,
+        suma_cuadrados DOUBLE NOT NULL DEFAULT 0,
+        PRIMARY KEY (empresa_id, anio_mes, tipo, categoria),
+        INDEX idx_rollup_mes (anio_mes)
+    )
+"""
+
+CREATE_WATERMARK_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+        source_table VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+STAGING_TABLE = f'{ROLLUP_TABLE}_nuevo'
+RETIRED_TABLE = f'{ROLLUP_TABLE}_viejo'
+
+
+def _upsert_batch(table: str) -> str:
+    """Aggregate source rows with id in (%s, %s] and merge them into ``table``."""
+    return f"""
+        INSERT INTO {table} (empresa_id, anio_mes, tipo, categoria, total, n, suma_cuadrados)
+        SELECT
+            COALESCE(empresa_id, ''),
+            DATE_FORMAT(fecha, '%Y-%m'),
+            tipo,
+            COALESCE(categoria, ''),
+            SUM(monto),
+            COUNT(*),
+            SUM(monto * monto)
+        FROM {SOURCE_TABLE}
+        WHERE id > %s AND id <= %s
+        GROUP BY 1, 2, 3, 4
+        ON DUPLICATE KEY UPDATE
+            total = total + VALUES(total),
+            n = n + VALUES(n),
+            suma_cuadrados = suma_cuadrados + VALUES(suma_cuadrados)
+    """
+
+
+_SET_WATERMARK = (
+    f"INSERT INTO {WATERMARK_TABLE} (source_table, last_id) VALUES (%s, %s) "
+    f"ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)"
+)
+
+
+def rollup_enabled() -> bool:
+    """Whether monthly aggregates should be read from the rollup (USE_MONTHLY_ROLLUP)."""
+    return os.getenv('USE_MONTHLY_ROLLUP', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class MonthlyRollup:
+    """
+    Maintains ``finanzas_rollup_mensual``: one row per
+    (empresa_id, anio_mes, tipo, categoria) with sum, count and sum of squares.
+
+    Refreshes are incremental: rows with ``id`` above the stored watermark are
+    aggregated and merged with ``ON DUPLICATE KEY UPDATE``, in id batches so a
+    first build over a large table does not hold one huge transaction. The
+    watermark only sees appended rows; after editing or deleting historical
+    transactions run ``rebuild()``.
+
+    Readers filter the rollup by whole months (``anio_mes >= 'YYYY-MM'``);
+    the raw-table paths use the same window (``sql.since_month``), so both
+    return the same months.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or get_db_connection()
+
+    def ensure_schema(self) -> None:
+        """Create the rollup and watermark tables if they do not exist."""
+        with self.db.session() as session:
+            session.execute_query(CREATE_ROLLUP_TABLE, fetch=False)
+            session.execute_query(CREATE_WATERMARK_TABLE, fetch=False)
+
+    def watermark(self) -> int:
+        rows = self.db.execute_query(
+            f"SELECT last_id FROM {WATERMARK_TABLE} WHERE source_table = %s",
+            (SOURCE_TABLE,)
+        )
+        return int(rows[0]['last_id']) if rows else 0
+
+    def _max_source_id(self) -> int:
+        rows = self.db.execute_query(f"SELECT MAX(id) AS max_id FROM {SOURCE_TABLE}")
+        return int(rows[0]['max_id'] or 0) if rows else 0
+
+    def refresh(self, batch_size: int = 50000) -> Dict[str, Any]:
+        """
+        Fold rows appended since the last refresh into the rollup.
+
+        Returns:
+            Dictionary with the previous/new watermark and batches applied
+        """
+        self.ensure_schema()
+        start = self.watermark()
+        target = self._max_source_id()
+        upsert = _upsert_batch(ROLLUP_TABLE)
+
+        batches = 0
+        low = start
+        while low < target:
+            high = min(low + batch_size, target)
+            # Agregado y watermark en la misma sesión: se confirman juntos
+            with self.db.session() as session:
+                session.execute_query(upsert, (low, high), fetch=False)
+                session.execute_query(_SET_WATERMARK, (SOURCE_TABLE, high), fetch=False)
+            low = high
+            batches += 1
+
+        if batches:
+            logger.info(f"Rollup mensual actualizado: id {start} -> {target} ({batches} lotes)")
+        return {'from_id': start, 'to_id': max(start, target), 'batches': batches}
+
+    def rebuild(self, batch_size: int = 50000) -> Dict[str, Any]:
+        """
+        Recompute the rollup from scratch (after updates/deletes in the source).
+
+        The new aggregate is built in a staging table and swapped in with one
+        ``RENAME TABLE``, so readers see either the old rollup or the complete
+        new one, never an empty or half-built table.
+        """
+        self.ensure_schema()
+        with self.db.session() as session:
+            session.execute_query(f"DROP TABLE IF EXISTS {STAGING_TABLE}", fetch=False)
+            session.execute_query(f"CREATE TABLE {STAGING_TABLE} LIKE {ROLLUP_TABLE}", fetch=False)
+
+        target = self._max_source_id()
+        upsert = _upsert_batch(STAGING_TABLE)
+        batches = 0
+        for low in range(0, target, batch_size):
+            with self.db.session() as session:
+                session.execute_query(upsert, (low, min(low + batch_size, target)), fetch=False)
+            batches += 1
+
+        # Las filas con id > target quedan para el siguiente refresh incremental
+        with self.db.session() as session:
+            session.execute_query(f"DROP TABLE IF EXISTS {RETIRED_TABLE}", fetch=False)
+            session.execute_query(
+                f"RENAME TABLE {ROLLUP_TABLE} TO {RETIRED_TABLE}, {STAGING_TABLE} TO {ROLLUP_TABLE}",
+                fetch=False
+            )
+            session.execute_query(_SET_WATERMARK, (SOURCE_TABLE, target), fetch=False)
+            session.execute_query(f"DROP TABLE {RETIRED_TABLE}", fetch=False)
+
+        logger.info(f"Rollup mensual reconstruido: id 0 -> {target} ({batches} lotes)")
+        return {'from_id': 0, 'to_id': target, 'batches': batches}
+
+    def status(self) -> Dict[str, Optional[Any]]:
+        """Watermark, pending rows and last refresh time."""
+        rows = self.db.execute_many_queries([
+            (f"SELECT last_id, refreshed_at FROM {WATERMARK_TABLE} WHERE source_table = %s", (SOURCE_TABLE,)),
+            (f"SELECT MAX(id) AS max_id FROM {SOURCE_TABLE}", None),
+        ])
+        mark, source = rows
+        last_id = int(mark[0]['last_id']) if mark else 0
+        max_id = int(source[0]['max_id'] or 0) if source else 0
+        return {
+            'enabled': rollup_enabled(),
+            'last_id': last_id,
+            'pending_rows_upper_bound': max(0, max_id - last_id),
+            'refreshed_at': mark[0]['refreshed_at'].isoformat() if mark and mark[0]['refreshed_at'] else None,
+        }
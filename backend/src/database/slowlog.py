@@ -0,0 +1,263 @@
+"""Slow-query log: statements over a threshold, their EXPLAIN and a rolling top-N."""
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.metrics import fingerprint, fingerprint_id
+
+logger = logging.getLogger(__name__)
+
+# Funciones sobre la columna de fecha: impiden usar el índice de `fecha`
+_NON_SARGABLE = re.compile(
+    r'\b(DATE_FORMAT|DATE_TRUNC|MONTH|YEAR|DATE|EXTRACT|TO_CHAR)\s*\(\s*[^)]*?\bfecha\b',
+    re.IGNORECASE,
+)
+_WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+_CLAUSE_END = re.compile(r'\b(GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION)\b|\)\s*,|\)\s*SELECT\b', re.IGNORECASE)
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def params_shape(params: Optional[Sequence[Any]]) -> List[str]:
+    """Type of each parameter (never the values), e.g. ['str', 'date', 'int']."""
+    if not params:
+        return []
+    if isinstance(params, dict):
+        return [f"{k}:{type(v).__name__}" for k, v in params.items()]
+    return [type(p).__name__ for p in params]
+
+
+def non_sargable_predicates(sql: str) -> List[str]:
+    """Names of date functions applied to `fecha` inside WHERE clauses (GROUP BY buckets are fine)."""
+    found = set()
+    for where in _WHERE.finditer(sql):
+        end = _CLAUSE_END.search(sql, where.end())
+        clause = sql[where.end():end.start() if end else len(sql)]
+        found.update(m.group(1).upper() for m in _NON_SARGABLE.finditer(clause))
+    return sorted(found)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode(errors='replace')
+    return str(value)
+
+
+class SlowQueryLog:
+    """
+    Records statements slower than ``threshold_ms``.
+
+    Each slow execution is appended to a JSONL file (statement, parameter
+    types, duration, rows and non-sargable date predicates). With
+    ``explain=True`` the plan of each SELECT fingerprint is captured once and
+    stored with its first entry. An in-memory top-N by total time is kept
+    for the running process; ``scripts/slow_queries.py`` aggregates the file
+    across processes.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 200.0,
+        explain: bool = False,
+        top_n: int = 50,
+        log_path: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.top_n = top_n
+        self.log_path = Path(log_path) if log_path else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._top: Dict[str, Dict[str, Any]] = {}
+        self._explained: Dict[str, Any] = {}
+
+    @classmethod
+    def from_env(cls) -> 'SlowQueryLog':
+        default_path = Path(__file__).resolve().parent.parent.parent / 'logs' / 'slow_queries.jsonl'
+        return cls(
+            threshold_ms=float(os.getenv('DB_SLOW_QUERY_MS', 200)),
+            explain=_env_bool('DB_SLOW_QUERY_EXPLAIN', False),
+            top_n=int(os.getenv('DB_SLOW_QUERY_TOP', 50)),
+            log_path=os.getenv('DB_SLOW_QUERY_LOG', str(default_path)) or None,
+            enabled=_env_bool('DB_SLOW_QUERY_ENABLED', True),
+        )
+
+    def observe(
+        self,
+        sql: str,
+        params: Optional[Sequence[Any]],
+        seconds: float,
+        rows: int,
+        run_explain: Optional[Callable[[str, Optional[Sequence[Any]]], List[dict]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record one execution if it exceeded the threshold.
+
+        ``run_explain(sql, params)`` executes EXPLAIN on the caller's
+        connection; it is only called when explain is enabled, the statement
+        is a SELECT and its fingerprint has not been explained yet.
+        """
+        duration_ms = seconds * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return None
+
+        fp = fingerprint(sql)
+        query_id = fingerprint_id(fp)
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'id': query_id,
+            'fingerprint': fp,
+            'statement': ' '.join(sql.split())[:2000],
+            'params_shape': params_shape(params),
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+        }
+        warnings = non_sargable_predicates(sql)
+        if warnings:
+            entry['non_sargable'] = warnings
+
+        if self.explain and run_explain is not None and _EXPLAINABLE.match(sql):
+            with self._lock:
+                need_plan = query_id not in self._explained
+                if need_plan:
+                    self._explained[query_id] = None
+            if need_plan:
+                try:
+                    plan = run_explain(sql, params)
+                    entry['explain'] = plan
+                    with self._lock:
+                        self._explained[query_id] = plan
+                except Exception as e:
+                    logger.debug(f"EXPLAIN failed for {query_id}: {e}")
+
+        self._update_top(entry)
+        self._append(entry)
+        logger.warning(f"Slow query {query_id} ({duration_ms:.0f} ms, {rows} filas): {entry['statement'][:200]}")
+        return entry
+
+    def _update_top(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._top.get(entry['id'])
+            if stats is None:
+                stats = self._top[entry['id']] = {
+                    'id': entry['id'],
+                    'fingerprint': entry['fingerprint'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'non_sargable': entry.get('non_sargable', []),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += entry['duration_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['duration_ms'])
+            stats['rows'] += entry['rows']
+            stats['last_seen'] = entry['ts']
+            if 'explain' in entry:
+                stats['explain'] = entry['explain']
+            # Se conservan algunas de más para que el ranking no dependa del orden de llegada
+            if len(self._top) > self.top_n * 2:
+                keep = sorted(self._top.values(), key=lambda s: s['total_ms'], reverse=True)[:self.top_n]
+                self._top = {s['id']: s for s in keep}
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self.log_path is None:
+            return
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(entry, ensure_ascii=False, default=_json_default)
+            with self._lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            logger.debug(f"Could not write slow query log {self.log_path}: {e}")
+
+    def top(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Slow statements of this process ranked by total time."""
+        with self._lock:
+            ranked = sorted(self._top.values(), key=lambda s: s['total_ms'], reverse=True)
+            return [dict(s, avg_ms=round(s['total_ms'] / s['count'], 2)) for s in ranked[:n or self.top_n]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'threshold_ms': self.threshold_ms,
+                'explain': self.explain,
+                'tracked': len(self._top),
+                'slow_executions': sum(s['count'] for s in self._top.values()),
+            }
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    """Entries of a slow-query JSONL file (unreadable lines are skipped)."""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def aggregate(entries: Sequence[Dict[str, Any]], top_n: int = 20, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Top-N fingerprints by total time from log entries."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        if since and entry.get('ts', '') < since:
+            continue
+        s = stats.get(entry['id'])
+        if s is None:
+            s = stats[entry['id']] = {
+                'id': entry['id'],
+                'fingerprint': entry['fingerprint'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'rows': 0,
+                'params_shape': entry.get('params_shape', []),
+                'non_sargable': entry.get('non_sargable', []),
+            }
+        s['count'] += 1
+        s['total_ms'] += entry['duration_ms']
+        s['max_ms'] = max(s['max_ms'], entry['duration_ms'])
+        s['rows'] += entry.get('rows', 0)
+        s['last_seen'] = entry.get('ts')
+        if 'explain' in entry:
+            s['explain'] = entry['explain']
+    ranked = sorted(stats.values(), key=lambda s: s['total_ms'], reverse=True)[:top_n]
+    for s in ranked:
+        s['avg_ms'] = round(s['total_ms'] / s['count'], 2)
+        s['total_ms'] = round(s['total_ms'], 2)
+    return ranked
+
+
+_slow_log: Optional[SlowQueryLog] = None
+_slow_log_lock = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """Get the process-wide slow-query log singleton."""
+    global _slow_log
+    if _slow_log is None:
+        with _slow_log_lock:
+            if _slow_log is None:
+                _slow_log = SlowQueryLog.from_env()
+    return _slow_log
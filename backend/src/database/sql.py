@@ -0,0 +1,136 @@
+"""
+Dialect-aware SQL helpers for date buckets, relative windows and conditional sums.
+
+Queries are written with ``%s`` placeholders. Date windows are computed in
+Python and passed as parameters (``fecha >= %s``), never as functions
+applied to ``fecha``. That keeps every filter sargable, so an
+``(entity, fecha)`` index can serve it on any backend. Only the SELECT/GROUP
+BY month bucket depends on the dialect.
+"""
+import re
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+Fragment = Tuple[str, List[Any]]
+
+_PLACEHOLDER = re.compile(r'%s')
+
+
+class Dialect:
+    """MySQL (mysql-connector / aiomysql): the production backend."""
+
+    name = 'mysql'
+    qmark = False
+
+    def month_start(self, column: str = 'fecha') -> str:
+        """Expression for the first day of the month as 'YYYY-MM-01' text."""
+        return f"DATE_FORMAT({column}, '%Y-%m-01')"
+
+    def month_key(self, column: str = 'fecha') -> str:
+        """Expression for the month as 'YYYY-MM' text."""
+        return f"DATE_FORMAT({column}, '%Y-%m')"
+
+    def key_to_month_start(self, column: str = 'anio_mes') -> str:
+        """'YYYY-MM' key column (rollup, generated column) to 'YYYY-MM-01' text."""
+        return self.concat(column, "'-01'")
+
+    def year(self, column: str = 'fecha') -> str:
+        return f"YEAR({column})"
+
+    def month(self, column: str = 'fecha') -> str:
+        return f"MONTH({column})"
+
+    def concat(self, *parts: str) -> str:
+        return f"CONCAT({', '.join(parts)})"
+
+    def compile(self, sql: str) -> str:
+        """Translate ``%s`` placeholders to the driver's style."""
+        return _PLACEHOLDER.sub('?', sql) if self.qmark else sql
+
+    def adapt_params(self, params: Optional[Sequence[Any]]) -> tuple:
+        return tuple(params or ())
+
+
+class DuckDBDialect(Dialect):
+    """DuckDB (analytical replica / tests)."""
+
+    name = 'duckdb'
+    qmark = True
+
+    def month_start(self, column: str = 'fecha') -> str:
+        return f"strftime({column}, '%Y-%m-01')"
+
+    def month_key(self, column: str = 'fecha') -> str:
+        return f"strftime({column}, '%Y-%m')"
+
+    def concat(self, *parts: str) -> str:
+        return ' || '.join(parts)
+
+
+MYSQL = Dialect()
+DUCKDB = DuckDBDialect()
+
+_DIALECTS = {d.name: d for d in (MYSQL, DUCKDB)}
+
+
+def get_dialect(name: str = 'mysql') -> Dialect:
+    """Dialect by name ('mysql' or 'duckdb')."""
+    name = name.strip().lower()
+    try:
+        return _DIALECTS[name]
+    except KeyError:
+        raise ValueError(f"Dialecto SQL no soportado: {name}")
+
+
+# ---- Ventanas de fecha (independientes del dialecto) ----
+
+def months_ago(months: int, now: Optional[datetime] = None) -> datetime:
+    """``now`` minus N calendar months (what ``DATE_SUB(NOW(), INTERVAL N MONTH)`` returns)."""
+    return (now or datetime.now()) - relativedelta(months=months)
+
+
+def month_floor(value: Optional[datetime] = None, months_back: int = 0) -> date:
+    """First day of the month ``months_back`` months before ``value``."""
+    value = value or datetime.now()
+    return (value - relativedelta(months=months_back)).date().replace(day=1)
+
+
+def since(months: int, column: str = 'fecha', now: Optional[datetime] = None) -> Fragment:
+    """``column >= now - N months``."""
+    return f"{column} >= %s", [months_ago(months, now)]
+
+
+def since_month(months: int, column: str = 'fecha', now: Optional[datetime] = None) -> Fragment:
+    """``column >=`` first day of the month N months ago: whole months, the same window as the rollup."""
+    return f"{column} >= %s", [month_floor(now, months)]
+
+
+def month_window(year: int, month: int, column: str = 'fecha') -> Fragment:
+    """Half-open range covering one calendar month (replaces MONTH()/YEAR() filters)."""
+    start = date(year, month, 1)
+    return f"{column} >= %s AND {column} < %s", [start, start + relativedelta(months=1)]
+
+
+def current_month(column: str = 'fecha', now: Optional[datetime] = None) -> Fragment:
+    now = now or datetime.now()
+    return month_window(now.year, now.month, column)
+
+
+def month_key_since(months: int, now: Optional[datetime] = None) -> str:
+    """'YYYY-MM' of ``now`` minus N months, for filters on month-key columns (anio_mes)."""
+    return month_floor(now, months).strftime('%Y-%m')
+
+
+def sum_if(condition: str, value: str = 'monto', alias: Optional[str] = None, otherwise: str = '0') -> str:
+    """``SUM(CASE WHEN condition THEN value ELSE otherwise END) [AS alias]``."""
+    expr = f"SUM(CASE WHEN {condition} THEN {value} ELSE {otherwise} END)"
+    return f"{expr} AS {alias}" if alias else expr
+
+
+def where(*fragments: Fragment) -> Fragment:
+    """AND-join fragments into ``' WHERE ...'`` (empty when there are none)."""
+    clauses = [sql for sql, _ in fragments if sql]
+    params = [p for _, ps in fragments for p in ps]
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
@@ -0,0 +1,18 @@
+"""Time-series forecasting helpers shared by the predictive tools."""
+from .registry import ModelRegistry, get_model_registry, model_entity
+from .engine import (
+    Forecast, forecast_series, to_monthly_series, validate_accuracy, FAST, FULL, METHODOLOGY
+)
+
+__all__ = [
+    'ModelRegistry',
+    'get_model_registry',
+    'model_entity',
+    'Forecast',
+    'forecast_series',
+    'to_monthly_series',
+    'FAST',
+    'FULL',
+    'METHODOLOGY',
+    'validate_accuracy'
+]
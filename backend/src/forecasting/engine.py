@@ -0,0 +1,96 @@
+"""Tiered forecasting engine: closed-form NumPy by default, SARIMA on request."""
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+import numpy as np
+
+from .registry import get_model_registry
+from .vectorized import trend_seasonal
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FAST = 'fast'
+FULL = 'full'
+ACCURACY_LEVELS = (FAST, FULL)
+
+# SARIMA (1,1,1)x(0,1,1,12) necesita al menos dos temporadas para ser fiable
+MIN_SARIMA_MONTHS = 24
+
+# Descripción legible de cada método, para el campo "methodology" de las herramientas
+METHODOLOGY = {
+    'sarima': 'SARIMA Time Series Forecast (Seasonal AutoRegressive Integrated Moving Average)',
+    'linear_trend_seasonal': 'Tendencia lineal + índices estacionales (cerrado, NumPy)',
+    'linear_trend': 'Tendencia lineal (cerrado, NumPy)',
+    'mean': 'Promedio histórico',
+}
+
+
+@dataclass
+class Forecast:
+    """Point forecast plus how it was produced."""
+
+    values: np.ndarray
+    method: str
+    elapsed_ms: float
+    fallback_reason: Optional[str] = None
+
+    def rounded(self, digits: int = 2) -> list:
+        return [round(float(v), digits) for v in self.values]
+
+
+def to_monthly_series(rows: Iterable[Dict], value_key: str = 'total', date_key: str = 'mes') -> 'pd.Series':
+    """Continuous month-start series from query rows; missing months are 0."""
+    import pandas as pd
+
+    rows = list(rows)
+    if not rows:
+        return pd.Series(dtype=float)
+    index = pd.to_datetime([str(r[date_key])[:7] + '-01' for r in rows])
+    values = [float(r[value_key] or 0) for r in rows]
+    return pd.Series(values, index=index).groupby(level=0).sum().resample('MS').sum()
+
+
+def validate_accuracy(accuracy: str) -> str:
+    if accuracy not in ACCURACY_LEVELS:
+        raise ValueError(f'accuracy debe ser uno de {ACCURACY_LEVELS}')
+    return accuracy
+
+
+def forecast_series(
+    series: 'pd.Series',
+    steps: int,
+    accuracy: str = FAST,
+    entity: Optional[str] = None,
+    series_name: str = 'series',
+) -> Forecast:
+    """
+    Forecast ``steps`` periods of a monthly series.
+
+    ``fast`` uses the closed-form trend + seasonal indices (tens of
+    microseconds to a few milliseconds). ``full`` uses SARIMA through the
+    model registry when there are at least MIN_SARIMA_MONTHS of history and
+    otherwise falls back to ``fast``, reporting why.
+    """
+    validate_accuracy(accuracy)
+    started = time.perf_counter()
+    fallback_reason = None
+
+    if accuracy == FULL:
+        if len(series) >= MIN_SARIMA_MONTHS:
+            predicted = get_model_registry().forecast(entity, series_name, series, steps=steps)
+            return Forecast(
+                values=predicted.to_numpy(dtype=float),
+                method='sarima',
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+            )
+        fallback_reason = f"SARIMA requiere {MIN_SARIMA_MONTHS} meses de historia ({len(series)} disponibles)"
+
+    values, info = trend_seasonal(series.to_numpy(dtype=float)[None, :], steps)
+    return Forecast(
+        values=values[0],
+        method=info.get('method', 'mean'),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        fallback_reason=fallback_reason,
+    )
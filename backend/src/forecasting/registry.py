@@ -0,0 +1,209 @@
+"""Registry of fitted SARIMA models keyed by entity, series and data watermark."""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.offload import get_offload_pool
+
+if TYPE_CHECKING:
+    # pandas y statsmodels tardan ~1 s en importarse: solo se cargan al ajustar un modelo
+    import pandas as pd
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ORDER = (1, 1, 1)
+DEFAULT_SEASONAL_ORDER = (0, 1, 1, 12)
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def model_entity(entity_type: str = 'company', entity_id: Optional[str] = None) -> str:
+    """Entity part of a model key, the same for every tool that forecasts its series."""
+    return f"{entity_type}:{entity_id or 'all'}"
+
+
+def series_watermark(series: 'pd.Series') -> str:
+    """Fingerprint of the data a model was fitted on (changes when any month changes)."""
+    values = np.round(series.to_numpy(dtype=float), 2)
+    digest = hashlib.sha1(values.tobytes())
+    digest.update(str(series.index[-1] if len(series) else '').encode())
+    return digest.hexdigest()[:16]
+
+
+def _build_model(series: 'pd.Series', order: Tuple[int, int, int], seasonal_order: Tuple[int, int, int, int]) -> 'SARIMAX':
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    return SARIMAX(
+        series,
+        order=order,
+        seasonal_order=seasonal_order,
+        enforce_stationarity=False,
+        enforce_invertibility=False,
+    )
+
+
+def fit_sarima_params(
+    series: 'pd.Series',
+    order: Tuple[int, int, int],
+    seasonal_order: Tuple[int, int, int, int],
+    start_params: Optional[list] = None,
+) -> list:
+    """Fit SARIMAX and return only its parameters (runs inside the offload pool)."""
+    model = _build_model(series, order, seasonal_order)
+    start = np.asarray(start_params) if start_params is not None else None
+    return [float(p) for p in model.fit(start_params=start, disp=False).params]
+
+
+class ModelRegistry:
+    """
+    Keeps fitted SARIMAX results so a repeat forecast only calls get_forecast.
+
+    Lookup order for ``(entity, series_name, watermark)``:
+
+    1. In-memory results (LRU) -> returned as is.
+    2. Parameters on disk for the same watermark -> ``model.smooth(params)``,
+       which runs the Kalman filter once without optimizing.
+    3. Parameters from an older watermark -> ``fit(start_params=...)``, a
+       warm start that usually converges in a few iterations.
+    4. Otherwise a cold ``fit``.
+
+    Fits (3, 4) run in the offload process pool and may raise its
+    busy/timeout errors.
+
+    Only parameters are persisted (JSON), never pickled model objects.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 256):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self._results: 'OrderedDict[Tuple[str, str, str, str], Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'warm_starts': 0,
+            'cold_fits': 0,
+        }
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> 'ModelRegistry':
+        default_dir = Path(__file__).resolve().parent.parent.parent / '.model_cache'
+        return cls(
+            cache_dir=os.getenv('FORECAST_MODEL_DIR', str(default_dir)) or None,
+            max_entries=int(os.getenv('FORECAST_MODEL_CACHE_SIZE', 256)),
+        )
+
+    def _path(self, entity: str, series_name: str, spec: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        name = _SAFE_NAME.sub('_', f"{entity}__{series_name}__{spec}")
+        return self.cache_dir / f"{name}.json"
+
+    def _load_params(self, path: Optional[Path]) -> Optional[Dict[str, Any]]:
+        if path is None or not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model params {path}: {e}")
+            return None
+
+    def _save_params(self, path: Optional[Path], watermark: str, params: np.ndarray) -> None:
+        if path is None:
+            return
+        try:
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'watermark': watermark, 'params': [float(p) for p in params]}))
+            tmp.replace(path)
+        except Exception as e:
+            logger.warning(f"Could not persist model params {path}: {e}")
+
+    def get_results(
+        self,
+        entity: Optional[str],
+        series_name: str,
+        series: 'pd.Series',
+        order: Tuple[int, int, int] = DEFAULT_ORDER,
+        seasonal_order: Tuple[int, int, int, int] = DEFAULT_SEASONAL_ORDER,
+    ):
+        """Return fitted SARIMAX results for ``series``, reusing previous work when possible."""
+        entity = str(entity or 'all')
+        spec = f"{'-'.join(map(str, order))}_{'-'.join(map(str, seasonal_order))}"
+        watermark = series_watermark(series)
+        key = (entity, series_name, spec, watermark)
+
+        with self._lock:
+            results = self._results.get(key)
+            if results is not None:
+                self._results.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return results
+
+        model = _build_model(series, order, seasonal_order)
+        path = self._path(entity, series_name, spec)
+        stored = self._load_params(path)
+
+        if stored and stored.get('watermark') == watermark and len(stored['params']) == len(model.start_params):
+            params = stored['params']
+            stat = 'disk_hits'
+        else:
+            # La optimización es lo caro: se hace en el pool de procesos
+            start_params = stored['params'] if stored and len(stored['params']) == len(model.start_params) else None
+            params = get_offload_pool().run(fit_sarima_params, series, order, seasonal_order, start_params)
+            stat = 'warm_starts' if start_params is not None else 'cold_fits'
+            self._save_params(path, watermark, np.asarray(params))
+
+        # smooth() solo corre el filtro de Kalman con los parámetros dados
+        results = model.smooth(np.asarray(params))
+
+        with self._lock:
+            self._stats[stat] += 1
+            # Solo la versión más reciente de cada serie se queda en memoria
+            for stale in [k for k in self._results if k[:3] == key[:3]]:
+                del self._results[stale]
+            self._results[key] = results
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return results
+
+    def forecast(
+        self,
+        entity: Optional[str],
+        series_name: str,
+        series: 'pd.Series',
+        steps: int,
+        order: Tuple[int, int, int] = DEFAULT_ORDER,
+        seasonal_order: Tuple[int, int, int, int] = DEFAULT_SEASONAL_ORDER,
+    ) -> 'pd.Series':
+        """Point forecast for the next ``steps`` periods."""
+        results = self.get_results(entity, series_name, series, order, seasonal_order)
+        return results.get_forecast(steps=steps).predicted_mean
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'in_memory': len(self._results), **self._stats}
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry singleton."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry.from_env()
+    return _registry
@@ -0,0 +1,250 @@
+"""
+What-if scenarios evaluated together as one (scenarios x months) NumPy matrix.
+
+The baseline is the average monthly income and expense, overall and per
+category, of the last complete months. Each scenario shocks it with
+percentage and absolute changes, per-category changes and one-off events.
+Shocks are additive over the baseline (a -10% expense change and a +5% in
+one category do not compound). The balance paths of every scenario are a
+single cumulative sum along the month axis.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vectorized import pivot_monthly
+
+MAX_SCENARIOS = 20
+TIPOS = ('ingreso', 'gasto')
+
+
+def _number(data: Mapping[str, Any], key: str, where: str) -> float:
+    value = data.get(key, 0) or 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{where}: {key} debe ser un número")
+    return float(value)
+
+
+def _month(data: Mapping[str, Any], key: str, where: str, default: Optional[int] = None) -> int:
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{where}: {key} debe ser un entero >= 1")
+    return value
+
+
+@dataclass(frozen=True)
+class Baseline:
+    """Average monthly flows the scenarios start from."""
+
+    income: float
+    expense: float
+    balance: float
+    # Meses promediados ('YYYY-MM-01'); vacío si no hay historia
+    months: Tuple[str, ...] = ()
+    # tipo -> {categoria: promedio mensual}
+    categories: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(
+        cls,
+        income_rows: Iterable[Dict[str, Any]],
+        expense_rows: Iterable[Dict[str, Any]],
+        months: Sequence[str],
+        balance: float,
+    ) -> 'Baseline':
+        """
+        Average ``{'categoria', 'mes', 'total'}`` rows over ``months``.
+
+        Leading months without any movement are skipped, so a company with
+        three months of history is not averaged against zeros.
+        """
+        pivots = {
+            'ingreso': pivot_monthly(income_rows, 'categoria', months),
+            'gasto': pivot_monthly(expense_rows, 'categoria', months),
+        }
+        activity = sum(matrix.sum(axis=0) for _, matrix in pivots.values())
+        observed = np.flatnonzero(activity)
+        if not observed.size:
+            return cls(income=0.0, expense=0.0, balance=balance)
+
+        first = int(observed[0])
+        categories = {
+            tipo: {label: float(value) for label, value in zip(labels, matrix[:, first:].mean(axis=1))}
+            for tipo, (labels, matrix) in pivots.items()
+        }
+        return cls(
+            income=sum(categories['ingreso'].values()),
+            expense=sum(categories['gasto'].values()),
+            balance=balance,
+            months=tuple(months[first:]),
+            categories=categories,
+        )
+
+
+@dataclass(frozen=True)
+class CategoryChange:
+    category: str
+    tipo: str = 'gasto'
+    pct: float = 0.0
+    amount: float = 0.0
+
+
+@dataclass(frozen=True)
+class Event:
+    """One-off movement in a month (positive: entrada, negative: salida)."""
+
+    month: int
+    amount: float
+    description: str = ''
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    income_pct: float = 0.0
+    expense_pct: float = 0.0
+    income_change: float = 0.0
+    expense_change: float = 0.0
+    # Primer mes (1 = el próximo) en que rigen los cambios recurrentes
+    start_month: int = 1
+    category_changes: Tuple[CategoryChange, ...] = ()
+    events: Tuple[Event, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], index: int) -> 'Scenario':
+        """
+        Build a scenario from a tool argument.
+
+        Raises:
+            ValueError: on non-numeric values, bad months or an unknown tipo
+        """
+        if not isinstance(data, Mapping):
+            raise ValueError(f"El escenario {index + 1} debe ser un objeto")
+        name = str(data.get('name') or f"escenario_{index + 1}")
+
+        changes = []
+        for item in data.get('category_changes') or ():
+            if not isinstance(item, Mapping) or not item.get('category'):
+                raise ValueError(f"{name}: cada category_changes necesita 'category'")
+            tipo = item.get('tipo', 'gasto')
+            if tipo not in TIPOS:
+                raise ValueError(f"{name}: tipo debe ser 'ingreso' o 'gasto'")
+            where = f"{name}/{item['category']}"
+            changes.append(CategoryChange(
+                category=str(item['category']),
+                tipo=tipo,
+                pct=_number(item, 'pct', where),
+                amount=_number(item, 'amount', where),
+            ))
+
+        events = []
+        for item in data.get('events') or ():
+            if not isinstance(item, Mapping):
+                raise ValueError(f"{name}: cada evento debe ser un objeto")
+            events.append(Event(
+                month=_month(item, 'month', f"{name}/evento"),
+                amount=_number(item, 'amount', f"{name}/evento"),
+                description=str(item.get('description') or ''),
+            ))
+
+        return cls(
+            name=name,
+            income_pct=_number(data, 'income_pct', name),
+            expense_pct=_number(data, 'expense_pct', name),
+            income_change=_number(data, 'income_change', name),
+            expense_change=_number(data, 'expense_change', name),
+            start_month=_month(data, 'start_month', name, default=1),
+            category_changes=tuple(changes),
+            events=tuple(events),
+        )
+
+    def check(self, baseline: Baseline, months: int) -> None:
+        """Raise ValueError for months past the horizon or % changes on unknown categories."""
+        if self.start_month > months:
+            raise ValueError(f"{self.name}: start_month {self.start_month} fuera del horizonte de {months} meses")
+        for event in self.events:
+            if event.month > months:
+                raise ValueError(f"{self.name}: evento en el mes {event.month} fuera del horizonte de {months} meses")
+        for change in self.category_changes:
+            known = baseline.categories.get(change.tipo, {})
+            # Un monto fijo puede abrir una categoría nueva; un porcentaje no
+            if change.pct and change.category not in known:
+                raise ValueError(
+                    f"{self.name}: la categoría '{change.category}' ({change.tipo}) no tiene historia; "
+                    f"conocidas: {', '.join(sorted(known)) or 'ninguna'}"
+                )
+
+
+@dataclass(frozen=True)
+class ScenarioGrid:
+    """Monthly paths, one row per scenario and one column per month."""
+
+    income: np.ndarray
+    expense: np.ndarray
+    events: np.ndarray
+    net: np.ndarray
+    balance: np.ndarray
+
+    def summary(self) -> Dict[str, np.ndarray]:
+        """Per-scenario figures, computed over the whole grid at once."""
+        negative = self.balance < 0
+        return {
+            'final_balance': self.balance[:, -1],
+            'total_net_flow': self.net.sum(axis=1),
+            'min_balance': self.balance.min(axis=1),
+            'min_balance_month': self.balance.argmin(axis=1) + 1,
+            # 0 = el balance nunca queda negativo
+            'first_negative_month': np.where(negative.any(axis=1), negative.argmax(axis=1) + 1, 0),
+        }
+
+
+def simulate(baseline: Baseline, scenarios: Sequence[Scenario], months: int, start_balance: float) -> ScenarioGrid:
+    """
+    Evaluate every scenario over ``months`` months in one pass.
+
+    Per-category changes become a (scenarios x categories) matrix applied to
+    the baseline category vector; shocked flows are clipped at zero.
+    """
+    n = len(scenarios)
+    base = np.array([baseline.income, baseline.expense])
+    pct = np.array([[s.income_pct, s.expense_pct] for s in scenarios]).reshape(n, 2) / 100
+    change = np.array([[s.income_change, s.expense_change] for s in scenarios]).reshape(n, 2)
+
+    keys = sorted({(c.tipo, c.category) for s in scenarios for c in s.category_changes})
+    category_delta = np.zeros((n, 2))
+    if keys:
+        column = {key: j for j, key in enumerate(keys)}
+        cat_pct = np.zeros((n, len(keys)))
+        cat_amount = np.zeros((n, len(keys)))
+        for i, scenario in enumerate(scenarios):
+            for c in scenario.category_changes:
+                cat_pct[i, column[(c.tipo, c.category)]] += c.pct / 100
+                cat_amount[i, column[(c.tipo, c.category)]] += c.amount
+        cat_base = np.array([baseline.categories.get(tipo, {}).get(name, 0.0) for tipo, name in keys])
+        delta = cat_pct * cat_base + cat_amount
+        is_income = np.array([tipo == 'ingreso' for tipo, _ in keys])
+        category_delta = np.stack([delta[:, is_income].sum(axis=1), delta[:, ~is_income].sum(axis=1)], axis=1)
+
+    shocked = np.maximum(base * (1 + pct) + change + category_delta, 0)
+
+    # Antes de start_month cada escenario sigue en la base
+    active = np.arange(1, months + 1)[None, :] >= np.array([s.start_month for s in scenarios])[:, None]
+    income = np.where(active, shocked[:, :1], base[0])
+    expense = np.where(active, shocked[:, 1:], base[1])
+
+    events = np.zeros((n, months))
+    cells = [(i, e.month - 1, e.amount) for i, s in enumerate(scenarios) for e in s.events]
+    if cells:
+        r, c, v = zip(*cells)
+        np.add.at(events, (np.array(r), np.array(c)), np.array(v))
+
+    net = income - expense + events
+    return ScenarioGrid(
+        income=income,
+        expense=expense,
+        events=events,
+        net=net,
+        balance=start_balance + np.cumsum(net, axis=1),
+    )
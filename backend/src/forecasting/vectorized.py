@@ -0,0 +1,140 @@
+"""NumPy forecasters that run over many monthly series at once (one row per series)."""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+SEASON = 12
+
+# Rejilla pequeña de parámetros compartidos; se elige la de menor error
+# a un paso sumado sobre todas las series
+_ALPHAS = (0.2, 0.4, 0.6)
+_BETAS = (0.0, 0.1)
+_GAMMAS = (0.1, 0.3)
+
+
+def pivot_monthly(rows: Iterable[Dict], key: str, months: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Turn ``[{key, 'mes', 'total'}, ...]`` into (labels, matrix[len(labels), len(months)]).
+
+    Months without rows are filled with 0.
+    """
+    position = {m: i for i, m in enumerate(months)}
+    labels: List[str] = []
+    index: Dict[str, int] = {}
+    cells = []
+    for row in rows:
+        label = row[key]
+        if label not in index:
+            index[label] = len(labels)
+            labels.append(label)
+        col = position.get(str(row['mes'])[:7] + '-01')
+        if col is not None:
+            cells.append((index[label], col, float(row['total'] or 0)))
+
+    matrix = np.zeros((len(labels), len(months)))
+    if cells:
+        r, c, v = zip(*cells)
+        np.add.at(matrix, (np.array(r), np.array(c)), np.array(v))
+    return labels, matrix
+
+
+def seasonal_naive(matrix: np.ndarray, steps: int, season: int = SEASON) -> np.ndarray:
+    """Repeat the last observed season (needs ``season`` columns)."""
+    last = matrix[:, -season:]
+    reps = int(np.ceil(steps / season))
+    return np.tile(last, reps)[:, :steps]
+
+
+def _holt_winters(matrix: np.ndarray, alpha: float, beta: float, gamma: float, season: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Additive Holt-Winters over every row; returns (level, trend, seasonals, sse)."""
+    n_series, n = matrix.shape
+    first = matrix[:, :season]
+    level = first.mean(axis=1)
+    if n >= 2 * season:
+        trend = (matrix[:, season:2 * season].mean(axis=1) - level) / season
+    else:
+        trend = np.zeros(n_series)
+    seasonals = first - level[:, None]
+    sse = np.zeros(n_series)
+
+    for t in range(season, n):
+        s_idx = t % season
+        y = matrix[:, t]
+        prediction = level + trend + seasonals[:, s_idx]
+        sse += (y - prediction) ** 2
+        new_level = alpha * (y - seasonals[:, s_idx]) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonals[:, s_idx] = gamma * (y - new_level) + (1 - gamma) * seasonals[:, s_idx]
+        level = new_level
+    return level, trend, seasonals, sse
+
+
+def holt_winters(matrix: np.ndarray, steps: int, season: int = SEASON) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Additive Holt-Winters with parameters shared by every series.
+
+    Each time step updates all rows with one vector operation, so cost is
+    O(months x parameter grid) regardless of the number of series. Needs at
+    least ``season + 1`` columns; with exactly one season it falls back to
+    seasonal-naive, and with less to the mean.
+    """
+    n_series, n = matrix.shape
+    if n_series == 0:
+        return np.zeros((0, steps)), {}
+    if n == season:
+        return seasonal_naive(matrix, steps, season), {'method': 'seasonal_naive'}
+    if n < season:
+        mean = matrix.mean(axis=1, keepdims=True)
+        return np.repeat(mean, steps, axis=1), {'method': 'mean'}
+
+    best = None
+    for alpha in _ALPHAS:
+        for beta in _BETAS:
+            for gamma in _GAMMAS:
+                level, trend, seasonals, sse = _holt_winters(matrix.copy(), alpha, beta, gamma, season)
+                total = float(sse.sum())
+                if best is None or total < best[0]:
+                    best = (total, alpha, beta, gamma, level, trend, seasonals)
+
+    _, alpha, beta, gamma, level, trend, seasonals = best
+    horizon = np.arange(1, steps + 1)
+    season_idx = (n + horizon - 1) % season
+    forecast = level[:, None] + trend[:, None] * horizon[None, :] + seasonals[:, season_idx]
+    # Un gasto no puede ser negativo
+    return np.maximum(forecast, 0.0), {'method': 'holt_winters', 'alpha': alpha, 'beta': beta, 'gamma': gamma}
+
+
+def trend_seasonal(matrix: np.ndarray, steps: int, season: int = SEASON) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Closed-form linear trend plus additive seasonal indices, per row.
+
+    The trend is an OLS line fitted to every row at once; seasonal indices
+    are the mean detrended residual of each month-of-year (only with two
+    full seasons of history). O(rows x months), no iteration.
+    """
+    n_series, n = matrix.shape
+    if n_series == 0:
+        return np.zeros((0, steps)), {}
+    if n < 3:
+        mean = matrix.mean(axis=1, keepdims=True) if n else np.zeros((n_series, 1))
+        return np.repeat(mean, steps, axis=1), {'method': 'mean'}
+
+    t = np.arange(n, dtype=float)
+    t_centered = t - t.mean()
+    slope = (matrix - matrix.mean(axis=1, keepdims=True)) @ t_centered / (t_centered @ t_centered)
+    intercept = matrix.mean(axis=1) - slope * t.mean()
+
+    future = np.arange(n, n + steps, dtype=float)
+    forecast = intercept[:, None] + slope[:, None] * future[None, :]
+
+    method = 'linear_trend'
+    if n >= 2 * season:
+        residuals = matrix - (intercept[:, None] + slope[:, None] * t[None, :])
+        positions = np.arange(n) % season
+        indices = np.stack([residuals[:, positions == p].mean(axis=1) for p in range(season)], axis=1)
+        indices -= indices.mean(axis=1, keepdims=True)
+        forecast += indices[:, future.astype(int) % season]
+        method = 'linear_trend_seasonal'
+
+    # Igual que holt_winters: una tendencia a la baja no produce montos negativos
+    return np.maximum(forecast, 0.0), {'method': method}
@@ -3,32 +3,25 @@ Servidor MCP sobre HTTP usando FastMCP.
 Este servidor implementa el protocolo MCP completo pero usando HTTP como transporte.
 """
 
+import json
 import logging
-from typing import Optional
-from fastmcp import FastMCP
-
-from database import get_db_connection
-from tools.financial.balance import get_company_balance_tool, get_personal_balance_tool
-from tools.financial.expense import get_expenses_by_category_tool
-from tools.financial.projection import get_cash_flow_projection_tool, simulate_scenario_tool
-from tools.financial.budget import get_budget_comparison_tool
-from tools.financial.risk import (
-    get_financial_health_score_tool,
-    assess_financial_risk_tool,
-    get_alerts_tool,
-    get_stress_test_tool,
-)
-from tools.financial.analytics import (
-    get_spending_trends_tool,
-    get_category_recommendations_tool,
-    detect_anomalies_tool,
-    compare_periods_tool,
-)
-from tools.financial.predictive import predict_cash_shortage_tool
-from tools.financial.financial_plan import generate_financial_plan_tool
-from tools.financial.shortcuts import get_current_month_spending_summary
-from tools.financial.investment import get_investment_recommendations_tool
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+from fastmcp.tools.base import ToolResult
+from mcp.types import TextContent
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from tools.financial.descriptive import stream_transactions
+from tools.registry import get_tool_registry
 from utils import setup_logger
+from utils.offload import get_offload_pool
+from utils.metrics import current_invocation, get_metrics
+from utils.shaping import ShapeOptions, dumps, shape, size_of, with_shaping_schema
+from utils.startup import get_startup_state
 
 # Setup logger
 logger = setup_logger('mcp_http_server', logging.INFO)
@@ -54,10 +47,135 @@ mcp = FastMCP(
 )
 
 
+class MetricsMiddleware(Middleware):
+    """Registra tiempo, tiempo en BD, consultas, filas y tamaño de respuesta por herramienta."""
+
+    async def on_call_tool(self, context, call_next):
+        metrics = get_metrics()
+        with metrics.tool_timer(context.message.name) as invocation:
+            result = await call_next(context)
+            invocation.payload_bytes = sum(
+                len(getattr(block, 'text', '').encode()) for block in result.content
+            )
+            structured = result.structured_content
+            invocation.error = isinstance(structured, dict) and structured.get('success') is False
+            return result
+
+
+class ShapingMiddleware(Middleware):
+    """
+    Argumentos fields/encoding en todas las herramientas (utils.shaping).
+
+    Se quitan antes de validar los argumentos de la herramienta y se aplican
+    al resultado; el tamaño original queda en las métricas como ahorro.
+    """
+
+    async def on_list_tools(self, context, call_next):
+        tools = await call_next(context)
+        return [tool.model_copy(update={'parameters': with_shaping_schema(tool.parameters)}) for tool in tools]
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            options = ShapeOptions.pop_from(context.message.arguments)
+        except ValueError as e:
+            raise ToolError(str(e))
+        result = await call_next(context)
+        structured = result.structured_content
+        if (options.is_default and not options.pretty) or not isinstance(structured, dict):
+            return result
+        invocation = current_invocation()
+        if invocation is not None:
+            invocation.payload_raw_bytes = sum(size_of(getattr(block, 'text', '')) for block in result.content)
+        shaped = shape(structured, options)
+        return ToolResult(
+            content=[TextContent(type='text', text=dumps(shaped, pretty=options.pretty))],
+            structured_content=shaped,
+        )
+
+
+# Metrics envuelve a Shaping: mide la respuesta ya reformateada
+mcp.add_middleware(MetricsMiddleware())
+mcp.add_middleware(ShapingMiddleware())
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request):
+    """Métricas en formato de texto de Prometheus; ?format=json devuelve el snapshot."""
+    if request.query_params.get('format') == 'json':
+        return JSONResponse(get_metrics().snapshot())
+    return PlainTextResponse(
+        get_metrics().render_prometheus(),
+        media_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health_endpoint(request: Request):
+    """Liveness: el proceso responde (no toca la base de datos)."""
+    return JSONResponse({'status': 'ok', 'uptime_s': get_startup_state().status()['uptime_s']})
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready_endpoint(request: Request):
+    """Readiness: 200 cuando el warm-up terminó (pool de BD listo), 503 mientras tanto."""
+    state = get_startup_state()
+    return JSONResponse(state.status(), status_code=200 if state.ready else 503)
+
+
+def _ndjson(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    """Una transacción por línea; la última línea resume (o informa el error, ya enviado el 200)."""
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for batch in batches:
+            rows += len(batch)
+            yield ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in batch).encode()
+        yield (json.dumps({'done': True, 'rows': rows, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}) + '\n').encode()
+    except Exception as e:
+        logger.error(f"Error exportando transacciones tras {rows} filas: {e}")
+        yield (json.dumps({'done': False, 'rows': rows, 'error': str(e)}, ensure_ascii=False) + '\n').encode()
+    finally:
+        # Cliente desconectado: liberar la conexión sin esperar al GC
+        batches.close()
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value not in (None, '') else None
+
+
+@mcp.custom_route("/export/transactions", methods=["GET"])
+async def export_transactions_endpoint(request: Request):
+    """
+    Exporta transacciones como NDJSON en streaming (mismos filtros que list_transactions).
+
+    Lee con un cursor del lado del servidor en lotes de `batch_size`: la
+    memoria no crece con el número de filas y el primer lote llega enseguida.
+    """
+    q = request.query_params
+    try:
+        batches = stream_transactions(
+            entity_type=q.get('entity_type', 'company'),
+            entity_id=q.get('entity_id'),
+            start_date=q.get('start_date'),
+            end_date=q.get('end_date'),
+            category=q.get('category'),
+            min_amount=_optional_float(q.get('min_amount')),
+            max_amount=_optional_float(q.get('max_amount')),
+            type=q.get('type'),
+            batch_size=int(q.get('batch_size', 1000)),
+            max_rows=int(q['max_rows']) if q.get('max_rows') else None,
+        )
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    logger.info(f"Exportando transacciones en streaming: {dict(q)}")
+    # Iterador síncrono: Starlette lo recorre en su pool de hilos
+    return StreamingResponse(_ndjson(batches), media_type='application/x-ndjson')
+
+
 # ==================== HERRAMIENTAS DE BALANCE ====================
 
 @mcp.tool()
-def get_company_balance(company_id: Optional[str] = None) -> dict:
+async def get_company_balance(company_id: Optional[str] = None) -> dict:
     """
     Obtiene el balance financiero actual de una empresa.
     
@@ -71,11 +189,11 @@ def get_company_balance(company_id: Optional[str] = None) -> dict:
         Diccionario con balance_total, ingresos_totales, gastos_totales y detalles
     """
     logger.info(f"Ejecutando get_company_balance para company_id={company_id}")
-    return get_company_balance_tool(company_id=company_id)
+    return await get_tool_registry().run("get_company_balance", company_id=company_id)
 
 
 @mcp.tool()
-def get_personal_balance(user_id: Optional[str] = None) -> dict:
+async def get_personal_balance(user_id: Optional[str] = None) -> dict:
     """
     Obtiene el balance financiero personal de un usuario.
     
@@ -88,13 +206,13 @@ def get_personal_balance(user_id: Optional[str] = None) -> dict:
         Diccionario con balance_total, ingresos_totales, gastos_totales y detalles
     """
     logger.info(f"Ejecutando get_personal_balance para user_id={user_id}")
-    return get_personal_balance_tool(user_id=user_id)
+    return await get_tool_registry().run("get_personal_balance", user_id=user_id)
 
 
 # ==================== ANÁLISIS DE GASTOS ====================
 
 @mcp.tool()
-def analyze_expenses_by_category(
+async def analyze_expenses_by_category(
     company_id: Optional[str] = None,
     user_id: Optional[str] = None,
     start_date: Optional[str] = None,
@@ -116,7 +234,8 @@ def analyze_expenses_by_category(
         Diccionario con categorías, totales y porcentajes de gasto
     """
     logger.info(f"Ejecutando analyze_expenses_by_category: company={company_id}, user={user_id}, dates={start_date} to {end_date}")
-    return get_expenses_by_category_tool(
+    return await get_tool_registry().run(
+        "analyze_expenses_by_category",
         company_id=company_id,
         user_id=user_id,
         start_date=start_date,
@@ -127,9 +246,10 @@ def analyze_expenses_by_category(
 # ==================== PROYECCIONES ====================
 
 @mcp.tool()
-def project_cash_flow(
+async def project_cash_flow(
     company_id: Optional[str] = None,
-    months: int = 3
+    months: int = 3,
+    accuracy: str = "fast"
 ) -> dict:
     """
     Proyecta el flujo de caja futuro basándose en el histórico.
@@ -140,49 +260,66 @@ def project_cash_flow(
     Args:
         company_id: ID de la empresa (opcional)
         months: Número de meses a proyectar (1-24, default: 3)
+        accuracy: 'fast' (tendencia + estacionalidad, milisegundos) o 'full' (SARIMA)
     
     Returns:
         Diccionario con proyecciones mensuales y recomendaciones
     """
     logger.info(f"Ejecutando project_cash_flow: company={company_id}, months={months}")
-    return get_cash_flow_projection_tool(company_id=company_id, months=months)
+    # Con accuracy='full' el ajuste SARIMA corre en el pool de procesos; si
+    # el cliente se desconecta, el trabajo pendiente se cancela
+    return await get_tool_registry().run(
+        "project_cash_flow", company_id=company_id, months=months, accuracy=accuracy
+    )
 
 
 @mcp.tool()
-def simulate_financial_scenario(
-    current_balance: float,
+async def simulate_financial_scenario(
+    current_balance: Optional[float] = None,
     monthly_income_change: float = 0,
     monthly_expense_change: float = 0,
-    months: int = 6
+    months: int = 6,
+    company_id: Optional[str] = None,
+    scenarios: Optional[List[Dict[str, Any]]] = None,
+    baseline_months: int = 6
 ) -> dict:
     """
-    Simula un escenario 'what-if' financiero.
+    Simula escenarios 'what-if' financieros sobre la base real.
     
-    Permite probar cambios en ingresos o gastos mensuales y ver
-    el impacto proyectado en el balance a lo largo de varios meses.
+    La base es el promedio mensual de ingresos y gastos (total y por
+    categoría) de los últimos meses completos. Todos los escenarios se
+    evalúan en una sola llamada y se comparan contra la base sin cambios.
     
     Args:
-        current_balance: Balance actual de inicio
-        monthly_income_change: Cambio en ingresos mensuales (puede ser negativo)
-        monthly_expense_change: Cambio en gastos mensuales (puede ser negativo)
+        current_balance: Balance de inicio (default: el balance actual)
+        monthly_income_change: Cambio en ingresos mensuales si no se pasa scenarios
+        monthly_expense_change: Cambio en gastos mensuales si no se pasa scenarios
         months: Número de meses a simular (1-24, default: 6)
+        company_id: ID de la empresa (opcional)
+        scenarios: Lista de escenarios {name, income_pct, expense_pct, income_change,
+            expense_change, start_month, category_changes, events}
+        baseline_months: Meses completos promediados para la base (1-24, default: 6)
     
     Returns:
-        Diccionario con proyección del escenario simulado
+        Diccionario con la base y la proyección de cada escenario
     """
-    logger.info(f"Ejecutando simulate_financial_scenario: balance={current_balance}, months={months}")
-    return simulate_scenario_tool(
+    logger.info(f"Ejecutando simulate_financial_scenario: company={company_id}, months={months}, scenarios={len(scenarios or [])}")
+    return await get_tool_registry().run(
+        "simulate_financial_scenario",
         current_balance=current_balance,
         monthly_income_change=monthly_income_change,
         monthly_expense_change=monthly_expense_change,
-        months=months
+        months=months,
+        company_id=company_id,
+        scenarios=scenarios,
+        baseline_months=baseline_months
     )
 
 
 # ==================== PRESUPUESTO ====================
 
 @mcp.tool()
-def compare_budget_vs_actual(
+async def compare_budget_vs_actual(
     company_id: Optional[str] = None,
     month: Optional[int] = None,
     year: Optional[int] = None
@@ -202,13 +339,13 @@ def compare_budget_vs_actual(
         Diccionario con comparación presupuesto vs real por categoría
     """
     logger.info(f"Ejecutando compare_budget_vs_actual: company={company_id}, {month}/{year}")
-    return get_budget_comparison_tool(company_id=company_id, month=month, year=year)
+    return await get_tool_registry().run("compare_budget_vs_actual", company_id=company_id, month=month, year=year)
 
 
 # ==================== SALUD FINANCIERA ====================
 
 @mcp.tool()
-def get_financial_health_score(
+async def get_financial_health_score(
     company_id: Optional[str] = None,
     user_id: Optional[str] = None
 ) -> dict:
@@ -226,13 +363,13 @@ def get_financial_health_score(
         Diccionario con score, nivel de salud y recomendaciones
     """
     logger.info(f"Ejecutando get_financial_health_score: company={company_id}, user={user_id}")
-    return get_financial_health_score_tool(company_id=company_id, user_id=user_id)
+    return await get_tool_registry().run("get_financial_health_score", company_id=company_id, user_id=user_id)
 
 
 # ==================== TENDENCIAS ====================
 
 @mcp.tool()
-def get_spending_trends(
+async def get_spending_trends(
     company_id: Optional[str] = None,
     months_back: int = 6
 ) -> dict:
@@ -250,13 +387,13 @@ def get_spending_trends(
         Diccionario con tendencias mensuales y análisis de patrones
     """
     logger.info(f"Ejecutando get_spending_trends: company={company_id}, months_back={months_back}")
-    return get_spending_trends_tool(company_id=company_id, months_back=months_back)
+    return await get_tool_registry().run("get_spending_trends", company_id=company_id, months_back=months_back)
 
 
 # ==================== RECOMENDACIONES ====================
 
 @mcp.tool()
-def get_category_recommendations(
+async def get_category_recommendations(
     company_id: Optional[str] = None,
     top_n: int = 5
 ) -> dict:
@@ -274,13 +411,13 @@ def get_category_recommendations(
         Diccionario con recomendaciones por categoría
     """
     logger.info(f"Ejecutando get_category_recommendations: company={company_id}, top_n={top_n}")
-    return get_category_recommendations_tool(company_id=company_id, top_n=top_n)
+    return await get_tool_registry().run("get_category_recommendations", company_id=company_id, top_n=top_n)
 
 
 # ==================== DETECCIÓN DE ANOMALÍAS ====================
 
 @mcp.tool()
-def detect_anomalies(
+async def detect_anomalies(
     company_id: Optional[str] = None,
     threshold: float = 2.0
 ) -> dict:
@@ -298,13 +435,13 @@ def detect_anomalies(
         Diccionario con anomalías detectadas y análisis
     """
     logger.info(f"Ejecutando detect_anomalies: company={company_id}, threshold={threshold}")
-    return detect_anomalies_tool(company_id=company_id, threshold=threshold)
+    return await get_tool_registry().run("detect_anomalies", company_id=company_id, threshold=threshold)
 
 
 # ==================== COMPARACIÓN DE PERÍODOS ====================
 
 @mcp.tool()
-def compare_periods(
+async def compare_periods(
     company_id: Optional[str] = None,
     period1_start: str = None,
     period1_end: str = None,
@@ -328,7 +465,8 @@ def compare_periods(
         Diccionario con comparación entre períodos
     """
     logger.info(f"Ejecutando compare_periods: company={company_id}")
-    return compare_periods_tool(
+    return await get_tool_registry().run(
+        "compare_periods",
         company_id=company_id,
         period1_start=period1_start,
         period1_end=period1_end,
@@ -340,7 +478,7 @@ def compare_periods(
 # ==================== EVALUACIÓN DE RIESGOS ====================
 
 @mcp.tool()
-def assess_financial_risk(company_id: Optional[str] = None) -> dict:
+async def assess_financial_risk(company_id: Optional[str] = None) -> dict:
     """
     Evalúa el nivel de riesgo financiero general.
     
@@ -354,11 +492,11 @@ def assess_financial_risk(company_id: Optional[str] = None) -> dict:
         Diccionario con nivel de riesgo, score y factores de riesgo
     """
     logger.info(f"Ejecutando assess_financial_risk: company={company_id}")
-    return assess_financial_risk_tool(company_id=company_id)
+    return await get_tool_registry().run("assess_financial_risk", company_id=company_id)
 
 
 @mcp.tool()
-def get_alerts(
+async def get_alerts(
     company_id: Optional[str] = None,
     severity: Optional[str] = None
 ) -> dict:
@@ -376,13 +514,14 @@ def get_alerts(
         Diccionario con alertas activas y recomendaciones
     """
     logger.info(f"Ejecutando get_alerts: company={company_id}, severity={severity}")
-    return get_alerts_tool(company_id=company_id, severity=severity)
+    return await get_tool_registry().run("get_alerts", company_id=company_id, severity=severity)
 
 
 @mcp.tool()
-def predict_cash_shortage(
+async def predict_cash_shortage(
     company_id: Optional[str] = None,
-    months_ahead: int = 6
+    months_ahead: int = 6,
+    accuracy: str = "fast"
 ) -> dict:
     """
     Predice posibles escaseces de efectivo en el futuro.
@@ -393,16 +532,46 @@ def predict_cash_shortage(
     Args:
         company_id: ID de la empresa (opcional)
         months_ahead: Meses a predecir (default: 6)
+        accuracy: 'fast' (por defecto) o 'full' (SARIMA)
     
     Returns:
         Diccionario con predicción de escasez y recomendaciones
     """
     logger.info(f"Ejecutando predict_cash_shortage: company={company_id}, months_ahead={months_ahead}")
-    return predict_cash_shortage_tool(company_id=company_id, months_ahead=months_ahead)
+    return await get_tool_registry().run("predict_cash_shortage", company_id=company_id, months_ahead=months_ahead, accuracy=accuracy)
+
+
+@mcp.tool()
+async def forecast_all_categories(
+    company_id: Optional[str] = None,
+    months_ahead: int = 6,
+    top_n_sarima: int = 3
+) -> dict:
+    """
+    Pronostica los gastos de todas las categorías en una sola llamada.
+    
+    Usa Holt-Winters vectorizado para todas las series y SARIMA solo
+    para las categorías de mayor gasto. Reporta tiempos por serie.
+    
+    Args:
+        company_id: ID de la empresa (opcional)
+        months_ahead: Meses a pronosticar (default: 6)
+        top_n_sarima: Categorías que usan SARIMA (default: 3)
+    
+    Returns:
+        Diccionario con el pronóstico por categoría
+    """
+    logger.info(f"Ejecutando forecast_all_categories: company={company_id}, months_ahead={months_ahead}")
+    return await get_tool_registry().run(
+        "forecast_all_categories",
+        entity_id=company_id,
+        months_ahead=months_ahead,
+        top_n_sarima=top_n_sarima,
+    )
 
 
 @mcp.tool()
-def get_stress_test(
+async def get_stress_test(
     company_id: Optional[str] = None,
     income_reduction: float = 30.0,
     expense_increase: float = 20.0
@@ -422,7 +591,8 @@ def get_stress_test(
         Diccionario con resultados de la prueba de estrés
     """
     logger.info(f"Ejecutando get_stress_test: company={company_id}, income_reduction={income_reduction}%, expense_increase={expense_increase}%")
-    return get_stress_test_tool(
+    return await get_tool_registry().run(
+        "get_stress_test",
         company_id=company_id,
         income_reduction=income_reduction,
         expense_increase=expense_increase
@@ -432,7 +602,7 @@ def get_stress_test(
 # ==================== PLANIFICACIÓN FINANCIERA ====================
 
 @mcp.tool()
-def generate_financial_plan(
+async def generate_financial_plan(
     entity_type: str = "personal",
     entity_id: Optional[str] = None,
     plan_goal: Optional[str] = None,
@@ -460,7 +630,8 @@ def generate_financial_plan(
         Plan financiero completo con proyecciones, métricas, recomendaciones y estrategias
     """
     logger.info(f"Ejecutando generate_financial_plan: entity={entity_type}/{entity_id}, goal={plan_goal}")
-    return generate_financial_plan_tool(
+    return await get_tool_registry().run(
+        "generate_financial_plan",
         entity_type=entity_type,
         entity_id=entity_id,
         plan_goal=plan_goal,
@@ -474,7 +645,7 @@ def generate_financial_plan(
 # ==================== RECOMENDACIONES DE INVERSIÓN ====================
 
 @mcp.tool()
-def get_investment_recommendations(
+async def get_investment_recommendations(
     entity_type: str = "personal",
     entity_id: Optional[str] = None,
     investment_amount: Optional[float] = None,
@@ -498,7 +669,8 @@ def get_investment_recommendations(
         Recomendaciones de fondos, estrategia de diversificación y proyecciones
     """
     logger.info(f"Ejecutando get_investment_recommendations: entity={entity_type}/{entity_id}, amount={investment_amount}, risk={risk_tolerance}")
-    return get_investment_recommendations_tool(
+    return await get_tool_registry().run(
+        "get_investment_recommendations",
         entity_type=entity_type,
         entity_id=entity_id,
         investment_amount=investment_amount,
@@ -510,7 +682,7 @@ def get_investment_recommendations(
 # ==================== ATAJOS FINANCIEROS ====================
 
 @mcp.tool()
-def get_current_month_spending(
+async def get_current_month_spending(
     entity_type: str = "personal",
     entity_id: Optional[str] = None
 ) -> dict:
@@ -527,30 +699,121 @@ def get_current_month_spending(
         Diccionario con el total gastado y número de transacciones.
     """
     logger.info(f"Ejecutando get_current_month_spending: entity_type={entity_type}, entity_id={entity_id}")
-    return get_current_month_spending_summary(entity_type=entity_type, entity_id=entity_id)
+    return await get_tool_registry().run("get_current_month_spending", entity_type=entity_type, entity_id=entity_id)
+
+
+# ==================== EXPORTACIÓN ====================
+
+@mcp.tool()
+async def export_transactions(
+    ctx: Context,
+    entity_type: str = "company",
+    entity_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    type: Optional[str] = None,
+    batch_size: int = 500,
+    max_rows: Optional[int] = None,
+) -> dict:
+    """
+    Exporta transacciones en lotes como notificaciones de progreso.
+    
+    Cada lote llega en el `message` de una notificación (JSON con sus
+    transacciones) en cuanto se lee; la respuesta final solo resume. Para
+    historiales largos es preferible a paginar list_transactions. Fuera de
+    MCP, GET /export/transactions devuelve lo mismo como NDJSON.
+    
+    Args:
+        entity_type: 'company' o 'personal'
+        entity_id: ID de la entidad
+        start_date: Fecha de inicio YYYY-MM-DD (opcional)
+        end_date: Fecha de fin YYYY-MM-DD (opcional)
+        category: Categoría (opcional)
+        type: 'ingreso' o 'gasto' (opcional)
+        batch_size: Transacciones por notificación (default: 500)
+        max_rows: Máximo de filas (default y tope: EXPORT_MAX_ROWS)
+    
+    Returns:
+        Diccionario con filas y lotes enviados, y el rango de fechas cubierto
+    """
+    logger.info(f"Ejecutando export_transactions: entity={entity_type}/{entity_id}, dates={start_date} to {end_date}")
+    started = time.perf_counter()
+    try:
+        batches = stream_transactions(
+            entity_type=entity_type, entity_id=entity_id, start_date=start_date, end_date=end_date,
+            category=category, type=type, batch_size=batch_size, max_rows=max_rows,
+        )
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    rows, sent, first, last = 0, 0, None, None
+    registry = get_tool_registry()
+    try:
+        # Cada lote se lee en el pool de hilos del registro (no bloquea el loop)
+        while (batch := await registry.offload(next, batches, None)) is not None:
+            rows += len(batch)
+            sent += 1
+            first = first or batch[0]['fecha']
+            last = batch[-1]['fecha']
+            await ctx.report_progress(rows, None, json.dumps({'batch': sent, 'transactions': batch}, ensure_ascii=False))
+    except Exception as e:
+        logger.error(f"Error en export_transactions tras {rows} filas: {e}")
+        return {"success": False, "error": str(e), "rows_sent": rows, "batches_sent": sent}
+    finally:
+        await registry.offload(batches.close)
+    return {
+        "success": True,
+        "rows_sent": rows,
+        "batches_sent": sent,
+        "newest": first,
+        "oldest": last,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# ==================== LOTES ====================
+
+@mcp.tool()
+async def batch_tools(calls: list[dict], ctx: Context) -> dict:
+    """
+    Ejecuta varias herramientas en una sola llamada y en paralelo.
+    
+    Útil cuando se necesitan varias consultas de la misma entidad en un turno
+    (balance, tendencias, alertas, score). Los datos comunes de cada empresa
+    se cargan una sola vez. Cada resultado se emite como notificación de
+    progreso (JSON en el mensaje) en cuanto termina.
+    
+    Args:
+        calls: Lista de {"tool": nombre, "arguments": {...}} (máximo 16)
+    
+    Returns:
+        Diccionario con los resultados en el orden pedido y tiempos del lote
+    """
+    logger.info(f"Ejecutando batch_tools: {[c.get('tool') for c in calls if isinstance(c, dict)]}")
+
+    async def on_result(item: dict, completed: int, total: int) -> None:
+        await ctx.report_progress(completed, total, json.dumps(item, ensure_ascii=False, default=str))
+
+    return await get_tool_registry().run("batch_tools", calls=calls, on_result=on_result)
 
 
 # ==================== INICIALIZACIÓN ====================
 
 def initialize_server():
-    """Inicialización del servidor MCP."""
+    """
+    Inicialización del servidor MCP.
+
+    No bloquea: el pool de base de datos y la precarga de pandas/statsmodels
+    corren en un hilo de warm-up mientras el servidor abre el puerto.
+    /health responde desde el inicio y /ready cuando el pool está listo.
+    """
     logger.info("=" * 60)
     logger.info("INICIANDO SERVIDOR MCP FINANCIERO SOBRE HTTP")
     logger.info("=" * 60)
     
-    # Test database connection
-    try:
-        db = get_db_connection()
-        if db.test_connection():
-            logger.info("Conexión a base de datos establecida exitosamente")
-        else:
-            logger.warning("No se pudo conectar a la base de datos")
-    except Exception as e:
-        logger.error(f"Error al conectar a la base de datos: {e}")
-        logger.warning("El servidor iniciará sin conexión a base de datos")
+    get_startup_state().start()
     
-    logger.info("=" * 60)
-    logger.info("Servidor MCP listo para recibir conexiones")
+    logger.info("Warm-up en segundo plano; /ready indica cuándo hay conexión a base de datos")
     logger.info("=" * 60)
 
 
@@ -570,11 +833,15 @@ if __name__ == "__main__":
     
     # Run the MCP server over HTTP
     # streamable-http es el transporte correcto para Coolify y servidores HTTP
-    asyncio.run(
-        mcp.run_async(
-            transport="streamable-http",
-            host=host,
-            port=port,
+    try:
+        asyncio.run(
+            mcp.run_async(
+                transport="streamable-http",
+                host=host,
+                port=port,
+            )
         )
-    )
+    finally:
+        get_tool_registry().shutdown()
+        get_offload_pool().shutdown()
 
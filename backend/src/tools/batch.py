@@ -0,0 +1,157 @@
+"""
+batch_tools: several tool calls in one MCP round trip.
+
+Agents often ask for the balance, trends, alerts and health score of the
+same company in one turn. Here the calls run concurrently through the tool
+registry (each under its own concurrency limit). The balance and recent
+flows those tools share are loaded once per company as FinancialFacts and
+passed to every sub-tool that accepts ``facts``.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils import setup_logger
+from utils.metrics import get_metrics, payload_size
+from utils.shaping import ShapeOptions, shape
+from .financial.facts import FinancialFacts
+from .registry import ToolRegistry, get_tool_registry
+
+logger = setup_logger('batch_tools', logging.INFO)
+
+MAX_BATCH_CALLS = 16
+
+# (item, completed, total): lo usa el servidor HTTP para emitir cada resultado
+# como notificación de progreso en cuanto termina
+ResultCallback = Callable[[Dict[str, Any], int, int], Awaitable[None]]
+
+
+def _accepts_facts(func: Callable) -> bool:
+    return 'facts' in inspect.signature(inspect.unwrap(func)).parameters
+
+
+def _facts_company(kwargs: Dict[str, Any]) -> Optional[str]:
+    """Company whose facts a call can reuse, or None (personal calls load their own data)."""
+    if kwargs.get('user_id'):
+        return None
+    if kwargs.get('company_id'):
+        return kwargs['company_id']
+    if kwargs.get('entity_type', 'company') == 'company' and kwargs.get('entity_id'):
+        return kwargs['entity_id']
+    return None
+
+
+async def _run_call(
+    registry: ToolRegistry, index: int, name: str, kwargs: Dict[str, Any], options: ShapeOptions
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    item: Dict[str, Any] = {'index': index, 'tool': name}
+    # Cada subllamada cuenta en las métricas de su propia herramienta
+    with get_metrics().tool_timer(name) as invocation:
+        try:
+            result = await registry.run(name, **kwargs)
+            invocation.error = isinstance(result, dict) and result.get('success') is False
+            if not options.is_default:
+                invocation.payload_raw_bytes = payload_size(result)
+                result = shape(result, options)
+            invocation.payload_bytes = payload_size(result)
+            item.update(success=not invocation.error, result=result)
+        except Exception as e:
+            invocation.error = True
+            item.update(success=False, error=str(e))
+    item['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return item
+
+
+async def batch_tools_tool(calls: List[Dict[str, Any]], on_result: Optional[ResultCallback] = None) -> dict:
+    """
+    Run up to MAX_BATCH_CALLS tool calls concurrently.
+
+    Args:
+        calls: [{"tool": name, "arguments": {...}}, ...]
+        on_result: awaited with each item as soon as it completes
+
+    Returns:
+        Results in request order, each with its own success/error, plus the
+        batch wall time and the sum of the individual times.
+    """
+    try:
+        if not isinstance(calls, list) or not calls:
+            return {"success": False, "error": "calls debe ser una lista no vacía de {tool, arguments}"}
+        if len(calls) > MAX_BATCH_CALLS:
+            return {"success": False, "error": f"Máximo {MAX_BATCH_CALLS} llamadas por lote (recibidas {len(calls)})"}
+
+        registry = get_tool_registry()
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        prepared = []
+        for index, call in enumerate(calls):
+            name = call.get('tool') if isinstance(call, dict) else None
+            try:
+                if name == 'batch_tools':
+                    raise ValueError("batch_tools no puede anidarse")
+                spec = registry.get(name)
+                arguments = dict(call.get('arguments') or {})
+                options = ShapeOptions.pop_from(arguments)
+                prepared.append((index, spec, spec.bind(arguments), options))
+            except ValueError as e:
+                results[index] = {'index': index, 'tool': name, 'success': False, 'error': str(e), 'elapsed_ms': 0.0}
+
+        # Un FinancialFacts por empresa para todas las herramientas que lo aceptan
+        companies = {
+            _facts_company(kwargs) for _, spec, kwargs, _ in prepared if _accepts_facts(spec.func)
+        } - {None}
+        facts: Dict[str, FinancialFacts] = {}
+        if companies:
+            loaded = await asyncio.gather(
+                *(registry.offload(FinancialFacts.load, company) for company in companies),
+                return_exceptions=True,
+            )
+            for company, value in zip(companies, loaded):
+                if isinstance(value, Exception):
+                    # Sin facts, cada herramienta consulta por su cuenta
+                    logger.warning(f"No se pudieron cargar los facts de {company}: {value}")
+                else:
+                    facts[company] = value
+        for _, spec, kwargs, _ in prepared:
+            company = _facts_company(kwargs)
+            if company in facts and _accepts_facts(spec.func):
+                kwargs['facts'] = facts[company]
+
+        total = len(calls)
+        completed = 0
+        for item in results:
+            if item is not None:
+                completed += 1
+                if on_result is not None:
+                    await on_result(item, completed, total)
+
+        tasks = [
+            asyncio.ensure_future(_run_call(registry, i, spec.name, kwargs, options))
+            for i, spec, kwargs, options in prepared
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                item = await future
+                results[item['index']] = item
+                completed += 1
+                if on_result is not None:
+                    await on_result(item, completed, total)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return {
+            "success": True,
+            "calls": total,
+            "failed": sum(1 for r in results if not r['success']),
+            "shared_facts": sorted(facts),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "sequential_ms": round(sum(r['elapsed_ms'] for r in results), 1),
+            "results": results,
+        }
+    except Exception as e:
+        logger.error(f"Error en batch_tools: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,774 @@
+"""
+Catalog of MCP tools: name, callable, description and argument schema.
+
+Both servers build their tool list from here through tools.registry, so a
+new tool is declared once. ``max_concurrency`` caps simultaneous calls of
+the heavier tools (forecasts, plans); the rest use TOOL_MAX_CONCURRENCY.
+"""
+from typing import Tuple
+
+from forecasting.scenarios import MAX_SCENARIOS
+
+from .registry import ToolSpec
+from .batch import MAX_BATCH_CALLS, batch_tools_tool
+from .financial.balance import get_company_balance_tool_async, get_personal_balance_tool_async
+from .financial.expense import get_expenses_by_category_tool
+from .financial.projection import get_cash_flow_projection_tool, simulate_scenario_tool
+from .financial.budget import get_budget_comparison_tool
+from .financial.risk import (
+    get_financial_health_score_tool,
+    assess_financial_risk_tool,
+    get_alerts_tool,
+    get_stress_test_tool,
+)
+from .financial.analytics import (
+    get_spending_trends_tool,
+    get_category_recommendations_tool,
+    detect_anomalies_tool,
+    compare_periods_tool,
+)
+from .financial.predictive import (
+    predict_cash_shortage_tool,
+    cash_runway_tool,
+    forecast_expenses_by_category_tool,
+    forecast_all_categories_tool,
+    bill_forecaster_tool,
+)
+from .financial.descriptive import (
+    list_transactions_tool,
+    top_categories_tool,
+    monthly_summary_tool,
+)
+from .financial.planning import (
+    goal_based_plan_tool,
+    budget_allocator_tool,
+    debt_paydown_optimizer_tool,
+)
+from .financial.shortcuts import get_current_month_spending_summary
+from .financial.financial_plan import generate_financial_plan_tool
+from .financial.investment import get_investment_recommendations_tool
+
+TOOLS: Tuple[ToolSpec, ...] = (
+    ToolSpec(
+        name="get_company_balance",
+        func=get_company_balance_tool_async,
+        description=(
+            "Obtiene el balance financiero actual de una empresa, "
+            "incluyendo ingresos totales, gastos totales y balance neto. "
+            "Útil para conocer la situación financiera general."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional, si no se proporciona devuelve el total)",
+                }
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_personal_balance",
+        func=get_personal_balance_tool_async,
+        description=(
+            "Obtiene el balance financiero personal de un usuario, "
+            "incluyendo ingresos totales, gastos totales y balance neto."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID del usuario (opcional)",
+                }
+            },
+        },
+    ),
+    ToolSpec(
+        name="analyze_expenses_by_category",
+        func=get_expenses_by_category_tool,
+        description=(
+            "Analiza los gastos agrupados por categoría, mostrando el total "
+            "gastado en cada categoría, número de transacciones y porcentaje "
+            "del total. Permite filtrar por rango de fechas."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "user_id": {
+                    "type": "string",
+                    "description": "ID del usuario para finanzas personales (opcional)",
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Fecha de inicio en formato YYYY-MM-DD (opcional)",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "Fecha de fin en formato YYYY-MM-DD (opcional)",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="project_cash_flow",
+        func=get_cash_flow_projection_tool,
+        max_concurrency=4,
+        description=(
+            "Proyecta el flujo de caja futuro basándose en el histórico "
+            "de ingresos y gastos. Calcula promedios mensuales y estima "
+            "el balance para los próximos meses. Incluye recomendaciones."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "months": {
+                    "type": "integer",
+                    "description": "Número de meses a proyectar (1-24, default: 3)",
+                    "minimum": 1,
+                    "maximum": 24,
+                    "default": 3,
+                },
+                "accuracy": {
+                    "type": "string",
+                    "description": "'fast' (tendencia + estacionalidad en NumPy) o 'full' (SARIMA con 24+ meses)",
+                    "enum": ["fast", "full"],
+                    "default": "fast",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="simulate_financial_scenario",
+        func=simulate_scenario_tool,
+        description=(
+            "Simula escenarios 'what-if' financieros sobre la base real "
+            "(promedio mensual de ingresos y gastos por categoría). Acepta "
+            "varios escenarios en una llamada, con cambios porcentuales y "
+            "absolutos, cambios por categoría y eventos puntuales, y "
+            "compara el balance proyectado de cada uno contra la base."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "current_balance": {
+                    "type": "number",
+                    "description": "Balance de inicio (default: el balance actual en la base de datos)",
+                },
+                "monthly_income_change": {
+                    "type": "number",
+                    "description": "Cambio en ingresos mensuales si no se pasa scenarios (puede ser negativo)",
+                    "default": 0,
+                },
+                "monthly_expense_change": {
+                    "type": "number",
+                    "description": "Cambio en gastos mensuales si no se pasa scenarios (puede ser negativo)",
+                    "default": 0,
+                },
+                "months": {
+                    "type": "integer",
+                    "description": "Número de meses a simular (default: 6)",
+                    "minimum": 1,
+                    "maximum": 24,
+                    "default": 6,
+                },
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "scenarios": {
+                    "type": "array",
+                    "description": "Escenarios a comparar; la base sin cambios se incluye siempre",
+                    "maxItems": MAX_SCENARIOS,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "income_pct": {"type": "number", "description": "Cambio % de ingresos (-10 = -10%)"},
+                            "expense_pct": {"type": "number", "description": "Cambio % de gastos"},
+                            "income_change": {"type": "number", "description": "Cambio absoluto mensual de ingresos"},
+                            "expense_change": {"type": "number", "description": "Cambio absoluto mensual de gastos"},
+                            "start_month": {
+                                "type": "integer",
+                                "minimum": 1,
+                                "description": "Mes desde el que rigen los cambios (default: 1)",
+                            },
+                            "category_changes": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "category": {"type": "string"},
+                                        "tipo": {"type": "string", "enum": ["gasto", "ingreso"], "default": "gasto"},
+                                        "pct": {"type": "number", "description": "Cambio % sobre el promedio de la categoría"},
+                                        "amount": {"type": "number", "description": "Cambio absoluto mensual"},
+                                    },
+                                    "required": ["category"],
+                                },
+                            },
+                            "events": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "month": {"type": "integer", "minimum": 1},
+                                        "amount": {"type": "number", "description": "Positivo: entrada; negativo: salida"},
+                                        "description": {"type": "string"},
+                                    },
+                                    "required": ["month", "amount"],
+                                },
+                            },
+                        },
+                    },
+                },
+                "baseline_months": {
+                    "type": "integer",
+                    "description": "Meses completos promediados para la base (default: 6)",
+                    "minimum": 1,
+                    "maximum": 24,
+                    "default": 6,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="compare_budget_vs_actual",
+        func=get_budget_comparison_tool,
+        description=(
+            "Compara los gastos presupuestados vs los gastos reales "
+            "para un mes específico. Identifica variaciones y áreas "
+            "que requieren atención."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "month": {
+                    "type": "integer",
+                    "description": "Mes a analizar (1-12, default: mes actual)",
+                    "minimum": 1,
+                    "maximum": 12,
+                },
+                "year": {
+                    "type": "integer",
+                    "description": "Año a analizar (default: año actual)",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_financial_health_score",
+        func=get_financial_health_score_tool,
+        description=(
+            "Calcula un score integral de salud financiera (0-100) "
+            "analizando múltiples métricas: tasa de ahorro, ratio de gastos, "
+            "y balance. Incluye recomendaciones personalizadas."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "user_id": {
+                    "type": "string",
+                    "description": "ID del usuario para finanzas personales (opcional)",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_spending_trends",
+        func=get_spending_trends_tool,
+        description=(
+            "Analiza tendencias de gasto a lo largo del tiempo. "
+            "Identifica patrones, crecimiento promedio, y meses con "
+            "mayor/menor gasto. Útil para entender comportamiento financiero."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "months_back": {
+                    "type": "integer",
+                    "description": "Número de meses a analizar (1-24, default: 6)",
+                    "minimum": 1,
+                    "maximum": 24,
+                    "default": 6,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_category_recommendations",
+        func=get_category_recommendations_tool,
+        description=(
+            "Genera recomendaciones personalizadas para optimizar gastos "
+            "por categoría. Identifica las categorías con mayor gasto y "
+            "sugiere acciones específicas para reducir costos."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "top_n": {
+                    "type": "integer",
+                    "description": "Número de categorías principales a analizar (default: 5)",
+                    "default": 5,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="detect_anomalies",
+        func=detect_anomalies_tool,
+        description=(
+            "Detecta transacciones o patrones de gasto inusuales que "
+            "se desvían significativamente del promedio. Útil para "
+            "identificar gastos sospechosos o excepcionales."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "threshold": {
+                    "type": "number",
+                    "description": "Umbral de desviación estándar (default: 2.0)",
+                    "default": 2.0,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="compare_periods",
+        func=compare_periods_tool,
+        description=(
+            "Compara métricas financieras entre dos períodos de tiempo. "
+            "Muestra cambios absolutos y porcentuales en ingresos, gastos "
+            "y balance. Ideal para análisis de crecimiento."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "period1_start": {
+                    "type": "string",
+                    "description": "Fecha inicio período 1 (YYYY-MM-DD)",
+                },
+                "period1_end": {
+                    "type": "string",
+                    "description": "Fecha fin período 1 (YYYY-MM-DD)",
+                },
+                "period2_start": {
+                    "type": "string",
+                    "description": "Fecha inicio período 2 (YYYY-MM-DD)",
+                },
+                "period2_end": {
+                    "type": "string",
+                    "description": "Fecha fin período 2 (YYYY-MM-DD)",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="assess_financial_risk",
+        func=assess_financial_risk_tool,
+        description=(
+            "Evalúa el nivel de riesgo financiero general. Analiza "
+            "múltiples factores de riesgo como balance negativo, ratio "
+            "de gastos alto, y reservas bajas. Proporciona un score de riesgo."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_alerts",
+        func=get_alerts_tool,
+        description=(
+            "Obtiene alertas financieras activas que requieren atención. "
+            "Identifica problemas como balance bajo, gastos excesivos, "
+            "o falta de ingresos. Puede filtrar por severidad."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "severity": {
+                    "type": "string",
+                    "description": "Filtrar por severidad: 'low', 'medium', 'high', 'critical'",
+                    "enum": ["low", "medium", "high", "critical"],
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="predict_cash_shortage",
+        func=predict_cash_shortage_tool,
+        max_concurrency=4,
+        description=(
+            "Predice posibles escaseces de efectivo en el futuro basándose "
+            "en tendencias actuales. Identifica cuándo podría ocurrir una "
+            "escasez y proporciona recomendaciones preventivas."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "months_ahead": {
+                    "type": "integer",
+                    "description": "Meses a predecir (default: 6)",
+                    "default": 6,
+                },
+                "accuracy": {
+                    "type": "string",
+                    "description": "'fast' (tendencia + estacionalidad en NumPy) o 'full' (SARIMA con 24+ meses)",
+                    "enum": ["fast", "full"],
+                    "default": "fast",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_stress_test",
+        func=get_stress_test_tool,
+        description=(
+            "Realiza una prueba de estrés financiero simulando escenarios "
+            "adversos (reducción de ingresos y aumento de gastos). Evalúa "
+            "la resiliencia financiera y tiempo de supervivencia."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "company_id": {
+                    "type": "string",
+                    "description": "ID de la empresa (opcional)",
+                },
+                "income_reduction": {
+                    "type": "number",
+                    "description": "Porcentaje de reducción en ingresos (default: 30)",
+                    "default": 30.0,
+                },
+                "expense_increase": {
+                    "type": "number",
+                    "description": "Porcentaje de aumento en gastos (default: 20)",
+                    "default": 20.0,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="list_transactions",
+        func=list_transactions_tool,
+        description=(
+            "Lista transacciones con filtros por fecha, categoría, monto y tipo, con paginación. "
+            "Para páginas profundas use `cursor` con el `next_cursor` de la respuesta anterior."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "company"},
+                "entity_id": {"type": "string"},
+                "start_date": {"type": "string", "description": "YYYY-MM-DD"},
+                "end_date": {"type": "string", "description": "YYYY-MM-DD"},
+                "category": {"type": "string"},
+                "min_amount": {"type": "number"},
+                "max_amount": {"type": "number"},
+                "type": {"type": "string", "enum": ["ingreso", "gasto"]},
+                "limit": {"type": "integer", "default": 50},
+                "offset": {"type": "integer", "default": 0},
+                "cursor": {"type": "string", "description": "next_cursor de la página anterior (ignora offset)"},
+                "include_total": {
+                    "type": "boolean",
+                    "description": "false: no contar el total (total_records es null), más rápido en tablas grandes",
+                    "default": True,
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="top_categories",
+        func=top_categories_tool,
+        description=(
+            "Top-N categorías por gasto/ingreso en un período con porcentajes."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "company"},
+                "entity_id": {"type": "string"},
+                "start_date": {"type": "string"},
+                "end_date": {"type": "string"},
+                "direction": {"type": "string", "enum": ["gasto", "ingreso"], "default": "gasto"},
+                "top_n": {"type": "integer", "default": 5},
+            },
+        },
+    ),
+    ToolSpec(
+        name="monthly_summary",
+        func=monthly_summary_tool,
+        description=(
+            "Resumen de ingresos, gastos y balance del mes o periodo dado con variación vs anterior."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "company"},
+                "entity_id": {"type": "string"},
+                "month": {"type": "integer"},
+                "year": {"type": "integer"},
+                "start_date": {"type": "string"},
+                "end_date": {"type": "string"},
+            },
+        },
+    ),
+    ToolSpec(
+        name="cash_runway",
+        func=cash_runway_tool,
+        description=(
+            "Estimación de meses de runway de caja con burn rate promedio reciente."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "company"},
+                "entity_id": {"type": "string"},
+                "current_cash": {"type": "number"},
+                "burn_method": {"type": "string", "default": "avg_3m"},
+            },
+        },
+    ),
+    ToolSpec(
+        name="forecast_expenses_by_category",
+        func=forecast_expenses_by_category_tool,
+        max_concurrency=4,
+        description=(
+            "Pronóstico de gastos por categoría para los próximos meses (rápido o SARIMA)."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "company"},
+                "entity_id": {"type": "string"},
+                "category": {"type": "string"},
+                "months_ahead": {"type": "integer", "default": 6},
+                "accuracy": {"type": "string", "enum": ["fast", "full"], "default": "fast"},
+            },
+            "required": ["category"],
+        },
+    ),
+    ToolSpec(
+        name="forecast_all_categories",
+        func=forecast_all_categories_tool,
+        max_concurrency=2,
+        description=(
+            "Pronóstico de gastos de todas las categorías en una llamada (Holt-Winters vectorizado; SARIMA para las top-N)."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_id": {"type": "string"},
+                "months_ahead": {"type": "integer", "default": 6},
+                "top_n_sarima": {"type": "integer", "default": 3},
+            },
+        },
+    ),
+    ToolSpec(
+        name="bill_forecaster",
+        func=bill_forecaster_tool,
+        description=(
+            "Predicción de facturas/suscripciones personales basadas en recurrencias."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "user_id": {"type": "string"},
+                "months_ahead": {"type": "integer", "default": 3},
+            },
+            "required": ["user_id"],
+        },
+    ),
+    ToolSpec(
+        name="goal_based_plan",
+        func=goal_based_plan_tool,
+        description=(
+            "Plan para alcanzar objetivo de ahorro/inversión con aportes mensuales y recortes sugeridos."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "personal"},
+                "entity_id": {"type": "string"},
+                "goal_amount": {"type": "number"},
+                "deadline": {"type": "string", "description": "YYYY-MM-DD"},
+                "min_monthly_contrib": {"type": "number"},
+            },
+            "required": ["goal_amount", "deadline"],
+        },
+    ),
+    ToolSpec(
+        name="budget_allocator",
+        func=budget_allocator_tool,
+        description=(
+            "Asigna presupuesto mensual por categoría en base a historial y prioridades."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "personal"},
+                "entity_id": {"type": "string"},
+                "monthly_cap": {"type": "number"},
+                "prioridades": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["monthly_cap"],
+        },
+    ),
+    ToolSpec(
+        name="debt_paydown_optimizer",
+        func=debt_paydown_optimizer_tool,
+        description=(
+            "Optimiza el pago de deudas (avalancha/bola de nieve) con cronograma y ahorro de intereses."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "default": "personal"},
+                "entity_id": {"type": "string"},
+                "debts": {"type": "array", "items": {"type": "object"}},
+                "metodo": {"type": "string", "enum": ["avalancha", "bola_nieve"], "default": "avalancha"},
+                "extra_mensual": {"type": "number", "default": 0},
+            },
+            "required": ["debts"],
+        },
+    ),
+    ToolSpec(
+        name="get_current_month_spending",
+        func=get_current_month_spending_summary,
+        description=(
+            "Obtiene un resumen del total de gastos para el mes actual. "
+            "Es un atajo para la pregunta '¿Cuánto he gastado este mes?'. "
+            "No requiere especificar fechas."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {
+                    "type": "string",
+                    "description": "Tipo de entidad ('personal' o 'company')",
+                    "default": "personal",
+                },
+                "entity_id": {
+                    "type": "string",
+                    "description": "ID del usuario o empresa",
+                },
+            },
+        },
+    ),
+    ToolSpec(
+        name="generate_financial_plan",
+        func=generate_financial_plan_tool,
+        max_concurrency=4,
+        description=(
+            "Genera un plan financiero personalizado completo con proyecciones, "
+            "recomendaciones y estrategias basadas en datos históricos y metas."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "enum": ["personal", "company"], "default": "personal"},
+                "entity_id": {"type": "string"},
+                "plan_goal": {"type": "string", "description": "Meta financiera (ej: 'Ahorrar $10,000 en 6 meses')"},
+                "use_saved_data": {"type": "boolean", "default": True},
+                "additional_incomes": {"type": "array", "items": {"type": "object"}, "default": []},
+                "additional_expenses": {"type": "array", "items": {"type": "object"}, "default": []},
+                "planning_horizon_months": {"type": "integer", "default": 12},
+            },
+        },
+    ),
+    ToolSpec(
+        name="get_investment_recommendations",
+        func=get_investment_recommendations_tool,
+        description=(
+            "Genera recomendaciones personalizadas de inversión en fondos, estrategia "
+            "de diversificación y proyecciones de rendimiento."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "entity_type": {"type": "string", "enum": ["personal", "company"], "default": "personal"},
+                "entity_id": {"type": "string"},
+                "investment_amount": {"type": "number", "description": "Monto a invertir (opcional)"},
+                "risk_tolerance": {
+                    "type": "string",
+                    "enum": ["conservative", "moderate", "aggressive"],
+                    "default": "moderate",
+                },
+                "investment_horizon": {"type": "integer", "description": "Meses", "default": 12},
+            },
+        },
+    ),
+    ToolSpec(
+        name="batch_tools",
+        func=batch_tools_tool,
+        max_concurrency=4,
+        description=(
+            "Ejecuta varias herramientas en una sola llamada y en paralelo (p. ej. balance, "
+            "tendencias, alertas y score de la misma empresa). Los datos comunes de cada "
+            "empresa se cargan una vez. Devuelve los resultados en el orden pedido."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "calls": {
+                    "type": "array",
+                    "maxItems": MAX_BATCH_CALLS,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "tool": {"type": "string", "description": "Nombre de la herramienta"},
+                            "arguments": {"type": "object", "description": "Argumentos de la herramienta"},
+                        },
+                        "required": ["tool"],
+                    },
+                },
+            },
+            "required": ["calls"],
+        },
+    ),
+)
@@ -8,7 +8,12 @@ from .analytics import (
     detect_anomalies_tool,
     compare_periods_tool,
 )
-from .balance import get_company_balance_tool, get_personal_balance_tool
+from .balance import (
+    get_company_balance_tool,
+    get_personal_balance_tool,
+    get_company_balance_tool_async,
+    get_personal_balance_tool_async,
+)
 from .budget import get_budget_comparison_tool
 from .descriptive import (
     list_transactions_tool,
@@ -25,6 +30,7 @@ from .predictive import (
     predict_cash_shortage_tool,
     cash_runway_tool,
     forecast_expenses_by_category_tool,
+    forecast_all_categories_tool,
     bill_forecaster_tool,
 )
 from .projection import get_cash_flow_projection_tool, simulate_scenario_tool
@@ -34,6 +40,7 @@ from .risk import (
     get_alerts_tool,
     get_stress_test_tool,
 )
+from .facts import FinancialFacts
 from .orchestrator import get_business_health_check, get_personal_monthly_review, create_debt_reduction_plan
 from .financial_plan import generate_financial_plan_tool
 
@@ -1,8 +1,13 @@
 """Advanced analytics tools for MCP server."""
 import logging
 from typing import Any, Dict, Optional, List
-from datetime import datetime, timedelta
-from database import FinancialDataQueries
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from database import FinancialDataQueries, get_analytical_replica, rollup_enabled
+from database.columnar import EntityColumns, get_columnar_store, month_index
+from database.sql import month_floor
 
 logger = logging.getLogger(__name__)
 
@@ -138,6 +143,25 @@ def get_financial_health_score_tool(
         }
 
 
+def _trends_from_columns(columns: EntityColumns, months_back: int) -> List[Dict[str, Any]]:
+    """Monthly income/expense of one entity's cached columns, months without movements skipped."""
+    since = month_floor(months_back=months_back)
+    start, end = month_index(since), month_index(date.today())
+    months, ingresos, n_ingresos = columns.by_month(columns.select('ingreso', since), start, end)
+    _, gastos, n_gastos = columns.by_month(columns.select('gasto', since), start, end)
+    present = (n_ingresos + n_gastos) > 0
+    return [
+        {
+            'año': int(m // 12),
+            'mes': int(m % 12 + 1),
+            'ingresos': round(float(i), 2),
+            'gastos': round(float(g), 2),
+            'balance': round(float(i - g), 2),
+        }
+        for m, i, g in zip(months[present], ingresos[present], gastos[present])
+    ]
+
+
 def get_spending_trends_tool(
     company_id: Optional[str] = None,
     months_back: int = 6
@@ -163,25 +187,27 @@ def get_spending_trends_tool(
                 'message': 'El número de meses debe estar entre 1 y 24'
             }
         
-        queries = FinancialDataQueries()
-        trends = queries.get_monthly_trends(company_id, months_back)
+        if company_id and not rollup_enabled() and not get_analytical_replica().enabled:
+            # Una empresa sin agregados precalculados: serie mensual del caché columnar
+            trends = _trends_from_columns(get_columnar_store().get('company', company_id), months_back)
+        else:
+            # Todas las empresas, o con rollup/réplica: agregado en SQL sin traer filas crudas
+            trends = [
+                {**t, 'ingresos': round(t['ingresos'], 2), 'gastos': round(t['gastos'], 2), 'balance': round(t['balance'], 2)}
+                for t in FinancialDataQueries().get_monthly_trends(company_id, months_back)
+            ]
+        gastos = np.array([t['gastos'] for t in trends], dtype=float)
         
         # Analyze trends
         if len(trends) >= 2:
-            # Calculate average growth rate
-            total_change = 0
-            for i in range(1, len(trends)):
-                prev_expenses = trends[i-1].get('gastos', 0)
-                curr_expenses = trends[i].get('gastos', 0)
-                if prev_expenses > 0:
-                    change = ((curr_expenses - prev_expenses) / prev_expenses) * 100
-                    total_change += change
-            
-            avg_growth_rate = total_change / (len(trends) - 1) if len(trends) > 1 else 0
+            # Variación mes a mes del gasto; los meses previos sin gasto aportan 0
+            prev, curr = gastos[:-1], gastos[1:]
+            changes = np.divide(curr - prev, prev, out=np.zeros_like(prev), where=prev > 0) * 100
+            avg_growth_rate = float(changes.sum()) / (len(trends) - 1)
             
             # Identify highest and lowest spending months
-            highest_month = max(trends, key=lambda x: x.get('gastos', 0))
-            lowest_month = min(trends, key=lambda x: x.get('gastos', 0))
+            highest_month = trends[int(np.argmax(gastos))]
+            lowest_month = trends[int(np.argmin(gastos))]
             
             insights = {
                 'tendencia_promedio': round(avg_growth_rate, 2),
@@ -403,9 +429,10 @@ def compare_periods_tool(
         p2_start = datetime.strptime(period2_start, '%Y-%m-%d') if period2_start else None
         p2_end = datetime.strptime(period2_end, '%Y-%m-%d') if period2_end else None
         
-        # Get data for both periods
-        period1_data = queries.get_period_summary(company_id, p1_start, p1_end)
-        period2_data = queries.get_period_summary(company_id, p2_start, p2_end)
+        # Get data for both periods in a single round trip
+        period1_data, period2_data = queries.get_multi_window_summary(
+            company_id, [(p1_start, p1_end), (p2_start, p2_end)]
+        )
         
         # Calculate changes
         income_change = period2_data.get('ingresos', 0) - period1_data.get('ingresos', 0)
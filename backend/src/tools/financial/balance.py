@@ -1,11 +1,13 @@
 """Balance checking tools for MCP server."""
 import logging
 from typing import Any, Dict, Optional
-from database import FinancialDataQueries
+from database import FinancialDataQueries, AsyncFinancialDataQueries
+from database.cache import cached
 
 logger = logging.getLogger(__name__)
 
 
+@cached('get_company_balance_tool')
 def get_company_balance_tool(company_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Get current financial balance for a company.
@@ -38,6 +40,7 @@ def get_company_balance_tool(company_id: Optional[str] = None) -> Dict[str, Any]
         }
 
 
+@cached('get_personal_balance_tool')
 def get_personal_balance_tool(user_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Get current financial balance for personal finances.
@@ -70,6 +73,69 @@ def get_personal_balance_tool(user_id: Optional[str] = None) -> Dict[str, Any]:
         }
 
 
+@cached('get_company_balance_tool')
+async def get_company_balance_tool_async(company_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Async variant of get_company_balance_tool.
+
+    Awaits the aiomysql pool instead of blocking the event loop, so the
+    HTTP server can serve other sessions while the aggregate runs.
+    
+    Args:
+        company_id: Optional company ID to filter results
+    
+    Returns:
+        Dictionary with income, expenses, and balance information
+    """
+    try:
+        queries = AsyncFinancialDataQueries()
+        balance = await queries.get_company_balance(company_id)
+        
+        return {
+            'success': True,
+            'data': balance,
+            'message': f'Balance obtenido exitosamente' + (f' para empresa {company_id}' if company_id else '')
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in get_company_balance_tool_async: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Error al obtener el balance de la empresa'
+        }
+
+
+@cached('get_personal_balance_tool')
+async def get_personal_balance_tool_async(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Async variant of get_personal_balance_tool.
+    
+    Args:
+        user_id: Optional user ID to filter results
+    
+    Returns:
+        Dictionary with income, expenses, and balance information
+    """
+    try:
+        queries = AsyncFinancialDataQueries()
+        balance = await queries.get_personal_balance(user_id)
+        
+        return {
+            'success': True,
+            'data': balance,
+            'message': f'Balance personal obtenido exitosamente' + (f' para usuario {user_id}' if user_id else '')
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in get_personal_balance_tool_async: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Error al obtener el balance personal'
+        }
+
+
 def get_balance_tool(
     entity_type: str = 'company',
     entity_id: Optional[str] = None
@@ -1,11 +1,17 @@
-from database import get_db_connection
+from database import get_db_connection, FinancialDataQueries
 from utils import setup_logger
+from utils.validators import parse_date, validate_entity_type, validate_pagination
 import logging
+import os
 from datetime import datetime
+from typing import Dict, Iterator, List
 from dateutil.relativedelta import relativedelta
 
 logger = setup_logger('descriptive_tools', logging.INFO)
 
+# Límite de filas por exportación en streaming (EXPORT_MAX_ROWS)
+EXPORT_MAX_ROWS = int(os.getenv('EXPORT_MAX_ROWS', 200000))
+
 def list_transactions_tool(
     entity_type: str = "company",
     entity_id: str = None,
@@ -16,73 +22,84 @@ def list_transactions_tool(
     max_amount: float = None,
     type: str = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: str = None,
+    include_total: bool = True
 ) -> dict:
     """
     Lista transacciones con filtros y paginación.
+
+    Para recorrer historiales largos pase el `next_cursor` de la respuesta
+    anterior en `cursor`: la página se busca por (fecha, id) sin OFFSET y el
+    total se toma de un conteo cacheado (o se omite con include_total=False).
     """
     try:
-        db = get_db_connection()
-        table = "transacciones" if entity_type == "company" else "transacciones_personales"
-        id_column = "empresa_id" if entity_type == "company" else "usuario_id"
-        
-        query = f"SELECT * FROM {table} WHERE 1=1"
-        params = []
-        
-        if entity_id:
-            query += f" AND {id_column} = %s"
-            params.append(entity_id)
-        if start_date:
-            query += " AND fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND fecha <= %s"
-            params.append(end_date)
-        if category:
-            query += " AND categoria = %s"
-            params.append(category)
-        if min_amount is not None:
-            query += " AND monto >= %s"
-            params.append(min_amount)
-        if max_amount is not None:
-            query += " AND monto <= %s"
-            params.append(max_amount)
-        if type:
-            query += " AND tipo = %s"
-            params.append(type)
-        
-        count_query = query.replace("SELECT *", "SELECT COUNT(*)")
-        total_count_result = db.execute_query(count_query, tuple(params), fetch='one')
-        total_count = total_count_result[0] if total_count_result else 0
-
-        query += " ORDER BY fecha DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        transactions_data = db.execute_query(query, tuple(params), fetch='all')
-        
-        # Assuming the table columns are known and serializable
-        # You might need to convert datetime objects to strings
-        transactions = []
-        if transactions_data:
-            columns = [desc[0] for desc in db.cursor.description]
-            for row in transactions_data:
-                row_dict = dict(zip(columns, row))
-                for key, value in row_dict.items():
-                    if isinstance(value, datetime):
-                        row_dict[key] = value.isoformat()
-                transactions.append(row_dict)
+        validate_entity_type(entity_type)
+        limit, offset = validate_pagination(limit, offset)
+        queries = FinancialDataQueries()
+        result = queries.list_transactions(
+            entity_type,
+            entity_id,
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None,
+            category,
+            min_amount,
+            max_amount,
+            type,
+            limit=limit,
+            offset=0 if cursor else offset,
+            cursor=cursor,
+            include_total=include_total,
+        )
 
         return {
             "success": True,
-            "total_records": total_count,
+            "total_records": result['total'],
+            "total_cached": result['total_cached'],
             "limit": limit,
-            "offset": offset,
-            "transactions": transactions
+            "offset": None if cursor else offset,
+            "next_cursor": result['next_cursor'],
+            "transactions": result['items']
         }
     except Exception as e:
         logger.error(f"Error en list_transactions_tool: {e}")
         return {"success": False, "error": str(e)}
 
+def stream_transactions(
+    entity_type: str = "company",
+    entity_id: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    category: str = None,
+    min_amount: float = None,
+    max_amount: float = None,
+    type: str = None,
+    batch_size: int = 1000,
+    max_rows: int = None,
+) -> Iterator[List[Dict]]:
+    """
+    Transacciones con los filtros de list_transactions, en lotes de `batch_size`.
+
+    Para exportaciones: una sola consulta con cursor del lado del servidor,
+    memoria constante. Los argumentos se validan antes de abrir la consulta
+    (ValueError), así un error llega antes del primer byte de la respuesta.
+    """
+    validate_entity_type(entity_type)
+    batch_size = min(max(int(batch_size), 1), 10000)
+    max_rows = min(int(max_rows), EXPORT_MAX_ROWS) if max_rows else EXPORT_MAX_ROWS
+    return FinancialDataQueries().stream_transactions(
+        entity_type,
+        entity_id,
+        parse_date(start_date) if start_date else None,
+        parse_date(end_date) if end_date else None,
+        category,
+        min_amount,
+        max_amount,
+        type,
+        batch_size=batch_size,
+        max_rows=max_rows,
+    )
+
 def top_categories_tool(
     entity_type: str = "company",
     entity_id: str = None,
@@ -155,10 +172,6 @@ def monthly_summary_tool(
     Proporciona un resumen mensual de ingresos, gastos y balance.
     """
     try:
-        db = get_db_connection()
-        table = "transacciones" if entity_type == "company" else "transacciones_personales"
-        id_column = "empresa_id" if entity_type == "company" else "usuario_id"
-
         if not start_date:
             target_date = datetime(year, month, 1) if month and year else datetime.now()
             current_period_start = target_date.replace(day=1)
@@ -172,28 +185,21 @@ def monthly_summary_tool(
             prev_period_end = current_period_start - relativedelta(days=1)
             prev_period_start = prev_period_end - relativedelta(days=period_days)
 
-        def get_summary(start, end):
-            query = f"""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END), 0) as income,
-                    COALESCE(SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END), 0) as expense
-                FROM {table}
-                WHERE fecha BETWEEN %s AND %s
-            """
-            params = [start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")]
-            if entity_id:
-                query += f" AND {id_column} = %s"
-                params.append(entity_id)
-            
-            income, expense = db.execute_query(query, tuple(params), fetch='one')
+        def as_summary(window):
             return {
-                "income": float(income),
-                "expense": float(expense),
-                "net_flow": float(income) - float(expense)
+                "income": window['ingresos'],
+                "expense": window['gastos'],
+                "net_flow": window['balance']
             }
 
-        current_summary = get_summary(current_period_start, current_period_end)
-        prev_summary = get_summary(prev_period_start, prev_period_end)
+        # Periodo actual y previo en una sola consulta
+        current_window, prev_window = FinancialDataQueries().get_multi_window_summary(
+            entity_id,
+            [(current_period_start, current_period_end), (prev_period_start, prev_period_end)],
+            entity_type,
+        )
+        current_summary = as_summary(current_window)
+        prev_summary = as_summary(prev_window)
 
         def calculate_variation(current, previous):
             if previous == 0:
@@ -0,0 +1,69 @@
+"""Per-request financial facts shared by the orchestrator's sub-tools."""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import FinancialDataQueries
+from database.sql import month_floor
+
+
+def complete_months_net_flow(
+    flows: Iterable[Dict[str, Any]], months: int, now: Optional[datetime] = None
+) -> Optional[float]:
+    """
+    Net flow of the last ``months`` complete calendar months, or None without data.
+
+    The current month is left out, so dividing by ``months`` gives a true
+    monthly average. ``flows`` are get_monthly_flows rows; they must start
+    before the window (query ``months + 1`` months back) so its first month
+    is not cut.
+    """
+    start = month_floor(now, months).isoformat()
+    end = month_floor(now).isoformat()
+    window = [f for f in flows if start <= str(f['mes'])[:10] < end]
+    if not window:
+        return None
+    return sum(f['ingresos'] - f['gastos'] for f in window)
+
+
+@dataclass
+class FinancialFacts:
+    """
+    Aggregates several tools need for the same company, computed once.
+
+    The health score, risk assessment, cash runway and alerts all start from
+    the balance and recent income/expense; loading them here and passing
+    ``facts=`` lets each sub-tool skip its own full-table SUMs.
+    """
+
+    company_id: Optional[str]
+    total_income: float
+    total_expense: float
+    balance: float
+    income_6m: float
+    expense_6m: float
+    monthly_flows: List[Dict[str, Any]] = field(default_factory=list)
+    months_back: int = 12
+
+    @classmethod
+    def load(cls, company_id: Optional[str] = None, months_back: int = 12) -> 'FinancialFacts':
+        """Two statements on a single pooled connection."""
+        data = FinancialDataQueries().get_financial_facts(company_id, months_back)
+        return cls(
+            company_id=company_id,
+            total_income=data['total_ingresos'],
+            total_expense=data['total_gastos'],
+            balance=data['balance'],
+            income_6m=data['ingresos_6m'],
+            expense_6m=data['gastos_6m'],
+            monthly_flows=data['monthly_flows'],
+            months_back=months_back,
+        )
+
+    def covers(self, months: int) -> bool:
+        """Whether monthly_flows reach far enough back for complete_months_net_flow(months)."""
+        return months < self.months_back
+
+    def net_flow_since(self, months: int) -> Optional[float]:
+        """Net flow of the last ``months`` complete months (see complete_months_net_flow)."""
+        return complete_months_net_flow(self.monthly_flows, months)
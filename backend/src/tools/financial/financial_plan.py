@@ -1,4 +1,5 @@
 from database import get_db_connection
+from database.sql import since
 from utils import setup_logger
 import logging
 from datetime import datetime, timedelta
@@ -45,59 +46,62 @@ def generate_financial_plan_tool(
         # 1. Obtener datos históricos si use_saved_data es True
         historical_data = {}
         if use_saved_data and entity_id:
-            # Obtener balance actual
-            balance_query = f"""
-                SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance
-                FROM {table}
-                WHERE {id_column} = %s
-            """
-            balance_rows = db.execute_query(balance_query, (entity_id,), fetch=True)
-            current_balance = 0.0
-            if balance_rows and isinstance(balance_rows, list) and len(balance_rows) > 0:
-                first = balance_rows[0]
-                logger.info(f"Balance row type: {type(first)}, content: {first}")
-                if isinstance(first, dict):
-                    balance_val = first.get('balance', 0)
-                    logger.info(f"Balance value type: {type(balance_val)}, value: {balance_val}")
-                    current_balance = float(balance_val) if balance_val is not None else 0.0
-                else:
-                    logger.warning(f"Expected dict but got {type(first)}: {first}")
+            # Las tres consultas históricas comparten una sola conexión del pool
+            with db.session() as session:
+                # Obtener balance actual
+                balance_query = f"""
+                    SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance
+                    FROM {table}
+                    WHERE {id_column} = %s
+                """
+                balance_rows = session.execute_query(balance_query, (entity_id,), fetch=True)
+                current_balance = 0.0
+                if balance_rows and isinstance(balance_rows, list) and len(balance_rows) > 0:
+                    first = balance_rows[0]
+                    logger.info(f"Balance row type: {type(first)}, content: {first}")
+                    if isinstance(first, dict):
+                        balance_val = first.get('balance', 0)
+                        logger.info(f"Balance value type: {type(balance_val)}, value: {balance_val}")
+                        current_balance = float(balance_val) if balance_val is not None else 0.0
+                    else:
+                        logger.warning(f"Expected dict but got {type(first)}: {first}")
             
-            # Obtener promedios mensuales de los últimos 6 meses
-            avg_query = f"""
-                SELECT 
-                    AVG(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as avg_income,
-                    AVG(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as avg_expense
-                FROM {table}
-                WHERE {id_column} = %s 
-                AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-            """
-            avg_rows = db.execute_query(avg_query, (entity_id,), fetch=True)
-            avg_monthly_income = 0.0
-            avg_monthly_expense = 0.0
-            if avg_rows and isinstance(avg_rows, list) and len(avg_rows) > 0:
-                first = avg_rows[0]
-                logger.info(f"Avg row type: {type(first)}, content: {first}")
-                if isinstance(first, dict):
-                    income_val = first.get('avg_income', 0)
-                    expense_val = first.get('avg_expense', 0)
-                    avg_monthly_income = float(income_val) if income_val is not None else 0.0
-                    avg_monthly_expense = float(expense_val) if expense_val is not None else 0.0
-                else:
-                    logger.warning(f"Expected dict but got {type(first)}: {first}")
+                # Obtener promedios mensuales de los últimos 6 meses
+                window, window_params = since(6)
+                avg_query = f"""
+                    SELECT 
+                        AVG(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as avg_income,
+                        AVG(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as avg_expense
+                    FROM {table}
+                    WHERE {id_column} = %s 
+                    AND {window}
+                """
+                avg_rows = session.execute_query(avg_query, (entity_id, *window_params), fetch=True)
+                avg_monthly_income = 0.0
+                avg_monthly_expense = 0.0
+                if avg_rows and isinstance(avg_rows, list) and len(avg_rows) > 0:
+                    first = avg_rows[0]
+                    logger.info(f"Avg row type: {type(first)}, content: {first}")
+                    if isinstance(first, dict):
+                        income_val = first.get('avg_income', 0)
+                        expense_val = first.get('avg_expense', 0)
+                        avg_monthly_income = float(income_val) if income_val is not None else 0.0
+                        avg_monthly_expense = float(expense_val) if expense_val is not None else 0.0
+                    else:
+                        logger.warning(f"Expected dict but got {type(first)}: {first}")
             
-            # Obtener gastos por categoría (excluyendo Ahorro)
-            category_query = f"""
-                SELECT categoria, AVG(monto) as avg_amount, COUNT(*) as frequency
-                FROM {table}
-                WHERE {id_column} = %s 
-                AND tipo = 'gasto'
-                AND categoria != 'Ahorro'
-                AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                GROUP BY categoria
-                ORDER BY avg_amount DESC
-            """
-            categories_rows = db.execute_query(category_query, (entity_id,), fetch=True)
+                # Obtener gastos por categoría (excluyendo Ahorro)
+                category_query = f"""
+                    SELECT categoria, AVG(monto) as avg_amount, COUNT(*) as frequency
+                    FROM {table}
+                    WHERE {id_column} = %s 
+                    AND tipo = 'gasto'
+                    AND categoria != 'Ahorro'
+                    AND {window}
+                    GROUP BY categoria
+                    ORDER BY avg_amount DESC
+                """
+                categories_rows = session.execute_query(category_query, (entity_id, *window_params), fetch=True)
             
             historical_data = {
                 "current_balance": current_balance,
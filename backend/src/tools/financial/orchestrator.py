@@ -1,6 +1,8 @@
 # src/tools/financial/orchestrator.py
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from . import risk, predictive, analytics, descriptive, budget, planning
+from .facts import FinancialFacts
 
 def get_business_health_check(company_id: str) -> dict:
     """
@@ -16,13 +18,21 @@ def get_business_health_check(company_id: str) -> dict:
         Un diccionario con el resumen ejecutivo y los detalles del análisis.
     """
     try:
-        # 1. Llamar a las herramientas atómicas de análisis
-        health_score = risk.get_financial_health_score_tool(company_id=company_id)
-        risk_assessment = risk.assess_financial_risk_tool(company_id=company_id)
-        cash_runway = predictive.cash_runway_tool(entity_type="company", entity_id=company_id)
-        alerts = risk.get_alerts_tool(company_id=company_id)
-
-        # 2. Sintetizar los resultados en un resumen ejecutivo
+        # 1. Calcular una sola vez los datos que comparten todas las herramientas
+        facts = FinancialFacts.load(company_id)
+
+        # 2. Llamar a las herramientas atómicas de análisis en paralelo
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            health_future = executor.submit(risk.get_financial_health_score_tool, company_id=company_id, facts=facts)
+            risk_future = executor.submit(risk.assess_financial_risk_tool, company_id=company_id, facts=facts)
+            runway_future = executor.submit(predictive.cash_runway_tool, entity_type="company", entity_id=company_id, facts=facts)
+            alerts_future = executor.submit(risk.get_alerts_tool, company_id=company_id, facts=facts)
+            health_score = health_future.result()
+            risk_assessment = risk_future.result()
+            cash_runway = runway_future.result()
+            alerts = alerts_future.result()
+
+        # 3. Sintetizar los resultados en un resumen ejecutivo
         executive_summary = {
             "health_score": health_score.get("financial_health_score"),
             "health_level": health_score.get("level"),
@@ -31,7 +41,7 @@ def get_business_health_check(company_id: str) -> dict:
             "active_critical_alerts": len([a for a in alerts.get("active_alerts", []) if a['severity'] == 'critical'])
         }
 
-        # 3. Generar un insight principal
+        # 4. Generar un insight principal
         insight = "La salud financiera es estable."
         if executive_summary['risk_level'] in ["Crítico", "Alto"]:
             insight = "Atención requerida: El nivel de riesgo es elevado. Revise los factores de riesgo y alertas."
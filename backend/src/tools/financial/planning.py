@@ -1,9 +1,9 @@
 from database import get_db_connection
+from database.sql import since
 from utils import setup_logger
 import logging
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-import pandas as pd
 
 logger = setup_logger('planning_tools', logging.INFO)
 
@@ -71,22 +71,25 @@ def budget_allocator_tool(
         table = "transacciones_personales" if entity_type == "personal" else "transacciones"
         id_column = "usuario_id" if entity_type == "personal" else "empresa_id"
 
+        window, window_params = since(3)
         query = f"""
             SELECT categoria, AVG(monthly_total) as avg_spent
             FROM (
-                SELECT DATE_TRUNC('month', fecha) as month, categoria, SUM(monto) as monthly_total
+                SELECT {db.dialect.month_start()} as month, categoria, SUM(monto) as monthly_total
                 FROM {table}
-                WHERE tipo = 'gasto' AND categoria != 'Ahorro' AND {id_column} = %s AND fecha >= NOW() - INTERVAL '3 months'
+                WHERE tipo = 'gasto' AND categoria != 'Ahorro' AND {id_column} = %s AND {window}
                 GROUP BY month, categoria
             ) as monthly_expenses
             GROUP BY categoria
         """
         
-        historical_spending = db.execute_query(query, (entity_id,), fetch='all')
+        historical_spending = db.execute_query(query, (entity_id, *window_params), fetch='all')
         if not historical_spending:
             return {"success": False, "message": "No hay suficientes datos históricos para asignar un presupuesto."}
 
-        df = pd.DataFrame(historical_spending, columns=['category', 'avg_spent'])
+        import pandas as pd
+
+        df = pd.DataFrame(historical_spending).rename(columns={'categoria': 'category'})
         df['avg_spent'] = df['avg_spent'].astype(float)
 
         df['weight'] = df['avg_spent']
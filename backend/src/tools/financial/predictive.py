@@ -1,59 +1,72 @@
-from database import get_db_connection
+from database import get_db_connection, FinancialDataQueries
+from database.columnar import get_columnar_store, month_index, month_label
+from database.sql import months_ago, since, sum_if
 from utils import setup_logger
+from .facts import FinancialFacts, complete_months_net_flow
 import logging
-import pandas as pd
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+import time
+from datetime import date, timedelta
+from forecasting import (
+    METHODOLOGY, forecast_series, get_model_registry, model_entity, to_monthly_series, validate_accuracy
+)
+from forecasting.vectorized import holt_winters, pivot_monthly
+from utils.offload import get_offload_pool, busy_response, OffloadBusyError, OffloadTimeoutError
 
 logger = setup_logger('predictive_tools', logging.INFO)
 
-def predict_cash_shortage_tool(company_id: str = None, months_ahead: int = 6) -> dict:
+def predict_cash_shortage_tool(company_id: str = None, months_ahead: int = 6, accuracy: str = "fast") -> dict:
     """
     Predice si habrá escasez de efectivo en los próximos meses.
+
+    Proyecta ingresos y gastos con el motor de pronósticos (accuracy="fast"
+    o "full") y recorre el balance acumulado mes a mes.
     """
     try:
-        db = get_db_connection()
-        
-        balance_query = "SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) FROM transacciones"
-        balance_params = []
-        if company_id:
-            balance_query += " WHERE empresa_id = %s"
-            balance_params.append(company_id)
-        current_balance = db.execute_query(balance_query, tuple(balance_params), fetch='one')[0] or 0
-        
-        flow_query = """
-            SELECT 
-                DATE_TRUNC('month', fecha) as month,
-                SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as net_flow
-            FROM transacciones
-            WHERE 1=1
-        """
-        flow_params = []
-        if company_id:
-            flow_query += " AND empresa_id = %s"
-            flow_params.append(company_id)
-        flow_query += " GROUP BY month ORDER BY month DESC LIMIT 12"
+        validate_accuracy(accuracy)
+        queries = FinancialDataQueries()
+        current_balance = queries.get_company_balance(company_id)['balance']
         
-        monthly_flow = db.execute_query(flow_query, tuple(flow_params), fetch='all')
+        monthly_flow = queries.get_monthly_flows(company_id, months_back=24)
         if len(monthly_flow) < 3:
             return {"message": "No hay suficientes datos históricos para una predicción fiable."}
-            
-        avg_monthly_flow = sum(f[1] for f in monthly_flow) / len(monthly_flow)
-        
-        if avg_monthly_flow >= 0:
-            return {"success": True, "prediction": "No se predice escasez de efectivo con las tendencias actuales."}
-            
-        months_to_shortage = -current_balance / avg_monthly_flow
-        
-        if months_to_shortage > months_ahead:
-            return {"success": True, "prediction": f"No se predice escasez en los próximos {months_ahead} meses."}
-        else:
-            return {
-                "success": True,
-                "prediction": "ALERTA: Posible escasez de efectivo.",
-                "estimated_months_to_shortage": round(months_to_shortage, 1),
-                "recommendation": "Revisar gastos urgentemente y buscar formas de incrementar ingresos para evitar una crisis de liquidez."
-            }
-            
+
+        entity = model_entity('company', company_id)
+        income = forecast_series(to_monthly_series(monthly_flow, 'ingresos'), months_ahead, accuracy, entity, 'ingreso')
+        expense = forecast_series(to_monthly_series(monthly_flow, 'gastos'), months_ahead, accuracy, entity, 'gasto')
+        net_flows = income.values - expense.values
+
+        months_to_shortage = None
+        balance = current_balance
+        for i, net in enumerate(net_flows):
+            if balance + net < 0:
+                # Fracción del mes en que el balance cruza cero
+                months_to_shortage = i + (balance / -net if net < 0 and balance > 0 else 0)
+                break
+            balance += net
+
+        base = {
+            "success": True,
+            "methodology": METHODOLOGY.get(income.method, income.method),
+            "accuracy": accuracy,
+            "projected_net_flows": [round(float(v), 2) for v in net_flows],
+        }
+        if income.fallback_reason or expense.fallback_reason:
+            base["fallback_reason"] = income.fallback_reason or expense.fallback_reason
+
+        if months_to_shortage is None:
+            if net_flows.mean() >= 0:
+                return {**base, "prediction": "No se predice escasez de efectivo con las tendencias actuales."}
+            return {**base, "prediction": f"No se predice escasez en los próximos {months_ahead} meses."}
+        return {
+            **base,
+            "prediction": "ALERTA: Posible escasez de efectivo.",
+            "estimated_months_to_shortage": round(months_to_shortage, 1),
+            "recommendation": "Revisar gastos urgentemente y buscar formas de incrementar ingresos para evitar una crisis de liquidez."
+        }
+
+    except (OffloadBusyError, OffloadTimeoutError) as e:
+        logger.warning(f"predict_cash_shortage_tool rechazado por el pool: {e}")
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error en predict_cash_shortage_tool: {e}")
         return {"success": False, "error": str(e)}
@@ -62,37 +75,57 @@ def cash_runway_tool(
     entity_type: str = "company",
     entity_id: str = None,
     current_cash: float = None,
-    burn_method: str = "avg_3m"
+    burn_method: str = "avg_3m",
+    facts: FinancialFacts = None
 ) -> dict:
     """
     Calcula el 'cash runway' o tiempo de supervivencia.
+
+    Si se pasan `facts` (orquestador), el balance y el flujo neto salen de
+    ahí sin consultar la base de datos.
     """
     try:
-        db = get_db_connection()
-        table = "transacciones" if entity_type == "company" else "transacciones_personales"
-        id_column = "empresa_id" if entity_type == "company" else "usuario_id"
+        months = int(burn_method.replace('avg_', '').replace('m', ''))
+
+        if facts is not None and facts.covers(months):
+            if current_cash is None:
+                current_cash = facts.balance
+            net_flow_period = facts.net_flow_since(months)
+        elif entity_type == "company":
+            queries = FinancialDataQueries()
+            if current_cash is None:
+                current_cash = queries.get_company_balance(entity_id)['balance']
+            # Misma ventana que FinancialFacts: los últimos N meses completos
+            flows = queries.get_monthly_flows(entity_id, months_back=months + 1)
+            net_flow_period = complete_months_net_flow(flows, months)
+        else:
+            db = get_db_connection()
+            table = "transacciones_personales"
+            id_column = "usuario_id"
+
+            net_flow = sum_if("tipo = 'ingreso'", otherwise='-monto')
+
+            if current_cash is None:
+                balance_query = f"SELECT {net_flow} AS balance FROM {table}"
+                params = []
+                if entity_id:
+                    balance_query += f" WHERE {id_column} = %s"
+                    params.append(entity_id)
+                rows = db.execute_query(balance_query, tuple(params), fetch='one')
+                current_cash = float(rows[0]['balance'] or 0) if rows else 0.0
 
-        if current_cash is None:
-            balance_query = f"SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) FROM {table}"
-            params = []
+            window, params = since(months)
+            burn_query = f"""
+                SELECT {net_flow} as net_flow
+                FROM {table}
+                WHERE {window}
+            """
             if entity_id:
-                balance_query += f" WHERE {id_column} = %s"
+                burn_query += f" AND {id_column} = %s"
                 params.append(entity_id)
-            current_cash = float(db.execute_query(balance_query, tuple(params), fetch='one')[0] or 0)
-
-        months = int(burn_method.replace('avg_', '').replace('m', ''))
-        
-        burn_query = f"""
-            SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as net_flow
-            FROM {table}
-            WHERE fecha >= NOW() - INTERVAL '{months} months'
-        """
-        params = []
-        if entity_id:
-            burn_query += f" AND {id_column} = %s"
-            params.append(entity_id)
-        
-        net_flow_period = db.execute_query(burn_query, tuple(params), fetch='one')[0]
+            
+            rows = db.execute_query(burn_query, tuple(params), fetch='one')
+            net_flow_period = rows[0]['net_flow'] if rows else None
         
         if net_flow_period is None:
             return {"success": False, "message": f"No hay datos de los últimos {months} meses para calcular el burn rate."}
@@ -125,60 +158,164 @@ def forecast_expenses_by_category_tool(
     entity_type: str = "company",
     entity_id: str = None,
     category: str = None,
-    months_ahead: int = 6
+    months_ahead: int = 6,
+    accuracy: str = "fast"
 ) -> dict:
     """
-    Pronostica gastos futuros para una categoría específica usando un modelo SARIMA.
+    Pronostica gastos futuros para una categoría específica.
+
+    accuracy="fast" usa el pronóstico cerrado en NumPy; "full" usa SARIMA
+    si la categoría tiene suficiente historia.
     """
     try:
+        validate_accuracy(accuracy)
         if not category:
             return {"success": False, "message": "Se debe especificar una categoría para el pronóstico."}
 
-        db = get_db_connection()
-        table = "transacciones" if entity_type == "company" else "transacciones_personales"
-        id_column = "empresa_id" if entity_type == "company" else "usuario_id"
-
-        id_filter = f" AND {id_column} = %s" if entity_id else ""
-        query = f"""
-            SELECT DATE_TRUNC('month', fecha) as month, SUM(monto) as total
-            FROM {table}
-            WHERE tipo = 'gasto' AND categoria = %s {id_filter} AND fecha >= NOW() - INTERVAL '24 months'
-            GROUP BY month ORDER BY month
-        """
+        if entity_type == "company":
+            data = FinancialDataQueries().get_monthly_series(entity_id, 'gasto', months_back=24, category=category)
+        else:
+            db = get_db_connection()
+            id_filter = " AND usuario_id = %s" if entity_id else ""
+            window, window_params = since(24)
+            query = f"""
+                SELECT {db.dialect.month_start()} as mes, SUM(monto) as total
+                FROM transacciones_personales
+                WHERE tipo = 'gasto' AND categoria = %s {id_filter} AND {window}
+                GROUP BY mes ORDER BY mes
+            """
 
-        params = [category]
-        if entity_id:
-            params.append(entity_id)
+            params = [category]
+            if entity_id:
+                params.append(entity_id)
+            params.extend(window_params)
 
-        data = db.execute_query(query, tuple(params), fetch='all')
+            data = db.execute_query(query, tuple(params), fetch='all')
         
-        if len(data) < 12:
-            return {"success": False, "message": f"Se necesitan al menos 12 meses de datos en la categoría '{category}' para un pronóstico fiable."}
+        if not data:
+            return {"success": False, "message": f"No hay datos de gastos en la categoría '{category}'."}
 
-        df = pd.DataFrame(data, columns=['month', 'total'])
-        df['month'] = pd.to_datetime(df['month'])
-        df.set_index('month', inplace=True)
-        series = df['total'].resample('MS').sum()
+        series = to_monthly_series(data)
+        forecast = forecast_series(
+            series, months_ahead, accuracy, model_entity(entity_type, entity_id), f"gasto:{category}"
+        )
 
-        # Configuración del modelo SARIMA
-        sarima_order = (1, 1, 1)
-        sarima_seasonal_order = (0, 1, 1, 12)
-        
-        model = SARIMAX(series, order=sarima_order, seasonal_order=sarima_seasonal_order, enforce_stationarity=False, enforce_invertibility=False).fit(disp=False)
-        forecast = model.get_forecast(steps=months_ahead).predicted_mean
-        forecast_values = forecast.tolist()
-
-        return {
+        result = {
             "success": True,
             "category": category,
-            "methodology": "SARIMA Time Series Forecast",
+            "methodology": METHODOLOGY.get(forecast.method, forecast.method),
+            "accuracy": accuracy,
             "forecast_months": months_ahead,
-            "forecast": {f"month_{i+1}": round(val, 2) for i, val in enumerate(forecast_values)}
+            "forecast": {f"month_{i+1}": val for i, val in enumerate(forecast.rounded())},
+            "timing_ms": round(forecast.elapsed_ms, 3)
         }
+        if forecast.fallback_reason:
+            result["fallback_reason"] = forecast.fallback_reason
+        return result
+    except (OffloadBusyError, OffloadTimeoutError) as e:
+        logger.warning(f"forecast_expenses_by_category_tool rechazado por el pool: {e}")
+        return busy_response(e)
     except Exception as e:
-        logger.error(f"Error en forecast_expenses_by_category_tool (SARIMA): {e}")
+        logger.error(f"Error en forecast_expenses_by_category_tool: {e}")
         return {"success": False, "error": str(e), "message": f"No se pudo generar el pronóstico para la categoría '{category}'."}
 
+def forecast_all_categories_tool(
+    entity_id: str = None,
+    months_ahead: int = 6,
+    top_n_sarima: int = 3,
+    months_back: int = 24
+) -> dict:
+    """
+    Pronostica los gastos de todas las categorías en una sola llamada.
+
+    Una consulta agrupada trae las series de todas las categorías, que se
+    pronostican juntas con Holt-Winters vectorizado (parámetros compartidos).
+    Solo las `top_n_sarima` categorías de mayor gasto usan SARIMA.
+    """
+    try:
+        started = time.perf_counter()
+        rows = FinancialDataQueries().get_monthly_totals_all_categories(entity_id, 'gasto', months_back=months_back)
+        query_ms = (time.perf_counter() - started) * 1000
+        if not rows:
+            return {"success": True, "categories": [], "message": "No hay gastos en el período."}
+
+        first = min(str(r['mes'])[:7] for r in rows)
+        last = max(str(r['mes'])[:7] for r in rows)
+        start, end = (month_index(date.fromisoformat(f"{m}-01")) for m in (first, last))
+        months = [month_label(m) for m in range(start, end + 1)]
+        categories, matrix = pivot_monthly(rows, 'categoria', months)
+
+        started = time.perf_counter()
+        forecast, model_info = holt_winters(matrix, months_ahead)
+        vectorized_ms = (time.perf_counter() - started) * 1000
+
+        results = {}
+        for i, category in enumerate(categories):
+            results[category] = {
+                "category": category,
+                "method": model_info.get('method'),
+                "forecast": {f"month_{j+1}": round(float(v), 2) for j, v in enumerate(forecast[i])},
+                "total_last_12m": round(float(matrix[i, -12:].sum()), 2),
+                "timing_ms": round(vectorized_ms / len(categories), 3),
+            }
+
+        # SARIMA solo para las categorías con más gasto y suficiente historia
+        registry = get_model_registry()
+        ranked = sorted(categories, key=lambda c: results[c]['total_last_12m'], reverse=True)
+        if len(months) >= 12:
+            import pandas as pd
+
+            for category in ranked[:top_n_sarima]:
+                series = pd.Series(matrix[categories.index(category)], index=pd.to_datetime(months))
+                t0 = time.perf_counter()
+                try:
+                    values = registry.forecast(model_entity('company', entity_id), f"gasto:{category}", series, steps=months_ahead)
+                except (OffloadBusyError, OffloadTimeoutError) as e:
+                    # Se conserva el pronóstico vectorizado
+                    results[category]['sarima_skipped'] = str(e)
+                    continue
+                results[category].update({
+                    "method": "sarima",
+                    "forecast": {f"month_{j+1}": round(float(v), 2) for j, v in enumerate(values.tolist())},
+                    "timing_ms": round((time.perf_counter() - t0) * 1000, 3),
+                })
+
+        return {
+            "success": True,
+            "forecast_months": months_ahead,
+            "history_months": len(months),
+            "vectorized_model": model_info,
+            "timing": {
+                "query_ms": round(query_ms, 3),
+                "vectorized_total_ms": round(vectorized_ms, 3),
+                "series": len(categories),
+            },
+            "categories": [results[c] for c in ranked]
+        }
+    except Exception as e:
+        logger.error(f"Error en forecast_all_categories_tool: {e}")
+        return {"success": False, "error": str(e)}
+
+
+def _project_bills(series: list, months_ahead: int) -> list:
+    """Próximas fechas de cada cargo periódico detectado por EntityColumns.periodic_series."""
+    today = date.today()
+    forecasted_bills = []
+    for bill in series:
+        frequency_days = round(bill['mean_gap'])
+        next_date = bill['last_day'] + timedelta(days=frequency_days)
+        for _ in range(months_ahead * 2):
+            if next_date > today and len(forecasted_bills) < months_ahead * len(series):
+                forecasted_bills.append({
+                    "description": bill['counterparty'],
+                    "amount": bill['amount'],
+                    "predicted_date": next_date.strftime('%Y-%m-%d')
+                })
+            next_date += timedelta(days=frequency_days)
+
+    return sorted(list({frozenset(item.items()): item for item in forecasted_bills}.values()), key=lambda x: x['predicted_date'])
+
+
 def bill_forecaster_tool(
     user_id: str = None,
     months_ahead: int = 3
@@ -187,58 +324,16 @@ def bill_forecaster_tool(
     Predice próximas facturas y suscripciones recurrentes.
     """
     try:
-        db = get_db_connection()
-        query = """
-            SELECT descripcion, monto, fecha 
-            FROM transacciones_personales 
-            WHERE usuario_id = %s AND tipo = 'gasto' AND fecha >= NOW() - INTERVAL '4 months'
-            ORDER BY descripcion, fecha
-        """
-        transactions = db.execute_query(query, (user_id,), fetch='all')
-        if not transactions:
+        columns = get_columnar_store().get('personal', user_id)
+        recent_expenses = columns.select('gasto', since=months_ago(4).date())
+        if not recent_expenses.any():
             return {"success": True, "recurring_bills": []}
 
-        df = pd.DataFrame(transactions, columns=['descripcion', 'monto', 'fecha'])
-        df['fecha'] = pd.to_datetime(df['fecha'])
-
-        potential_bills = []
-        df['monto_rounded'] = df['monto'].round(0)
-        
-        for _, group in df.groupby(['descripcion', 'monto_rounded']):
-            if len(group) > 1:
-                group = group.sort_values('fecha')
-                diffs = group['fecha'].diff().dt.days.dropna()
-                
-                if all(28 <= d <= 32 for d in diffs):
-                    last_transaction = group.iloc[-1]
-                    potential_bills.append({
-                        "description": last_transaction['descripcion'],
-                        "amount": float(last_transaction['monto']),
-                        "last_date": last_transaction['fecha'].strftime('%Y-%m-%d'),
-                        "frequency_days": round(diffs.mean())
-                    })
-        
-        forecasted_bills = []
-        from datetime import timedelta
-        today = pd.to_datetime('today')
-
-        for bill in potential_bills:
-            next_date = pd.to_datetime(bill['last_date']) + timedelta(days=int(bill['frequency_days']))
-            for _ in range(months_ahead * 2):
-                if next_date > today:
-                    if len(forecasted_bills) < months_ahead * len(potential_bills):
-                         forecasted_bills.append({
-                            "description": bill['description'],
-                            "amount": bill['amount'],
-                            "predicted_date": next_date.strftime('%Y-%m-%d')
-                        })
-                next_date += timedelta(days=int(bill['frequency_days']))
-        
-        final_forecast = sorted(list({frozenset(item.items()): item for item in forecasted_bills}.values()), key=lambda x: x['predicted_date'])
-
+        # Agrupación por comercio + monto vectorizada: ya no necesita el pool de procesos
+        series = columns.periodic_series(recent_expenses)
         return {
             "success": True,
-            "forecasted_recurring_bills": final_forecast
+            "forecasted_recurring_bills": _project_bills(series, months_ahead)
         }
     except Exception as e:
         logger.error(f"Error en bill_forecaster_tool: {e}")
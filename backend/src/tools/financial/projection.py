@@ -1,79 +1,50 @@
-from database import get_db_connection
+from database import FinancialDataQueries, rollup_enabled
+from database.sql import month_floor
 from utils import setup_logger
 import logging
-import pandas as pd
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+from dateutil.relativedelta import relativedelta
+from forecasting import METHODOLOGY, forecast_series, model_entity, to_monthly_series, validate_accuracy
+from forecasting.scenarios import MAX_SCENARIOS, Baseline, Scenario, simulate
+from utils.offload import busy_response, OffloadBusyError, OffloadTimeoutError
 
 logger = setup_logger('projection_tools', logging.INFO)
 
-def get_cash_flow_projection_tool(company_id: str = None, months: int = 6) -> dict:
+def get_cash_flow_projection_tool(company_id: str = None, months: int = 6, accuracy: str = "fast") -> dict:
     """
-    Proyecta el flujo de caja para los próximos meses usando un modelo estadístico SARIMA.
-    Este método es más avanzado que un promedio simple, ya que captura tendencias y estacionalidad.
+    Proyecta el flujo de caja para los próximos meses.
+
+    accuracy="fast" (por defecto) usa tendencia lineal + índices estacionales
+    en NumPy y funciona con poca historia; accuracy="full" usa SARIMA cuando
+    hay al menos 24 meses y, si no, cae al modo rápido.
     """
     try:
-        db = get_db_connection()
-
-        def get_monthly_series(transaction_type: str):
-            # Necesitamos al menos 2 años de datos para un modelo estacional fiable (s=12)
-            query = """
-                SELECT DATE_TRUNC('month', fecha) as month, SUM(monto) as total
-                FROM transacciones
-                WHERE tipo = %s {company_filter} AND fecha >= NOW() - INTERVAL '24 months'
-                GROUP BY month
-                ORDER BY month
-            """
-            company_filter = "AND empresa_id = %s" if company_id else ""
-            query = query.format(company_filter=company_filter)
-            
-            params = [transaction_type]
-            if company_id:
-                params.append(company_id)
-
-            data = db.execute_query(query, tuple(params), fetch='all')
-            
-            if not data:
-                return pd.Series()
-
-            df = pd.DataFrame(data, columns=['month', 'total'])
-            df['month'] = pd.to_datetime(df['month'])
-            df.set_index('month', inplace=True)
-            # Aseguramos una serie mensual continua, rellenando meses faltantes con 0
-            df = df.resample('MS').sum()
-            return df['total']
-
-        income_series = get_monthly_series('ingreso')
-        expense_series = get_monthly_series('gasto')
-
-        if len(income_series) < 12 or len(expense_series) < 12:
-            return {"success": False, "message": "Se necesitan al menos 12 meses de datos históricos para un pronóstico fiable."}
-
-        # Configuración del modelo SARIMA (simple pero robusta para datos mensuales)
-        sarima_order = (1, 1, 1)
-        sarima_seasonal_order = (0, 1, 1, 12)
-
-        # Pronóstico de Ingresos
-        income_model = SARIMAX(income_series, order=sarima_order, seasonal_order=sarima_seasonal_order, enforce_stationarity=False, enforce_invertibility=False).fit(disp=False)
-        income_forecast = income_model.get_forecast(steps=months).predicted_mean
-
-        # Pronóstico de Gastos
-        expense_model = SARIMAX(expense_series, order=sarima_order, seasonal_order=sarima_seasonal_order, enforce_stationarity=False, enforce_invertibility=False).fit(disp=False)
-        expense_forecast = expense_model.get_forecast(steps=months).predicted_mean
+        validate_accuracy(accuracy)
+        queries = FinancialDataQueries()
+
+        # 24 meses permiten capturar la estacionalidad anual (s=12)
+        income_series = to_monthly_series(queries.get_monthly_series(company_id, 'ingreso', months_back=24))
+        expense_series = to_monthly_series(queries.get_monthly_series(company_id, 'gasto', months_back=24))
+
+        if income_series.empty and expense_series.empty:
+            return {"success": False, "message": "No hay datos históricos para proyectar el flujo de caja."}
+
+        # Pronóstico de Ingresos y Gastos
+        entity = model_entity('company', company_id)
+        income_forecast = forecast_series(income_series, months, accuracy, entity, 'ingreso')
+        expense_forecast = forecast_series(expense_series, months, accuracy, entity, 'gasto')
 
         # Obtener balance actual
-        balance_query = "SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) FROM transacciones"
-        balance_params = []
-        if company_id:
-            balance_query += " WHERE empresa_id = %s"
-            balance_params.append(company_id)
-        current_balance = float(db.execute_query(balance_query, tuple(balance_params), fetch='one')[0] or 0)
+        current_balance = queries.get_company_balance(company_id)['balance']
 
         # Crear la proyección mes a mes
         projection = []
         balance = current_balance
         for i in range(months):
-            proj_income = income_forecast.iloc[i]
-            proj_expense = expense_forecast.iloc[i]
+            proj_income = float(income_forecast.values[i])
+            proj_expense = float(expense_forecast.values[i])
             balance += proj_income - proj_expense
             projection.append({
                 "month": i + 1,
@@ -83,55 +54,139 @@ def get_cash_flow_projection_tool(company_id: str = None, months: int = 6) -> di
                 "projected_balance": round(balance, 2)
             })
 
-        return {
+        result = {
             "success": True,
-            "methodology": "SARIMA Time Series Forecast (Seasonal AutoRegressive Integrated Moving Average)",
+            "methodology": METHODOLOGY.get(income_forecast.method, income_forecast.method),
+            "accuracy": accuracy,
+            "history_months": max(len(income_series), len(expense_series)),
             "current_balance": current_balance,
             "projection": projection,
+            "timing_ms": round(income_forecast.elapsed_ms + expense_forecast.elapsed_ms, 3),
             "recommendation": "Esta proyección se basa en tendencias y patrones estacionales de tus datos históricos. Es más fiable que un promedio simple."
         }
-
+        fallback = income_forecast.fallback_reason or expense_forecast.fallback_reason
+        if fallback:
+            result["fallback_reason"] = fallback
+        return result
+
+    except (OffloadBusyError, OffloadTimeoutError) as e:
+        logger.warning(f"get_cash_flow_projection_tool rechazado por el pool: {e}")
+        return busy_response(e)
     except Exception as e:
-        logger.error(f"Error en get_cash_flow_projection_tool (SARIMA): {e}")
+        logger.error(f"Error en get_cash_flow_projection_tool: {e}")
         return {"success": False, "error": str(e), "message": "No se pudo generar el pronóstico. Puede que no haya suficientes datos históricos o que los datos no sean adecuados para un modelo predictivo."}
 
 
+def _scenario_months(months_back: int) -> List[str]:
+    """The last ``months_back`` complete months ('YYYY-MM-01'), oldest first."""
+    return [month_floor(months_back=k).strftime('%Y-%m-01') for k in range(months_back, 0, -1)]
+
+
+def _future_month(offset: int) -> str:
+    return (month_floor() + relativedelta(months=offset)).strftime('%Y-%m')
+
+
 def simulate_scenario_tool(
-    current_balance: float,
+    current_balance: Optional[float] = None,
     monthly_income_change: float = 0,
     monthly_expense_change: float = 0,
-    months: int = 6
+    months: int = 6,
+    company_id: Optional[str] = None,
+    scenarios: Optional[List[Dict[str, Any]]] = None,
+    baseline_months: int = 6
 ) -> dict:
     """
-    Simula un escenario financiero 'what-if'.
+    Simula escenarios financieros 'what-if' sobre la base real de la empresa.
+
+    La base es el promedio mensual de ingresos y gastos (total y por
+    categoría) de los últimos ``baseline_months`` meses completos. Todos los
+    escenarios se evalúan juntos como una matriz escenarios x meses (ver
+    forecasting.scenarios); el primero es siempre la base sin cambios.
+    Sin ``scenarios``, monthly_income_change/monthly_expense_change definen
+    un único escenario (compatibilidad con la versión anterior).
     """
     try:
-        # En un caso real, se usarían promedios históricos como base
-        base_monthly_income = 50000 
-        base_monthly_expense = 40000
-        
-        new_monthly_income = base_monthly_income + monthly_income_change
-        new_monthly_expense = base_monthly_expense + monthly_expense_change
-        
-        projection = []
-        balance = current_balance
-        for i in range(1, months + 1):
-            balance += new_monthly_income - new_monthly_expense
-            projection.append({
-                "month": i,
-                "projected_balance": round(balance, 2)
+        if scenarios is None:
+            scenarios = [{
+                "name": "escenario",
+                "income_change": monthly_income_change,
+                "expense_change": monthly_expense_change,
+            }]
+        if not isinstance(scenarios, list) or not scenarios:
+            return {"success": False, "error": "scenarios debe ser una lista no vacía"}
+        if len(scenarios) > MAX_SCENARIOS:
+            return {"success": False, "error": f"Máximo {MAX_SCENARIOS} escenarios por llamada (recibidos {len(scenarios)})"}
+        if not 1 <= months <= 24 or not 1 <= baseline_months <= 24:
+            return {"success": False, "error": "months y baseline_months deben estar entre 1 y 24"}
+        parsed = [Scenario.from_dict(s, i) for i, s in enumerate(scenarios)]
+
+        data = FinancialDataQueries().get_scenario_baseline(
+            company_id, months_back=baseline_months, with_balance=current_balance is None
+        )
+        initial_balance = float(current_balance) if current_balance is not None else data['balance']
+        baseline = Baseline.from_rows(
+            data['ingresos'], data['gastos'], _scenario_months(baseline_months), initial_balance
+        )
+        if not baseline.months:
+            return {"success": False, "message": "No hay movimientos en los meses completos recientes para construir la base."}
+        for scenario in parsed:
+            scenario.check(baseline, months)
+
+        started = time.perf_counter()
+        grid = simulate(baseline, [Scenario(name="base"), *parsed], months, initial_balance)
+        summary = grid.summary()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        labels = [_future_month(m) for m in range(1, months + 1)]
+        base_final = float(summary['final_balance'][0])
+        results = []
+        for i, scenario in enumerate([None, *parsed]):
+            first_negative = int(summary['first_negative_month'][i])
+            results.append({
+                "name": scenario.name if scenario else "base",
+                "parameters": asdict(scenario) if scenario else None,
+                "final_balance": round(float(summary['final_balance'][i]), 2),
+                "delta_vs_base": round(float(summary['final_balance'][i]) - base_final, 2),
+                "total_net_flow": round(float(summary['total_net_flow'][i]), 2),
+                "min_balance": round(float(summary['min_balance'][i]), 2),
+                "min_balance_month": int(summary['min_balance_month'][i]),
+                "first_negative_month": first_negative or None,
+                "projection": [
+                    {
+                        "month": m + 1,
+                        "mes": labels[m],
+                        "income": round(float(grid.income[i, m]), 2),
+                        "expense": round(float(grid.expense[i, m]), 2),
+                        "events": round(float(grid.events[i, m]), 2),
+                        "net_flow": round(float(grid.net[i, m]), 2),
+                        "balance": round(float(grid.balance[i, m]), 2),
+                    }
+                    for m in range(months)
+                ],
             })
-            
+
+        ranked = sorted(results[1:], key=lambda r: r['final_balance'])
         return {
             "success": True,
-            "simulation_parameters": {
-                "initial_balance": current_balance,
-                "monthly_income_change": monthly_income_change,
-                "monthly_expense_change": monthly_expense_change,
-                "simulated_months": months
+            "baseline": {
+                "monthly_income": round(baseline.income, 2),
+                "monthly_expense": round(baseline.expense, 2),
+                "monthly_net_flow": round(baseline.income - baseline.expense, 2),
+                "months_averaged": len(baseline.months),
+                "from": baseline.months[0][:7],
+                "to": baseline.months[-1][:7],
+                "source": "rollup" if rollup_enabled() else "finanzas_empresa",
+                "initial_balance": round(initial_balance, 2),
+                "balance_source": "parámetro" if current_balance is not None else "base de datos",
             },
-            "projected_scenario": projection
+            "simulated_months": months,
+            "scenarios": results,
+            "best_scenario": ranked[-1]['name'],
+            "worst_scenario": ranked[0]['name'],
+            "timing_ms": round(elapsed_ms, 3),
         }
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
     except Exception as e:
         logger.error(f"Error en simulate_scenario_tool: {e}")
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e)}
@@ -1,4 +1,7 @@
-from database import get_db_connection
+from database import get_db_connection, FinancialDataQueries
+from database.cache import cached
+from database.sql import current_month, since, sum_if
+from .facts import FinancialFacts
 from utils import setup_logger
 import logging
 
@@ -33,56 +36,61 @@ def safe_float_from_result(result, key=None, index=0):
         logger.error(f"Error al convertir resultado a float: {e}, result={result}")
         return 0.0
 
-def get_financial_health_score_tool(company_id: str = None, user_id: str = None) -> dict:
+@cached('get_financial_health_score_tool')
+def get_financial_health_score_tool(company_id: str = None, user_id: str = None, facts: FinancialFacts = None) -> dict:
     """
     Calcula un score de salud financiera (0-100).
     """
     try:
-        db = get_db_connection()
-        
-        if company_id:
-            table = "finanzas_empresa"
-            id_col = "empresa_id"
-            entity_id = company_id
-        elif user_id:
-            table = "finanzas_personales"
-            id_col = "id_usuario"
-            entity_id = user_id
-        else: # Global
-            table = "finanzas_empresa"
-            id_col = None
-            entity_id = None
+        if facts is not None and not user_id:
+            total_income = facts.total_income
+            total_expense = facts.total_expense
+        else:
+            db = get_db_connection()
 
-        query = f"""
-            SELECT 
-                SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as total_income,
-                SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as total_expense
-            FROM {table}
-        """
-        params = []
-        if entity_id:
-            query += f" WHERE {id_col} = %s"
-            params.append(entity_id)
+            if company_id:
+                table = "finanzas_empresa"
+                id_col = "empresa_id"
+                entity_id = company_id
+            elif user_id:
+                table = "finanzas_personales"
+                id_col = "id_usuario"
+                entity_id = user_id
+            else: # Global
+                table = "finanzas_empresa"
+                id_col = None
+                entity_id = None
+
+            query = f"""
+                SELECT 
+                    SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as total_income,
+                    SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as total_expense
+                FROM {table}
+            """
+            params = []
+            if entity_id:
+                query += f" WHERE {id_col} = %s"
+                params.append(entity_id)
             
-        result = db.execute_query(query, tuple(params), fetch='one')
-        
-        # Manejar diferentes formatos de resultado
-        # Caso 1: Lista con un diccionario dentro [{'total_income': X, 'total_expense': Y}]
-        if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
-            total_income = float(result[0].get('total_income') or 0)
-            total_expense = float(result[0].get('total_expense') or 0)
-        # Caso 2: Diccionario directo {'total_income': X, 'total_expense': Y}
-        elif isinstance(result, dict):
-            total_income = float(result.get('total_income') or 0)
-            total_expense = float(result.get('total_expense') or 0)
-        # Caso 3: Tupla o lista con dos valores (X, Y)
-        elif isinstance(result, (list, tuple)) and len(result) >= 2:
-            total_income = float(result[0] or 0)
-            total_expense = float(result[1] or 0)
-        else:
-            logger.warning(f"Formato de resultado inesperado: {type(result)} - {result}")
-            total_income = 0
-            total_expense = 0
+            result = db.execute_query(query, tuple(params), fetch='one')
+
+            # Manejar diferentes formatos de resultado
+            # Caso 1: Lista con un diccionario dentro [{'total_income': X, 'total_expense': Y}]
+            if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
+                total_income = float(result[0].get('total_income') or 0)
+                total_expense = float(result[0].get('total_expense') or 0)
+            # Caso 2: Diccionario directo {'total_income': X, 'total_expense': Y}
+            elif isinstance(result, dict):
+                total_income = float(result.get('total_income') or 0)
+                total_expense = float(result.get('total_expense') or 0)
+            # Caso 3: Tupla o lista con dos valores (X, Y)
+            elif isinstance(result, (list, tuple)) and len(result) >= 2:
+                total_income = float(result[0] or 0)
+                total_expense = float(result[1] or 0)
+            else:
+                logger.warning(f"Formato de resultado inesperado: {type(result)} - {result}")
+                total_income = 0
+                total_expense = 0
         
         balance = total_income - total_expense
         
@@ -121,57 +129,67 @@ def get_financial_health_score_tool(company_id: str = None, user_id: str = None)
         logger.error(f"Error en get_financial_health_score_tool: {e}")
         return {"success": False, "error": str(e)}
 
-def assess_financial_risk_tool(company_id: str = None) -> dict:
+@cached('assess_financial_risk_tool')
+def assess_financial_risk_tool(company_id: str = None, facts: FinancialFacts = None) -> dict:
     """
     Evalúa el nivel de riesgo financiero de una empresa.
     """
     try:
-        db = get_db_connection()
-        
-        query = """
-            SELECT 
-                SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) as income,
-                SUM(CASE WHEN tipo = 'gasto' THEN monto ELSE 0 END) as expense
-            FROM finanzas_empresa
-            WHERE fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-        """
-        params = []
-        if company_id:
-            query += " AND empresa_id = %s"
-            params.append(company_id)
-        
-        result = db.execute_query(query, tuple(params), fetch='one')
-        
-        # Manejar diferentes formatos de resultado
-        if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
-            income = float(result[0].get('income') or 0)
-            expense = float(result[0].get('expense') or 0)
-        elif isinstance(result, dict):
-            income = float(result.get('income') or 0)
-            expense = float(result.get('expense') or 0)
-        elif isinstance(result, (list, tuple)) and len(result) >= 2:
-            income = float(result[0] or 0)
-            expense = float(result[1] or 0)
+        if facts is not None:
+            income = facts.income_6m
+            expense = facts.expense_6m
+            balance = facts.balance
         else:
-            logger.warning(f"Formato de resultado inesperado en assess_financial_risk: {type(result)} - {result}")
-            income = 0
-            expense = 0
+            db = get_db_connection()
 
-        balance_query = "SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance FROM finanzas_empresa"
-        balance_params = []
-        if company_id:
-            balance_query += " WHERE empresa_id = %s"
-            balance_params.append(company_id)
-        
-        balance_result = db.execute_query(balance_query, tuple(balance_params), fetch='one')
-        if isinstance(balance_result, list) and len(balance_result) > 0 and isinstance(balance_result[0], dict):
-            balance = float(balance_result[0].get('balance') or 0)
-        elif isinstance(balance_result, dict):
-            balance = float(balance_result.get('balance') or 0)
-        elif isinstance(balance_result, (list, tuple)) and len(balance_result) >= 1:
-            balance = float(balance_result[0] or 0)
-        else:
-            balance = 0
+            window, params = since(6)
+            query = f"""
+                SELECT 
+                    {sum_if("tipo = 'ingreso'", alias='income')},
+                    {sum_if("tipo = 'gasto'", alias='expense')}
+                FROM finanzas_empresa
+                WHERE {window}
+            """
+            if company_id:
+                query += " AND empresa_id = %s"
+                params.append(company_id)
+
+            net_flow = sum_if("tipo = 'ingreso'", otherwise='-monto', alias='balance')
+            balance_query = f"SELECT {net_flow} FROM finanzas_empresa"
+            balance_params = []
+            if company_id:
+                balance_query += " WHERE empresa_id = %s"
+                balance_params.append(company_id)
+
+            # Ambas consultas en una sola conexión del pool
+            result, balance_result = db.execute_many_queries([
+                (query, tuple(params)),
+                (balance_query, tuple(balance_params)),
+            ])
+
+            # Manejar diferentes formatos de resultado
+            if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
+                income = float(result[0].get('income') or 0)
+                expense = float(result[0].get('expense') or 0)
+            elif isinstance(result, dict):
+                income = float(result.get('income') or 0)
+                expense = float(result.get('expense') or 0)
+            elif isinstance(result, (list, tuple)) and len(result) >= 2:
+                income = float(result[0] or 0)
+                expense = float(result[1] or 0)
+            else:
+                logger.warning(f"Formato de resultado inesperado en assess_financial_risk: {type(result)} - {result}")
+                income = 0
+                expense = 0
+
+            if isinstance(balance_result, list) and len(balance_result) > 0 and isinstance(balance_result[0], dict):
+                balance = float(balance_result[0].get('balance') or 0)
+            elif isinstance(balance_result, dict):
+                balance = float(balance_result.get('balance') or 0)
+            elif isinstance(balance_result, (list, tuple)) and len(balance_result) >= 1:
+                balance = float(balance_result[0] or 0)
+            else:
+                balance = 0
 
         risk_score = 0
         risk_factors = []
@@ -226,7 +244,8 @@ def assess_financial_risk_tool(company_id: str = None) -> dict:
         return {"success": False, "error": str(e)}
 
 
-def get_alerts_tool(company_id: str = None, severity: str = None) -> dict:
+@cached('get_alerts_tool')
+def get_alerts_tool(company_id: str = None, severity: str = None, facts: FinancialFacts = None) -> dict:
     """
     Obtiene alertas financieras activas.
     """
@@ -234,12 +253,10 @@ def get_alerts_tool(company_id: str = None, severity: str = None) -> dict:
         db = get_db_connection()
         alerts = []
 
-        balance_query = "SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) FROM finanzas_empresa"
-        params = []
-        if company_id:
-            balance_query += " WHERE empresa_id = %s"
-            params.append(company_id)
-        balance = float(db.execute_query(balance_query, tuple(params), fetch='one')[0] or 0)
+        if facts is not None:
+            balance = facts.balance
+        else:
+            balance = FinancialDataQueries().get_company_balance(company_id)['balance']
         
         if balance < 0:
             alerts.append({
@@ -248,23 +265,26 @@ def get_alerts_tool(company_id: str = None, severity: str = None) -> dict:
                 "message": f"El balance actual de la cuenta es de ${balance:.2f}. Se requiere acción inmediata."
             })
 
-        budget_comp_query = """
+        this_month, month_params = current_month()
+        budget_month, budget_params = current_month('mes')
+        budget_comp_query = f"""
             WITH real_expenses AS (
                 SELECT categoria, SUM(monto) as actual
                 FROM finanzas_empresa
-                WHERE tipo = 'gasto' AND MONTH(fecha) = MONTH(NOW()) AND YEAR(fecha) = YEAR(NOW())
+                WHERE tipo = 'gasto' AND {this_month}
                 GROUP BY categoria
             ), budgeted_expenses AS (
                 SELECT categoria, monto_presupuestado as budgeted
                 FROM presupuestos
-                WHERE MONTH(mes) = MONTH(NOW()) AND YEAR(mes) = YEAR(NOW())
+                WHERE {budget_month}
             )
             SELECT b.categoria, r.actual, b.budgeted
             FROM budgeted_expenses b JOIN real_expenses r ON b.categoria = r.categoria
             WHERE r.actual > b.budgeted * 1.20
         """
-        over_budget_cats = db.execute_query(budget_comp_query, fetch='all')
-        for cat, actual, budgeted in over_budget_cats:
+        over_budget_cats = db.execute_query(budget_comp_query, (*month_params, *budget_params), fetch='all')
+        for row in over_budget_cats:
+            cat, actual, budgeted = row['categoria'], float(row['actual']), float(row['budgeted'])
             over_pct = (actual / budgeted - 1) * 100
             alerts.append({
                 "severity": "medium",
@@ -289,63 +309,15 @@ def get_stress_test_tool(company_id: str = None, income_reduction: float = 30.0,
     Realiza una prueba de estrés financiero.
     """
     try:
-        db = get_db_connection()
-        
-        balance_query = "SELECT SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE -monto END) as balance FROM finanzas_empresa"
-        params = []
-        if company_id:
-            balance_query += " WHERE empresa_id = %s"
-            params.append(company_id)
-        balance_result = db.execute_query(balance_query, tuple(params), fetch='one')
-        current_balance = safe_float_from_result(balance_result, 'balance')
+        queries = FinancialDataQueries()
+        current_balance = queries.get_company_balance(company_id)['balance']
 
-        # Calcular promedios mensuales de los últimos 6 meses
-        if company_id:
-            income_query = """
-                SELECT AVG(monthly_total) as avg_income FROM (
-                    SELECT SUM(monto) as monthly_total 
-                    FROM finanzas_empresa 
-                    WHERE tipo = 'ingreso' AND empresa_id = %s 
-                    AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY YEAR(fecha), MONTH(fecha)
-                ) as monthly_incomes
-            """
-            expense_query = """
-                SELECT AVG(monthly_total) as avg_expense FROM (
-                    SELECT SUM(monto) as monthly_total 
-                    FROM finanzas_empresa 
-                    WHERE tipo = 'gasto' AND empresa_id = %s 
-                    AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY YEAR(fecha), MONTH(fecha)
-                ) as monthly_expenses
-            """
-            income_result = db.execute_query(income_query, (company_id,), fetch='one')
-            expense_result = db.execute_query(expense_query, (company_id,), fetch='one')
-            avg_income = safe_float_from_result(income_result, 'avg_income')
-            avg_expense = safe_float_from_result(expense_result, 'avg_expense')
-        else:
-            income_query = """
-                SELECT AVG(monthly_total) as avg_income FROM (
-                    SELECT SUM(monto) as monthly_total 
-                    FROM finanzas_empresa 
-                    WHERE tipo = 'ingreso'
-                    AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY YEAR(fecha), MONTH(fecha)
-                ) as monthly_incomes
-            """
-            expense_query = """
-                SELECT AVG(monthly_total) as avg_expense FROM (
-                    SELECT SUM(monto) as monthly_total 
-                    FROM finanzas_empresa 
-                    WHERE tipo = 'gasto'
-                    AND fecha >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY YEAR(fecha), MONTH(fecha)
-                ) as monthly_expenses
-            """
-            income_result = db.execute_query(income_query, fetch='one')
-            expense_result = db.execute_query(expense_query, fetch='one')
-            avg_income = safe_float_from_result(income_result, 'avg_income')
-            avg_expense = safe_float_from_result(expense_result, 'avg_expense')
+        # Promedios mensuales de los últimos 6 meses (del rollup si está activo)
+        flows = queries.get_monthly_flows(company_id, months_back=6)
+        income_months = [f['ingresos'] for f in flows if f['n_ingresos']]
+        expense_months = [f['gastos'] for f in flows if f['n_gastos']]
+        avg_income = sum(income_months) / len(income_months) if income_months else 0.0
+        avg_expense = sum(expense_months) / len(expense_months) if expense_months else 0.0
 
         stressed_income = float(avg_income) * (1 - income_reduction / 100)
         stressed_expense = float(avg_expense) * (1 + expense_increase / 100)
@@ -0,0 +1,218 @@
+"""
+Tool registry shared by the stdio and HTTP servers.
+
+Maps tool names to their callables and JSON argument schemas (O(1) lookup
+instead of an ``if name == ...`` chain). Synchronous tools run in a bounded
+thread pool, so a slow database call does not block the event loop. Each
+tool also has its own concurrency limit, so a burst of forecasts cannot take
+every worker away from cheap lookups.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from utils import setup_logger
+from utils.offload import run_tool_cancellable
+
+logger = setup_logger('tool_registry', logging.INFO)
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A tool as both servers expose it: callable, description and argument schema."""
+
+    name: str
+    func: Callable[..., Any]
+    description: str = ''
+    input_schema: Dict[str, Any] = field(default_factory=lambda: {'type': 'object', 'properties': {}})
+    # Llamadas simultáneas de esta herramienta (None: el default del registro)
+    max_concurrency: Optional[int] = None
+
+    @property
+    def is_async(self) -> bool:
+        return asyncio.iscoroutinefunction(self.func)
+
+    def bind(self, arguments: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        """
+        Keyword arguments for ``func`` from the client's arguments.
+
+        Unknown keys are dropped (clients cannot reach internal parameters
+        such as ``facts``), missing keys take the schema ``default`` and
+        missing required keys raise ValueError.
+        """
+        arguments = arguments or {}
+        properties = self.input_schema.get('properties', {})
+        missing = [k for k in self.input_schema.get('required', ()) if arguments.get(k) is None]
+        if missing:
+            raise ValueError(f"Faltan argumentos requeridos para {self.name}: {', '.join(missing)}")
+        kwargs = {}
+        for key, prop in properties.items():
+            if key in arguments:
+                kwargs[key] = arguments[key]
+            elif 'default' in prop:
+                kwargs[key] = prop['default']
+        return kwargs
+
+
+class _ToolSlot:
+    """Concurrency limit and counters of one tool."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.errors = 0
+
+
+class ToolRegistry:
+    """
+    Name -> ToolSpec with a bounded executor for synchronous tools.
+
+    ``call(name, arguments)`` validates raw client arguments; ``run(name,
+    **kwargs)`` is for handlers that already have typed arguments (FastMCP).
+    Both wait for a free slot of the tool, then await coroutine tools
+    directly or run sync ones in the pool with the request's cancellation
+    token (see utils.offload.run_tool_cancellable).
+    """
+
+    def __init__(
+        self,
+        specs: Iterable[ToolSpec] = (),
+        max_workers: int = 16,
+        default_concurrency: int = 8,
+        overrides: Optional[Mapping[str, int]] = None,
+    ):
+        self.max_workers = max_workers
+        self.default_concurrency = default_concurrency
+        self.overrides = dict(overrides or {})
+        self._specs: Dict[str, ToolSpec] = {}
+        self._slots: Dict[str, _ToolSlot] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        for spec in specs:
+            self.register(spec)
+
+    @classmethod
+    def from_env(cls, specs: Iterable[ToolSpec] = ()) -> 'ToolRegistry':
+        return cls(
+            specs,
+            max_workers=int(os.getenv('TOOL_WORKERS', min(32, (os.cpu_count() or 1) + 4))),
+            default_concurrency=int(os.getenv('TOOL_MAX_CONCURRENCY', 8)),
+            overrides=parse_overrides(os.getenv('TOOL_CONCURRENCY', '')),
+        )
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        if spec.name in self._specs:
+            raise ValueError(f"Herramienta duplicada: {spec.name}")
+        limit = self.overrides.get(spec.name, spec.max_concurrency or self.default_concurrency)
+        self._specs[spec.name] = spec
+        self._slots[spec.name] = _ToolSlot(max(1, limit))
+        return spec
+
+    def get(self, name: str) -> ToolSpec:
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise ValueError(f"Herramienta desconocida: {name}")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def specs(self) -> List[ToolSpec]:
+        return list(self._specs.values())
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tool')
+        return self._executor
+
+    async def call(self, name: str, arguments: Optional[Mapping[str, Any]] = None) -> Any:
+        """Run a tool from raw client arguments (validated against its schema)."""
+        spec = self.get(name)
+        return await self.run(name, **spec.bind(arguments))
+
+    async def run(self, name: str, **kwargs) -> Any:
+        """Run a tool with keyword arguments, honouring its concurrency limit."""
+        spec = self.get(name)
+        slot = self._slots[name]
+        slot.waiting += 1
+        try:
+            await slot.semaphore.acquire()
+        finally:
+            slot.waiting -= 1
+        slot.in_flight += 1
+        slot.calls += 1
+        try:
+            if spec.is_async:
+                return await spec.func(**kwargs)
+            return await self.offload(spec.func, **kwargs)
+        except Exception:
+            slot.errors += 1
+            raise
+        finally:
+            slot.in_flight -= 1
+            slot.semaphore.release()
+
+    async def offload(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a synchronous callable in the registry's pool (no per-tool limit)."""
+        return await run_tool_cancellable(func, *args, executor=self._get_executor(), **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        by_tool = {
+            name: {
+                'limit': s.limit, 'in_flight': s.in_flight, 'waiting': s.waiting,
+                'calls': s.calls, 'errors': s.errors,
+            }
+            for name, s in self._slots.items()
+        }
+        return {
+            'tools': len(self._specs),
+            'max_workers': self.max_workers,
+            'in_flight': sum(s['in_flight'] for s in by_tool.values()),
+            'waiting': sum(s['waiting'] for s in by_tool.values()),
+            'by_tool': by_tool,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def parse_overrides(value: str) -> Dict[str, int]:
+    """'forecast_all_categories=1,list_transactions=16' -> {name: limit}."""
+    out = {}
+    for item in value.split(','):
+        name, sep, limit = item.partition('=')
+        if not sep:
+            continue
+        try:
+            out[name.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"TOOL_CONCURRENCY: límite inválido para {name.strip()}: {limit!r}")
+    return out
+
+
+_registry: Optional[ToolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry() -> ToolRegistry:
+    """Get the process-wide registry with every tool in tools.catalog."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from .catalog import TOOLS
+
+                _registry = ToolRegistry.from_env(TOOLS)
+    return _registry
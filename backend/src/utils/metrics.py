@@ -0,0 +1,417 @@
+"""Per-tool and per-statement instrumentation (histograms, snapshot, Prometheus text)."""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROWS_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTES_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304)
+
+# Sentencias distintas que se siguen por separado; el resto se agrupa en 'other'
+MAX_FINGERPRINTS = int(os.getenv('METRICS_MAX_FINGERPRINTS', 500))
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\([^)]*\)s|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a statement so executions that differ only in literals share a key.
+
+    Literals and placeholders become ``?``, IN lists and multi-row VALUES
+    collapse to a single item, and whitespace/comments are removed.
+    """
+    text = _COMMENT.sub(' ', sql)
+    text = _STRING.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('(?)', text)
+    text = _VALUES_LIST.sub(r'\1', text)
+    return _SPACE.sub(' ', text).strip()
+
+
+def fingerprint_id(fp: str) -> str:
+    return hashlib.sha1(fp.encode()).hexdigest()[:12]
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus semantics: cumulative ``le`` buckets)."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, running = [], 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            out.append((repr(float(bound)), running))
+        out.append(('+Inf', self.count))
+        return out
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': round(self.max, 6),
+        }
+
+
+@dataclass
+class ToolInvocation:
+    """Counters accumulated while one tool call is in flight."""
+
+    name: str
+    started: float
+    db_seconds: float = 0.0
+    queries: int = 0
+    rows: int = 0
+    payload_bytes: int = 0
+    # Tamaño antes de utils.shaping (0: la respuesta no se reformateó)
+    payload_raw_bytes: int = 0
+    error: bool = False
+
+
+# Invocación en curso; asyncio.to_thread y anyio copian el contexto, así que
+# las consultas hechas en hilos auxiliares se atribuyen a la herramienta
+_current: ContextVar[Optional[ToolInvocation]] = ContextVar('metrics_tool_invocation', default=None)
+
+
+class _ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.duration = Histogram(SECONDS_BUCKETS)
+        self.db_time = Histogram(SECONDS_BUCKETS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.rows = Histogram(ROWS_BUCKETS)
+        self.payload = Histogram(BYTES_BUCKETS)
+        self.saved_bytes = 0
+
+
+class _QueryStats:
+    def __init__(self, fp: str):
+        self.fingerprint = fp
+        self.duration = Histogram(SECONDS_BUCKETS)
+        self.rows = 0
+
+
+class Metrics:
+    """Process-wide store for tool and SQL statement metrics."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._queries: Dict[str, _QueryStats] = {}
+        self._started = time.time()
+
+    @classmethod
+    def from_env(cls) -> 'Metrics':
+        return cls(enabled=os.getenv('METRICS_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes', 'on'))
+
+    # ---- SQL ----
+
+    def record_query(self, sql: str, seconds: float, rows: int = 0) -> None:
+        """Record one executed statement (called by the database sessions)."""
+        if not self.enabled:
+            return
+        invocation = _current.get()
+        if invocation is not None:
+            invocation.db_seconds += seconds
+            invocation.queries += 1
+            invocation.rows += rows
+
+        fp = fingerprint(sql)
+        with self._lock:
+            stats = self._queries.get(fp)
+            if stats is None:
+                if len(self._queries) >= MAX_FINGERPRINTS:
+                    fp = 'other'
+                    stats = self._queries.get(fp)
+                if stats is None:
+                    stats = self._queries[fp] = _QueryStats(fp)
+            stats.duration.observe(seconds)
+            stats.rows += rows
+
+    # ---- Herramientas ----
+
+    def begin_tool(self, name: str) -> Tuple[ToolInvocation, Any]:
+        """Start timing a tool call; returns (invocation, token for end_tool)."""
+        invocation = ToolInvocation(name=name, started=time.perf_counter())
+        return invocation, _current.set(invocation)
+
+    def end_tool(self, invocation: ToolInvocation, token: Any = None) -> None:
+        """Stop timing a tool call and fold its counters into the histograms."""
+        if token is not None:
+            _current.reset(token)
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - invocation.started
+        with self._lock:
+            stats = self._tools.get(invocation.name)
+            if stats is None:
+                stats = self._tools[invocation.name] = _ToolStats()
+            stats.calls += 1
+            stats.errors += int(invocation.error)
+            stats.duration.observe(elapsed)
+            stats.db_time.observe(invocation.db_seconds)
+            stats.queries.observe(invocation.queries)
+            stats.rows.observe(invocation.rows)
+            stats.payload.observe(invocation.payload_bytes)
+            if invocation.payload_raw_bytes:
+                stats.saved_bytes += max(invocation.payload_raw_bytes - invocation.payload_bytes, 0)
+
+    @contextmanager
+    def tool_timer(self, name: str) -> Iterator[ToolInvocation]:
+        """Context manager form of begin_tool/end_tool; exceptions count as errors."""
+        invocation, token = self.begin_tool(name)
+        try:
+            yield invocation
+        except BaseException:
+            invocation.error = True
+            raise
+        finally:
+            self.end_tool(invocation, token)
+
+    # ---- Lectura ----
+
+    def snapshot(self, top_queries: int = 20) -> Dict[str, Any]:
+        """Tool histograms, the slowest statements by total time and component stats."""
+        with self._lock:
+            tools = {
+                name: {
+                    'calls': s.calls,
+                    'errors': s.errors,
+                    'duration_seconds': s.duration.summary(),
+                    'db_seconds': s.db_time.summary(),
+                    'queries': s.queries.summary(),
+                    'rows': s.rows.summary(),
+                    'payload_bytes': s.payload.summary(),
+                    'payload_saved_bytes': s.saved_bytes,
+                }
+                for name, s in self._tools.items()
+            }
+            ranked = sorted(self._queries.values(), key=lambda q: q.duration.sum, reverse=True)
+            queries = [
+                {
+                    'id': fingerprint_id(q.fingerprint),
+                    'fingerprint': q.fingerprint,
+                    'rows': q.rows,
+                    'duration_seconds': q.duration.summary(),
+                }
+                for q in ranked[:top_queries]
+            ]
+        return {
+            'uptime_seconds': round(time.time() - self._started, 1),
+            'tools': tools,
+            'queries': queries,
+            'components': component_stats(),
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+
+        def histogram(metric: str, help_text: str, series: List[Tuple[Dict[str, str], Histogram]]) -> None:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, h in series:
+                base = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                for le, count in h.cumulative():
+                    lines.append(f'{metric}_bucket{{{base},le="{le}"}} {count}')
+                lines.append(f'{metric}_sum{{{base}}} {h.sum}')
+                lines.append(f'{metric}_count{{{base}}} {h.count}')
+
+        with self._lock:
+            tools = list(self._tools.items())
+            histogram('mcp_tool_duration_seconds', 'Wall time per tool call.',
+                      [({'tool': n}, s.duration) for n, s in tools])
+            histogram('mcp_tool_db_seconds', 'Database time per tool call.',
+                      [({'tool': n}, s.db_time) for n, s in tools])
+            histogram('mcp_tool_queries', 'SQL statements per tool call.',
+                      [({'tool': n}, s.queries) for n, s in tools])
+            histogram('mcp_tool_rows', 'Rows fetched or affected per tool call.',
+                      [({'tool': n}, s.rows) for n, s in tools])
+            histogram('mcp_tool_payload_bytes', 'Serialized result size per tool call.',
+                      [({'tool': n}, s.payload) for n, s in tools])
+            lines.append('# HELP mcp_tool_errors_total Tool calls that raised or returned success=false.')
+            lines.append('# TYPE mcp_tool_errors_total counter')
+            for n, s in tools:
+                lines.append(f'mcp_tool_errors_total{{tool="{_escape(n)}"}} {s.errors}')
+            lines.append('# HELP mcp_tool_payload_saved_bytes_total Bytes removed by response shaping (projection, columns, compact JSON).')
+            lines.append('# TYPE mcp_tool_payload_saved_bytes_total counter')
+            for n, s in tools:
+                lines.append(f'mcp_tool_payload_saved_bytes_total{{tool="{_escape(n)}"}} {s.saved_bytes}')
+
+            queries = list(self._queries.values())
+            histogram('db_query_duration_seconds', 'Execution time per normalized SQL statement.',
+                      [({'query_id': fingerprint_id(q.fingerprint)}, q.duration) for q in queries])
+            lines.append('# HELP db_query_rows_total Rows fetched or affected per normalized SQL statement.')
+            lines.append('# TYPE db_query_rows_total counter')
+            for q in queries:
+                lines.append(f'db_query_rows_total{{query_id="{fingerprint_id(q.fingerprint)}"}} {q.rows}')
+            lines.append('# HELP db_query_info Normalized SQL text for each query_id.')
+            lines.append('# TYPE db_query_info gauge')
+            for q in queries:
+                lines.append(
+                    f'db_query_info{{query_id="{fingerprint_id(q.fingerprint)}",'
+                    f'fingerprint="{_escape(q.fingerprint[:300])}"}} 1'
+                )
+
+        lines.append('# HELP mcp_component_stat Numeric stats from the pool, caches and offload workers.')
+        lines.append('# TYPE mcp_component_stat gauge')
+        for component, stats in component_stats().items():
+            for key, value in _flatten(stats):
+                lines.append(f'mcp_component_stat{{component="{component}",stat="{key}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools.clear()
+            self._queries.clear()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _flatten(stats: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, float]]:
+    for key, value in stats.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict) and not prefix:
+            # Solo un nivel (p. ej. wait_time_p95)
+            yield from _flatten(value, f'{name}_')
+
+
+def component_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Stats of the components already loaded in this process.
+
+    Only modules that are already imported are queried, so a snapshot never
+    opens the database pool or imports statsmodels by itself.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    connection = sys.modules.get('database.connection')
+    if connection is not None and connection.DatabaseConnection._pool is not None:
+        collectors.append(('db_pool', lambda: connection.get_db_connection().pool_stats()))
+    cache = sys.modules.get('database.cache')
+    if cache is not None:
+        collectors.append(('result_cache', lambda: {
+            k: v for k, v in cache.get_result_cache().stats().items() if k != 'by_name'
+        }))
+    registry = sys.modules.get('forecasting.registry')
+    if registry is not None:
+        collectors.append(('model_registry', lambda: registry.get_model_registry().stats()))
+    slowlog = sys.modules.get('database.slowlog')
+    if slowlog is not None:
+        collectors.append(('slow_queries', lambda: slowlog.get_slow_query_log().stats()))
+    columnar = sys.modules.get('database.columnar')
+    if columnar is not None and columnar._store is not None:
+        collectors.append(('columnar_store', lambda: columnar.get_columnar_store().stats()))
+    replica = sys.modules.get('database.replica')
+    if replica is not None and replica._replica is not None:
+        collectors.append(('analytics_replica', lambda: replica.get_analytical_replica().stats()))
+    tool_registry = sys.modules.get('tools.registry')
+    if tool_registry is not None and tool_registry._registry is not None:
+        collectors.append(('tool_registry', lambda: {
+            k: v for k, v in tool_registry.get_tool_registry().stats().items() if k != 'by_tool'
+        }))
+    offload = sys.modules.get('utils.offload')
+    if offload is not None:
+        collectors.append(('offload', lambda: offload.get_offload_pool().stats()))
+
+    for name, collect in collectors:
+        try:
+            out[name] = collect()
+        except Exception as e:
+            logger.debug(f"Could not collect {name} stats: {e}")
+    return out
+
+
+def payload_size(result: Any) -> int:
+    """Size in bytes of ``result`` as the servers serialize it (JSON, UTF-8)."""
+    if isinstance(result, (str, bytes)):
+        return len(result.encode() if isinstance(result, str) else result)
+    try:
+        return len(json.dumps(result, ensure_ascii=False, default=str).encode())
+    except (TypeError, ValueError):
+        return 0
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics singleton."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics.from_env()
+    return _metrics
+
+
+def record_query(sql: str, seconds: float, rows: int = 0) -> None:
+    """Shortcut used by the database layer."""
+    get_metrics().record_query(sql, seconds, rows)
+
+
+def current_invocation() -> Optional[ToolInvocation]:
+    """Tool call being timed in this context, if any (for middleware that resizes the payload)."""
+    return _current.get()
@@ -0,0 +1,203 @@
+"""Bounded process pool for CPU-heavy analytics (SARIMA fits, pandas groupbys)."""
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Token de cancelación de la petición en curso (lo activa run_tool_cancellable
+# cuando el cliente se desconecta)
+_cancel_token: ContextVar[Optional[threading.Event]] = ContextVar('offload_cancel_token', default=None)
+
+_POLL_INTERVAL = 0.1
+
+
+class OffloadBusyError(Exception):
+    """Raised when the pool already has max_pending jobs queued or running."""
+
+
+class OffloadTimeoutError(Exception):
+    """Raised when a job does not finish within its timeout."""
+
+
+class OffloadCancelledError(Exception):
+    """Raised when the calling request was cancelled while waiting."""
+
+
+class OffloadPool:
+    """
+    ProcessPoolExecutor with a pending-jobs limit, per-job timeout and cancellation.
+
+    Jobs run in separate processes so a long fit does not hold the server's
+    GIL. A slot is held until the job really ends: jobs that time out or are
+    cancelled after starting keep running to completion (a worker process
+    cannot be interrupted individually), and keep counting towards
+    max_pending so the busy limit stays honest.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, timeout: float = 30.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'busy_rejections': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'failed': 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> 'OffloadPool':
+        default_workers = max(1, (os.cpu_count() or 2) // 2)
+        return cls(
+            max_workers=int(os.getenv('OFFLOAD_WORKERS', default_workers)),
+            max_pending=int(os.getenv('OFFLOAD_MAX_PENDING', 8)),
+            timeout=float(os.getenv('OFFLOAD_TIMEOUT', 30)),
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: los workers no heredan conexiones ni hilos del servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._executor
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self._stats['failed'] += 1
+            else:
+                self._stats['completed'] += 1
+
+    def run(self, fn: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` in the pool and wait for its result.
+
+        ``fn`` and its arguments must be picklable (module-level functions).
+        With max_workers=0 the call runs inline, which is handy for debugging.
+
+        Raises:
+            OffloadBusyError: if max_pending jobs are already in flight
+            OffloadTimeoutError: if the job exceeds its timeout
+            OffloadCancelledError: if the request was cancelled while waiting
+        """
+        if self.max_workers <= 0:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats['busy_rejections'] += 1
+                raise OffloadBusyError(
+                    f"Servidor ocupado: {self._pending} cálculos en curso (máximo {self.max_pending})"
+                )
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        try:
+            with self._lock:
+                future = self._get_executor().submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._on_done)
+
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        token = _cancel_token.get()
+        while True:
+            try:
+                return future.result(timeout=min(_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                pass
+            if token is not None and token.is_set():
+                future.cancel()
+                with self._lock:
+                    self._stats['cancelled'] += 1
+                raise OffloadCancelledError("Petición cancelada por el cliente")
+            if time.monotonic() >= deadline:
+                future.cancel()
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise OffloadTimeoutError(f"El cálculo excedió {timeout:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                **self._stats,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_pool: Optional[OffloadPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_offload_pool() -> OffloadPool:
+    """Get the process-wide offload pool singleton."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OffloadPool.from_env()
+    return _pool
+
+
+async def run_tool_cancellable(func: Callable, *args, executor: Optional[Executor] = None, **kwargs) -> Any:
+    """
+    Run a synchronous tool in a thread from an async handler.
+
+    If the awaiting task is cancelled (e.g. the MCP client disconnects), any
+    offloaded job the tool is waiting on is cancelled too instead of
+    occupying a pool slot for a result nobody will read. ``executor``
+    defaults to the event loop's default thread pool.
+    """
+    event = threading.Event()
+    reset = _cancel_token.set(event)
+    try:
+        # Se copia el contexto, así el hilo ve el token (y la invocación de métricas)
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+    except asyncio.CancelledError:
+        event.set()
+        raise
+    finally:
+        _cancel_token.reset(reset)
+
+
+def busy_response(error: Exception) -> Dict[str, Any]:
+    """Standard tool response when the offload pool rejects or abandons a job."""
+    return {
+        "success": False,
+        "busy": isinstance(error, OffloadBusyError),
+        "error": str(error),
+        "message": "El servidor está procesando otros cálculos. Intente de nuevo en unos segundos."
+        if isinstance(error, OffloadBusyError) else "El cálculo no terminó a tiempo."
+    }
@@ -0,0 +1,186 @@
+"""
+Response shaping: field projection, column-oriented tables and compact JSON.
+
+Tool results are nested dicts with long lists of uniform rows (projections,
+transactions, categories). Each call may pass ``fields`` to keep only some
+paths and ``encoding='columns'`` to turn every list of objects into
+``{"cols": [...], "rows": [[...], ...]}``, so key names are sent once per
+table instead of once per row. Serialization is compact (orjson when
+installed) unless RESPONSE_PRETTY is set.
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ('records', 'columns')
+
+# Argumentos de forma que aceptan todas las herramientas (se quitan antes de llamarlas)
+SHAPING_SCHEMA: Dict[str, Dict[str, Any]] = {
+    'fields': {
+        'type': 'array',
+        'items': {'type': 'string'},
+        'description': (
+            "Devolver solo estas rutas del resultado, separadas por punto "
+            "(p. ej. 'summary' o 'projections.balance'); success/error se conservan siempre"
+        ),
+    },
+    'encoding': {
+        'type': 'string',
+        'enum': list(ENCODINGS),
+        'description': "'columns': cada lista de objetos se devuelve como {cols, rows}",
+    },
+}
+
+# Claves que la proyección nunca quita: el cliente necesita saber si falló
+_ALWAYS_KEEP = ('success', 'error', 'message', 'busy')
+
+# Listas de objetos más cortas se dejan como registros
+MIN_COLUMN_ROWS = 2
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+@dataclass(frozen=True)
+class ShapeOptions:
+    fields: Optional[Tuple[str, ...]] = None
+    encoding: str = 'records'
+    pretty: bool = False
+
+    @property
+    def is_default(self) -> bool:
+        return not self.fields and self.encoding == 'records'
+
+    @classmethod
+    def from_env(cls) -> 'ShapeOptions':
+        encoding = os.getenv('RESPONSE_ENCODING', 'records').strip().lower()
+        return cls(
+            encoding=encoding if encoding in ENCODINGS else 'records',
+            pretty=_env_bool('RESPONSE_PRETTY', False),
+        )
+
+    @classmethod
+    def pop_from(cls, arguments: Optional[Dict[str, Any]]) -> 'ShapeOptions':
+        """
+        Take ``fields``/``encoding`` out of a tool's arguments (in place).
+
+        Raises:
+            ValueError: on an unknown encoding or a non-list ``fields``
+        """
+        defaults = cls.from_env()
+        if not arguments:
+            return defaults
+        fields = arguments.pop('fields', None)
+        encoding = arguments.pop('encoding', None) or defaults.encoding
+        if fields is not None and (
+            not isinstance(fields, (list, tuple)) or not all(isinstance(f, str) for f in fields)
+        ):
+            raise ValueError("fields debe ser una lista de rutas (strings)")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding debe ser uno de {', '.join(ENCODINGS)}")
+        return cls(fields=tuple(fields) if fields else None, encoding=encoding, pretty=defaults.pretty)
+
+
+def with_shaping_schema(schema: Mapping[str, Any]) -> Dict[str, Any]:
+    """A tool's argument schema plus the shaping arguments."""
+    properties = {**schema.get('properties', {}), **SHAPING_SCHEMA}
+    return {**schema, 'properties': properties}
+
+
+def _path_tree(fields: Sequence[str]) -> Dict[str, Any]:
+    """['a.b', 'a.c', 'd'] -> {'a': {'b': {}, 'c': {}}, 'd': {}}; {} means 'keep all'."""
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        parts = [p for p in path.split('.') if p]
+        for i, part in enumerate(parts):
+            if part in node and not node[part]:
+                break  # un prefijo ya pide el subárbol completo
+            if i == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _project(value: Any, tree: Mapping[str, Any]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {k: _project(v, tree[k]) for k, v in value.items() if k in tree}
+    return value
+
+
+def project(result: Any, fields: Sequence[str]) -> Any:
+    """Keep only the dotted ``fields`` paths; lists apply the sub-path to every item."""
+    tree = _path_tree(fields)
+    if not isinstance(result, dict):
+        return _project(result, tree)
+    out = _project(result, tree)
+    for key in _ALWAYS_KEEP:
+        if key in result and key not in out:
+            out[key] = result[key]
+    return out
+
+
+def to_columns(value: Any, min_rows: int = MIN_COLUMN_ROWS) -> Any:
+    """Turn every list of dicts (at any depth) into {"cols": [...], "rows": [[...]]}."""
+    if isinstance(value, dict):
+        return {k: to_columns(v, min_rows) for k, v in value.items()}
+    if isinstance(value, list):
+        if len(value) >= min_rows and all(isinstance(item, dict) for item in value):
+            cols: Dict[str, None] = {}
+            for item in value:
+                cols.update(dict.fromkeys(item))
+            names = list(cols)
+            return {
+                'cols': names,
+                'rows': [[to_columns(item.get(c), min_rows) for c in names] for item in value],
+            }
+        return [to_columns(item, min_rows) for item in value]
+    return value
+
+
+def shape(result: Any, options: ShapeOptions) -> Any:
+    """Apply projection, then column encoding."""
+    if options.fields:
+        result = project(result, options.fields)
+    if options.encoding == 'columns':
+        result = to_columns(result)
+    return result
+
+
+def dumps(value: Any, pretty: bool = False) -> str:
+    """JSON text; orjson when installed (non-ASCII kept, Decimal/date via str)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(value, default=str, option=option).decode()
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False, default=str)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def render(result: Any, options: ShapeOptions) -> str:
+    """Shaped result as the text block the servers send."""
+    return dumps(shape(result, options), pretty=options.pretty)
+
+
+def size_of(text: str) -> int:
+    return len(text.encode())
@@ -0,0 +1,126 @@
+"""Background warm-up after the server starts listening, and readiness state."""
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Módulos pesados que solo usan los pronósticos: se precargan tras abrir el puerto
+# para que la primera llamada a una herramienta no pague su import
+PRELOAD_MODULES = ('pandas', 'statsmodels.tsa.statespace.sarimax')
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _check_database() -> str:
+    from database import get_db_connection
+
+    if not get_db_connection().test_connection():
+        raise RuntimeError('SELECT 1 falló')
+    return 'pool listo'
+
+
+def _preload_modules() -> str:
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    return ', '.join(PRELOAD_MODULES)
+
+
+class StartupState:
+    """
+    Runs each warm-up step in its own daemon thread and tracks readiness.
+
+    Liveness only means the process answers; readiness means every
+    ``required`` step has succeeded. A failed required step is retried every
+    ``retry_interval`` seconds, so a database that comes up later turns the
+    server ready without a restart.
+    """
+
+    def __init__(self, preload: bool = True, retry_interval: float = 5.0):
+        self.started_at = time.time()
+        self.retry_interval = retry_interval
+        self.steps: List[Tuple[str, Callable[[], str], bool]] = [('database', _check_database, True)]
+        if preload:
+            self.steps.append(('preload', _preload_modules, False))
+        self._checks: Dict[str, Dict[str, Any]] = {
+            name: {'ok': False, 'required': required, 'detail': 'pendiente'}
+            for name, _, required in self.steps
+        }
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_env(cls) -> 'StartupState':
+        return cls(
+            preload=_env_bool('STARTUP_PRELOAD', True),
+            retry_interval=float(os.getenv('STARTUP_RETRY_INTERVAL', 5)),
+        )
+
+    def start(self) -> None:
+        """Start one warm-up thread per step (once); returns immediately."""
+        with self._lock:
+            if self._threads:
+                return
+            for name, step, required in self.steps:
+                thread = threading.Thread(
+                    target=self._run, args=(name, step, required), name=f'warmup-{name}', daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _run_step(self, name: str, step: Callable[[], str]) -> bool:
+        started = time.perf_counter()
+        try:
+            detail, ok = step(), True
+        except Exception as e:
+            detail, ok = str(e), False
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self._checks[name].update(ok=ok, detail=detail, elapsed_ms=elapsed_ms)
+            if ok:
+                self._checks[name]['ready_after_s'] = round(time.time() - self.started_at, 2)
+        if ok:
+            logger.info(f"Warm-up {name}: {detail} ({elapsed_ms} ms)")
+        else:
+            logger.warning(f"Warm-up {name} falló ({elapsed_ms} ms): {detail}")
+        return ok
+
+    def _run(self, name: str, step: Callable[[], str], required: bool) -> None:
+        while not self._run_step(name, step) and required:
+            time.sleep(self.retry_interval)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return all(c['ok'] for c in self._checks.values() if c['required'])
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            checks = {name: dict(c) for name, c in self._checks.items()}
+        return {
+            'status': 'ready' if all(c['ok'] for c in checks.values() if c['required']) else 'starting',
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'checks': checks,
+        }
+
+
+_startup: Optional[StartupState] = None
+_startup_lock = threading.Lock()
+
+
+def get_startup_state() -> StartupState:
+    """Get the process-wide startup state singleton."""
+    global _startup
+    if _startup is None:
+        with _startup_lock:
+            if _startup is None:
+                _startup = StartupState.from_env()
+    return _startup
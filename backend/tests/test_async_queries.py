@@ -0,0 +1,132 @@
+"""Every async query method drives its shared plan without touching MySQL."""
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from database.async_queries import AsyncFinancialDataQueries
+from database.cache import get_result_cache
+from database.queries import FinancialDataQueries
+from database.sql import MYSQL
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 31)
+
+# Argumentos mínimos de cada plan; un plan nuevo sin entrada aquí hace fallar la prueba
+PLAN_ARGS = {
+    'list_transactions': ('company', 'E1', START, END, None, None, None, None),
+    'get_top_categories': ('company', 'E1', START, END),
+    'get_monthly_summary': ('company', 'E1', 3, 2024, None, None),
+    'get_recent_burn_rate': ('company', 'E1'),
+    'get_monthly_totals_by_category': ('company', 'E1', 'Nómina'),
+    'detect_recurring_payments': ('U1',),
+    'get_company_balance': ('E1',),
+    'get_expenses_by_category': ('E1', START, END),
+    'get_cash_flow_projection': ('E1',),
+    'get_personal_balance': ('U1',),
+    'compare_budget_vs_actual': ('E1', 3, 2024),
+    'get_monthly_trends': ('E1',),
+    'get_monthly_series': ('E1', 'gasto'),
+    'get_monthly_flows': ('E1',),
+    'get_monthly_totals_all_categories': ('E1',),
+    'get_financial_facts': ('E1',),
+    'detect_spending_anomalies': ('E1',),
+    'get_multi_window_summary': ('E1', [(START, END)]),
+    'get_period_summary': ('E1', START, END),
+}
+
+
+class FakeSession:
+    def __init__(self, statements):
+        self.statements = statements
+
+    async def fetch_all(self, query, params=None):
+        self.statements.append((query, params))
+        return []
+
+
+class FakeAsyncDB:
+    dialect = MYSQL
+
+    def __init__(self):
+        self.statements = []
+
+    @asynccontextmanager
+    async def session(self):
+        yield FakeSession(self.statements)
+
+
+@pytest.fixture(autouse=True)
+def result_cache(monkeypatch):
+    # El singleton (y no uno nuevo): otros módulos registran listeners en él
+    cache = get_result_cache()
+    monkeypatch.setattr(cache, 'sync_interval', 0)
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def async_plans():
+    return sorted(
+        name for name, value in vars(AsyncFinancialDataQueries).items()
+        if not name.startswith('_') and inspect.iscoroutinefunction(value)
+    )
+
+
+def test_every_async_plan_has_arguments():
+    assert set(async_plans()) == set(PLAN_ARGS)
+
+
+@pytest.mark.parametrize('rollup', ['false', 'true'])
+@pytest.mark.parametrize('name', async_plans())
+def test_async_plan_runs(name, rollup, monkeypatch):
+    monkeypatch.setenv('USE_MONTHLY_ROLLUP', rollup)
+    db = FakeAsyncDB()
+    queries = AsyncFinancialDataQueries(db=db)
+
+    asyncio.run(getattr(queries, name)(*PLAN_ARGS[name]))
+
+    assert db.statements, f"{name} no ejecutó ninguna sentencia"
+
+
+def test_rollup_plans_read_the_rollup(monkeypatch):
+    monkeypatch.setenv('USE_MONTHLY_ROLLUP', 'true')
+    db = FakeAsyncDB()
+    asyncio.run(AsyncFinancialDataQueries(db=db).get_monthly_flows('E1'))
+
+    assert 'finanzas_rollup_mensual' in db.statements[0][0]
+
+
+class FakeSyncDB:
+    dialect = MYSQL
+
+    def __init__(self):
+        self.statements = []
+
+    def session(self):
+        db = self
+
+        class Session:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute_query(self, query, params=None, fetch=True):
+                db.statements.append((query, params))
+                return [{'total_ingresos': 10, 'total_gastos': 4, 'balance': 6}]
+
+        return Session()
+
+
+def test_async_balance_shares_the_sync_cache_entry():
+    sync_db, async_db = FakeSyncDB(), FakeAsyncDB()
+    expected = FinancialDataQueries(db=sync_db).get_company_balance('E1')
+
+    result = asyncio.run(AsyncFinancialDataQueries(db=async_db).get_company_balance('E1'))
+
+    assert result == expected
+    assert async_db.statements == []
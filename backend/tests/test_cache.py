@@ -0,0 +1,182 @@
+"""ResultCache: TTL, invalidation, version sync and per-backend keys."""
+from datetime import datetime
+
+import pytest
+
+import database.cache as cache_module
+import database.connection as connection_module
+from database.cache import ALL_ENTITIES, MAX_SYNC_BACKOFF, ResultCache, cached
+from database.sql import DUCKDB, MYSQL
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+class FakeVersionDB:
+    """Stands in for get_db_connection() in the version sync."""
+
+    def __init__(self, fail=0, latest=datetime(2024, 1, 1)):
+        self.fail = fail
+        self.latest = latest
+        self.statements = []
+        self.rows = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.statements.append(query)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('MySQL no disponible')
+        if 'MAX(updated_at)' in query:
+            return [{'entity_id': None, 'updated_at': self.latest}]
+        return self.rows
+
+
+@pytest.fixture
+def version_db(monkeypatch):
+    db = FakeVersionDB()
+    monkeypatch.setattr(connection_module, 'get_db_connection', lambda: db)
+    return db
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(ttl=10, sync_interval=0)
+    cache.set(('balance', 'E1'), 'E1', {'balance': 1})
+
+    assert cache.get(('balance', 'E1')) == {'balance': 1}
+    clock.now += 11
+    assert cache.get(('balance', 'E1')) is cache_module._MISSING
+    assert cache.stats()['expirations'] == 1
+
+
+def test_lru_evicts_oldest():
+    cache = ResultCache(maxsize=2, sync_interval=0)
+    for i in range(3):
+        cache.set(('k', str(i)), 'E1', i)
+
+    assert cache.get(('k', '0')) is cache_module._MISSING
+    assert cache.get(('k', '2')) == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidation_drops_entity_and_aggregates():
+    cache = ResultCache(sync_interval=0)
+    cache.set(('k', 'E1'), 'E1', 1)
+    cache.set(('k', 'E2'), 'E2', 2)
+    cache.set(('k', 'all'), ALL_ENTITIES, 3)
+
+    assert cache.invalidate_entity('E1') == 2
+    assert cache.get(('k', 'E2')) == 2
+    assert cache.get(('k', 'all')) is cache_module._MISSING
+
+
+def test_version_sync_creates_table_and_invalidates(clock, version_db):
+    cache = ResultCache(sync_interval=5)
+    cache.set(('k', 'E1'), 'E1', 1)
+
+    cache._maybe_sync()
+    assert 'CREATE TABLE IF NOT EXISTS' in version_db.statements[0]
+
+    version_db.rows = [{'entity_id': 'E1', 'updated_at': datetime(2024, 1, 2)}]
+    clock.now += 5
+    cache._maybe_sync()
+    assert cache.get(('k', 'E1'), sync=False) is cache_module._MISSING
+
+
+def test_sync_after_an_empty_version_table(clock, version_db):
+    version_db.latest = None
+    cache = ResultCache(sync_interval=5)
+    cache.set(('k', 'E1'), 'E1', 1)
+    cache.set(('k', 'E2'), 'E2', 2)
+
+    cache._maybe_sync()
+    assert cache._last_version is None
+
+    version_db.rows = [{'entity_id': 'E1', 'updated_at': datetime(2024, 1, 2)}]
+    clock.now += 5
+    assert cache.get(('k', 'E1')) is cache_module._MISSING
+    assert 'WHERE' not in version_db.statements[-1]
+    assert cache._last_version == datetime(2024, 1, 2)
+
+    version_db.rows = [{'entity_id': 'E2', 'updated_at': datetime(2024, 1, 3)}]
+    clock.now += 5
+    assert cache.get(('k', 'E2')) is cache_module._MISSING
+    assert 'updated_at > %s' in version_db.statements[-1]
+
+
+def test_concurrent_callers_skip_a_running_sync(clock, version_db):
+    cache = ResultCache(sync_interval=5)
+
+    with cache._sync_lock:
+        cache._maybe_sync()
+
+    assert version_db.statements == []
+
+
+def test_failed_sync_backs_off_and_recovers(clock, version_db):
+    version_db.fail = 3
+    cache = ResultCache(sync_interval=5)
+
+    cache._maybe_sync()
+    assert cache.stats()['sync_failures'] == 1
+    # Durante el backoff no se vuelve a consultar
+    clock.now += 5
+    cache._maybe_sync()
+    assert len(version_db.statements) == 1
+
+    for _ in range(2):
+        clock.now += MAX_SYNC_BACKOFF
+        cache._maybe_sync()
+    assert cache.stats()['sync_failures'] == 3
+
+    clock.now += MAX_SYNC_BACKOFF
+    cache._maybe_sync()
+    assert cache.stats()['sync_failures'] == 0
+    assert cache._last_version == datetime(2024, 1, 1)
+
+
+class FakeBackend:
+    def __init__(self, dialect):
+        self.dialect = dialect
+
+
+class Queries:
+    calls = 0
+
+    def __init__(self, db):
+        self.db = db
+
+    @cached('balance_test')
+    def balance(self, company_id=None):
+        Queries.calls += 1
+        return {'backend': self.db.dialect.name}
+
+
+def test_query_methods_are_keyed_by_backend(monkeypatch):
+    cache = ResultCache(sync_interval=0)
+    monkeypatch.setattr(cache_module, '_cache', cache)
+    mysql, duckdb = Queries(FakeBackend(MYSQL)), Queries(FakeBackend(DUCKDB))
+
+    assert mysql.balance('E1') == {'backend': 'mysql'}
+    assert duckdb.balance('E1') == {'backend': 'duckdb'}
+    assert mysql.balance('E1') == {'backend': 'mysql'}
+    assert Queries.calls == 2
+
+
+def test_non_mysql_backends_skip_version_sync(monkeypatch):
+    cache = ResultCache(sync_interval=5)
+    monkeypatch.setattr(cache_module, '_cache', cache)
+    monkeypatch.setattr(cache, '_maybe_sync', lambda: pytest.fail('sync con backend DuckDB'))
+
+    Queries(FakeBackend(DUCKDB)).balance('E1')
@@ -0,0 +1,74 @@
+"""Tools that run raw SQL read the driver's dict rows by column alias."""
+from decimal import Decimal
+
+from database.sql import MYSQL
+from tools.financial import planning, predictive, risk
+
+
+class FakeDB:
+    """Returns the rows of the first matching fragment, like the dictionary cursor."""
+
+    dialect = MYSQL
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def execute_query(self, query, params=None, fetch=True):
+        for fragment, rows in self.answers:
+            if fragment in query:
+                return rows
+        return []
+
+
+def test_personal_cash_runway(monkeypatch):
+    db = FakeDB([
+        ('AS balance', [{'balance': Decimal('1200')}]),
+        ('as net_flow', [{'net_flow': Decimal('-900')}]),
+    ])
+    monkeypatch.setattr(predictive, 'get_db_connection', lambda: db)
+
+    result = predictive.cash_runway_tool('personal', 'U1', burn_method='avg_3m')
+
+    assert result['success'] is True
+    assert result['current_cash'] == 1200.0
+    assert result['average_monthly_burn_rate'] == 300.0
+    assert result['cash_runway_months'] == 4.0
+
+
+def test_personal_cash_runway_without_history(monkeypatch):
+    db = FakeDB([('as net_flow', [{'net_flow': None}])])
+    monkeypatch.setattr(predictive, 'get_db_connection', lambda: db)
+
+    result = predictive.cash_runway_tool('personal', 'U1', current_cash=100.0)
+
+    assert result['success'] is False
+
+
+def test_over_budget_alerts(monkeypatch):
+    db = FakeDB([
+        ('budgeted_expenses', [{'categoria': 'Marketing', 'actual': Decimal('150'), 'budgeted': Decimal('100')}]),
+    ])
+    monkeypatch.setattr(risk, 'get_db_connection', lambda: db)
+
+    class Facts:
+        balance = 10.0
+
+    result = risk.get_alerts_tool('E-alerts', facts=Facts())
+
+    assert result['success'] is True
+    [alert] = result['active_alerts']
+    assert alert['title'] == 'Presupuesto Excedido'
+    assert "'Marketing'" in alert['message'] and '50%' in alert['message']
+
+
+def test_budget_allocator_reads_category_column(monkeypatch):
+    db = FakeDB([('avg_spent', [
+        {'categoria': 'Renta', 'avg_spent': Decimal('600')},
+        {'categoria': 'Comida', 'avg_spent': Decimal('400')},
+    ])])
+    monkeypatch.setattr(planning, 'get_db_connection', lambda: db)
+
+    result = planning.budget_allocator_tool('personal', 'U1', 1000.0, [])
+
+    allocation = {b['category']: b['allocated_budget'] for b in result['recommended_budget_allocation']}
+    assert allocation == {'Renta': 600.0, 'Comida': 400.0}
@@ -0,0 +1,32 @@
+"""Net-flow window shared by FinancialFacts and cash_runway_tool."""
+from datetime import datetime
+
+from tools.financial.facts import FinancialFacts, complete_months_net_flow
+
+NOW = datetime(2026, 10, 17)
+
+FLOWS = [
+    {'mes': '2026-06-01', 'ingresos': 10.0, 'gastos': 1.0},
+    {'mes': '2026-07-01', 'ingresos': 10.0, 'gastos': 2.0},
+    {'mes': '2026-08-01', 'ingresos': 5.0, 'gastos': 0.0},
+    {'mes': '2026-09-01', 'ingresos': 1.0, 'gastos': 0.0},
+    {'mes': '2026-10-01', 'ingresos': 100.0, 'gastos': 0.0},
+]
+
+
+def test_window_is_complete_months_without_current():
+    # jul + ago + sep; octubre (en curso) queda fuera
+    assert complete_months_net_flow(FLOWS, 3, now=NOW) == 14.0
+
+
+def test_window_without_data_is_none():
+    assert complete_months_net_flow(FLOWS[-1:], 3, now=NOW) is None
+
+
+def test_facts_cover_only_months_they_loaded():
+    facts = FinancialFacts(
+        company_id='E1', total_income=0, total_expense=0, balance=0,
+        income_6m=0, expense_6m=0, monthly_flows=FLOWS, months_back=12,
+    )
+    assert facts.covers(11)
+    assert not facts.covers(12)
@@ -0,0 +1,104 @@
+"""load_data: a rejected row does not abort the load and writes are always invalidated."""
+import importlib.util
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'scripts' / 'load_data.py'
+spec = importlib.util.spec_from_file_location('load_data', SCRIPT)
+load_data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_data)
+
+
+class FakeSession:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        if params is not None:
+            self.execute_batch(query, [params])
+
+    def execute_batch(self, query, seq_params):
+        for row in seq_params:
+            if row[-1] < 0:
+                raise ValueError('Out of range value for column monto')
+            self.rows.append(row)
+
+
+class FakeDB:
+    """Writes become visible only when the session closes without error."""
+
+    def __init__(self):
+        self.rows = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        return []
+
+    @contextmanager
+    def session(self):
+        session = FakeSession(self)
+        yield session
+        self.rows.extend(session.rows)
+
+
+@pytest.fixture
+def changed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(load_data, 'mark_entities_changed', lambda ids, db=None: calls.append(set(ids)))
+    return calls
+
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / 'empresa.csv'
+    lines = ['id_empresa,fecha,tipo_operacion,concepto,categoria,monto']
+    lines += [f"{e},2024-01-{d:02d},gasto,x,Renta,{m}" for e, d, m in rows]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_bad_row_only_drops_itself(tmp_path, monkeypatch, changed):
+    db = FakeDB()
+    monkeypatch.setattr(load_data, 'get_db_connection', lambda: db)
+    path = write_csv(tmp_path, [('E1', 1, 10), ('E2', 2, -1), ('E3', 3, 30), ('E4', 4, 40)])
+
+    inserted = load_data.bulk_load(path, load_data.COMPANY_SPEC, batch_size=2)
+
+    assert inserted == 3
+    assert [row[0] for row in db.rows] == ['E1', 'E3', 'E4']
+    assert changed == [{'E1', 'E3', 'E4'}]
+
+
+def test_interrupted_load_still_invalidates(tmp_path, monkeypatch, changed):
+    db = FakeDB()
+    monkeypatch.setattr(load_data, 'get_db_connection', lambda: db)
+    path = write_csv(tmp_path, [('E1', 1, 10), ('E2', 2, 20), ('E3', 3, 30)])
+    read = load_data.iter_chunks
+
+    def broken_file(path, chunk_size):
+        chunks = read(path, chunk_size)
+        yield next(chunks)
+        raise OSError('archivo truncado')
+
+    monkeypatch.setattr(load_data, 'iter_chunks', broken_file)
+
+    with pytest.raises(OSError):
+        load_data.bulk_load(path, load_data.COMPANY_SPEC, chunk_size=2)
+
+    assert changed == [{'E1', 'E2'}]
+
+
+def test_company_load_refreshes_the_rollup(tmp_path, monkeypatch, changed):
+    db = FakeDB()
+    events = []
+    monkeypatch.setattr(load_data, 'get_db_connection', lambda: db)
+    monkeypatch.setattr(load_data, 'refresh_rollup', lambda db: events.append('rollup'))
+    monkeypatch.setattr(load_data, 'mark_entities_changed', lambda ids, db=None: events.append('invalidate'))
+    monkeypatch.setenv('USE_MONTHLY_ROLLUP', 'true')
+    path = write_csv(tmp_path, [('E1', 1, 10)])
+
+    load_data.bulk_load(path, load_data.COMPANY_SPEC)
+    load_data.bulk_load(path, load_data.PERSONAL_SPEC)
+
+    assert events == ['rollup', 'invalidate', 'invalidate']
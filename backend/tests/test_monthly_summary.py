@@ -0,0 +1,50 @@
+"""monthly_summary_tool: current and previous period in one query on the real tables."""
+from contextlib import contextmanager
+
+import pytest
+
+from database.queries import FinancialDataQueries
+from database.sql import MYSQL
+from tools.financial import descriptive
+
+
+class FakeDB:
+    dialect = MYSQL
+
+    def __init__(self):
+        self.statements = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.statements.append((query, params))
+        return [{
+            'ingresos_0': 300, 'gastos_0': 100, 'transacciones_0': 4,
+            'ingresos_1': 200, 'gastos_1': 200, 'transacciones_1': 3,
+        }]
+
+    @contextmanager
+    def session(self):
+        yield self
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(descriptive, 'FinancialDataQueries', lambda: FinancialDataQueries(db=db))
+    return db
+
+
+@pytest.mark.parametrize('entity_type, table, column', [
+    ('company', 'finanzas_empresa', 'empresa_id'),
+    ('personal', 'finanzas_personales', 'id_usuario'),
+])
+def test_summary_reads_the_entity_table(db, entity_type, table, column):
+    result = descriptive.monthly_summary_tool(entity_type, 'X1', month=3, year=2024)
+
+    [(query, params)] = db.statements
+    assert f"FROM {table}" in query and f"{column} = %s" in query
+    assert 'X1' in params
+    assert result['current_period'] == {
+        'start_date': '2024-03-01', 'end_date': '2024-03-31', 'income': 300.0, 'expense': 100.0, 'net_flow': 200.0,
+    }
+    assert result['previous_period']['start_date'] == '2024-02-01'
+    assert result['variation_vs_previous_period'] == {'income_pct_change': 50.0, 'expense_pct_change': -50.0}
@@ -0,0 +1,67 @@
+"""Keyset cursors and the list_transactions count."""
+from datetime import datetime
+
+import pytest
+
+import database.queries as queries_module
+from database.cache import get_result_cache
+from database.queries import FinancialDataQueries, QueryPlanHost, decode_cursor, encode_cursor
+
+
+def run_plan(plan, count=7):
+    """Drive a plan with a COUNT(*) result and an empty page; return (result, statements)."""
+    statements = []
+    rows = None
+    try:
+        while True:
+            query, params = plan.send(rows)
+            statements.append(query)
+            rows = [{'c': count}] if 'COUNT(*)' in query else []
+    except StopIteration as done:
+        return done.value, statements
+
+
+def list_plan(cursor=None, include_total=True, entity_id='E1'):
+    return FinancialDataQueries.list_transactions.plan(
+        QueryPlanHost(), 'company', entity_id, None, None, None, None, None, None,
+        limit=10, cursor=cursor, include_total=include_total,
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_count_cache():
+    queries_module._count_cache.clear()
+    yield
+    queries_module._count_cache.clear()
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(datetime(2024, 3, 1, 12, 30), 42)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (datetime(2024, 3, 1, 12, 30), 42)
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor('no-es-un-cursor')
+
+
+def test_include_total_false_skips_the_count_on_every_page():
+    cursor = encode_cursor(datetime(2024, 3, 1), 42)
+    for page in (None, cursor):
+        result, statements = run_plan(list_plan(cursor=page, include_total=False))
+        assert result['total'] is None
+        assert not any('COUNT(*)' in q for q in statements)
+
+
+def test_cursor_pages_reuse_the_count_until_the_entity_changes():
+    cursor = encode_cursor(datetime(2024, 3, 1), 42)
+    first, _ = run_plan(list_plan(), count=7)
+    cached, statements = run_plan(list_plan(cursor=cursor), count=99)
+    assert (first['total'], cached['total'], cached['total_cached']) == (7, 7, True)
+    assert not any('COUNT(*)' in q for q in statements)
+
+    get_result_cache().invalidate_entity('E1')
+    fresh, _ = run_plan(list_plan(cursor=cursor), count=99)
+    assert (fresh['total'], fresh['total_cached']) == (99, False)
@@ -0,0 +1,93 @@
+"""ElasticConnectionPool: grows to max_size, queues, and shrinks back to min_size."""
+import threading
+import time
+
+import pytest
+
+from database.pool import ElasticConnectionPool, PoolExhaustedError, PoolSettings
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+
+    def ping(self, reconnect=False):
+        pass
+
+    def reset_session(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**settings):
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    return ElasticConnectionPool(connect, PoolSettings(**settings)), created
+
+
+def test_starts_at_min_and_grows_to_max():
+    pool, created = make_pool(min_size=1, max_size=3, wait_timeout=0.05)
+    assert len(created) == 1
+
+    held = [pool.get_connection() for _ in range(3)]
+
+    assert len(created) == 3
+    assert pool.stats()['in_use'] == 3
+    with pytest.raises(PoolExhaustedError):
+        pool.get_connection()
+    assert pool.stats()['exhausted'] == 1
+    for conn in held:
+        conn.close()
+    assert pool.stats()['idle'] == 3
+
+
+def test_waiter_gets_the_released_connection():
+    pool, created = make_pool(min_size=0, max_size=1, wait_timeout=2.0)
+    first = pool.get_connection()
+    threading.Timer(0.05, first.close).start()
+
+    second = pool.get_connection()
+
+    assert len(created) == 1
+    assert second._raw is created[0]
+    assert created[0].resets == 1
+
+
+def test_full_wait_queue_fails_fast():
+    pool, _ = make_pool(min_size=0, max_size=1, max_waiters=0)
+    pool.get_connection()
+
+    with pytest.raises(PoolExhaustedError, match='queue is full'):
+        pool.get_connection(timeout=5.0)
+    assert pool.stats()['queue_full'] == 1
+
+
+def test_idle_connections_above_min_are_closed():
+    pool, created = make_pool(min_size=1, max_size=3, max_idle=0.01)
+    held = [pool.get_connection() for _ in range(3)]
+    for conn in held[:2]:
+        conn.close()
+    time.sleep(0.02)
+
+    held[2].close()
+
+    stats = pool.stats()
+    assert stats['size'] == 1
+    assert sum(c.closed for c in created) == 2
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '4')
+    monkeypatch.setenv('DB_POOL_MIN', '8')
+    monkeypatch.delenv('DB_POOL_MAX', raising=False)
+
+    settings = PoolSettings.from_env()
+
+    assert (settings.min_size, settings.max_size) == (4, 4)
@@ -0,0 +1,82 @@
+"""ToolSpec.bind and the per-tool concurrency limits of ToolRegistry."""
+import asyncio
+
+import pytest
+
+from tools.registry import ToolRegistry, ToolSpec, parse_overrides
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'company_id': {'type': 'string'},
+        'months': {'type': 'integer', 'default': 6},
+        'category': {'type': 'string'},
+    },
+    'required': ['company_id'],
+}
+
+
+def echo(**kwargs):
+    return kwargs
+
+
+def test_bind_fills_defaults_and_drops_unknown_keys():
+    spec = ToolSpec('echo', echo, input_schema=SCHEMA)
+
+    kwargs = spec.bind({'company_id': 'E1', 'facts': object()})
+
+    assert kwargs == {'company_id': 'E1', 'months': 6}
+
+
+def test_bind_rejects_missing_required():
+    spec = ToolSpec('echo', echo, input_schema=SCHEMA)
+
+    with pytest.raises(ValueError, match='company_id'):
+        spec.bind({'company_id': None, 'months': 3})
+
+
+def test_call_runs_sync_and_async_tools():
+    async def aecho(**kwargs):
+        return kwargs
+
+    registry = ToolRegistry([ToolSpec('echo', echo, input_schema=SCHEMA), ToolSpec('aecho', aecho)])
+    try:
+        assert asyncio.run(registry.call('echo', {'company_id': 'E1'})) == {'company_id': 'E1', 'months': 6}
+        assert asyncio.run(registry.run('aecho', x=1)) == {'x': 1}
+        assert registry.stats()['by_tool']['echo']['calls'] == 1
+    finally:
+        registry.shutdown()
+
+
+def test_concurrency_limit_per_tool():
+    peak = 0
+    running = 0
+
+    async def slow():
+        nonlocal peak, running
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def burst(registry):
+        await asyncio.gather(*(registry.run('slow') for _ in range(6)))
+
+    registry = ToolRegistry([ToolSpec('slow', slow, max_concurrency=4)], overrides={'slow': 2})
+    asyncio.run(burst(registry))
+
+    assert registry.stats()['by_tool']['slow']['limit'] == 2
+    assert peak == 2
+
+
+def test_duplicate_and_unknown_tools():
+    registry = ToolRegistry([ToolSpec('echo', echo)])
+
+    with pytest.raises(ValueError):
+        registry.register(ToolSpec('echo', echo))
+    with pytest.raises(ValueError):
+        registry.get('nope')
+
+
+def test_parse_overrides_skips_invalid_limits():
+    assert parse_overrides('a=1, b=x,c,d=16') == {'a': 1, 'd': 16}
@@ -0,0 +1,65 @@
+"""Monthly rollup: atomic rebuild and the same month window as the raw-table plans."""
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from database.queries import FinancialDataQueries
+from database.rollup import ROLLUP_TABLE, STAGING_TABLE, MonthlyRollup
+from database.sql import MYSQL, month_key_since, since_month
+
+
+class FakeSession:
+    def __init__(self, log):
+        self.log = log
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.log.append((' '.join(query.split()), params))
+
+
+class FakeDB:
+    dialect = MYSQL
+
+    def __init__(self, max_id):
+        self.max_id = max_id
+        self.log = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.log.append((' '.join(query.split()), params))
+        return [{'max_id': self.max_id}] if 'MAX(id)' in query else []
+
+    @contextmanager
+    def session(self):
+        yield FakeSession(self.log)
+
+
+def test_rebuild_swaps_a_staging_table():
+    db = FakeDB(max_id=120)
+
+    result = MonthlyRollup(db).rebuild(batch_size=50)
+
+    statements = [sql for sql, _ in db.log]
+    assert result == {'from_id': 0, 'to_id': 120, 'batches': 3}
+    assert not any(sql.startswith(f"DELETE FROM {ROLLUP_TABLE}") for sql in statements)
+    upserts = [params for sql, params in db.log if 'SELECT COALESCE' in sql]
+    assert upserts == [(0, 50), (50, 100), (100, 120)]
+    assert all(f"INSERT INTO {STAGING_TABLE}" in sql for sql in statements if 'SELECT COALESCE' in sql)
+    rename = next(i for i, sql in enumerate(statements) if sql.startswith('RENAME TABLE'))
+    assert f"{STAGING_TABLE} TO {ROLLUP_TABLE}" in statements[rename]
+    assert db.log[rename + 1][1] == ('finanzas_empresa', 120)
+
+
+def test_raw_and_rollup_windows_start_on_the_same_month():
+    now = datetime(2024, 5, 20, 15, 30)
+
+    _, [start] = since_month(3, now=now)
+
+    assert start == date(2024, 2, 1)
+    assert month_key_since(3, now) == start.strftime('%Y-%m')
+
+
+def test_raw_monthly_plan_uses_whole_months(monkeypatch):
+    monkeypatch.delenv('USE_MONTHLY_ROLLUP', raising=False)
+    plan = FinancialDataQueries.get_monthly_flows.plan(FinancialDataQueries(db=FakeDB(0)), 'E1', 3)
+
+    _, params = next(plan)
+
+    assert params[0].day == 1
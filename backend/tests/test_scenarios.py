@@ -0,0 +1,74 @@
+"""Scenario engine: baseline averaging, argument validation and the grid simulation."""
+import numpy as np
+import pytest
+
+from forecasting.scenarios import Baseline, Scenario, simulate
+
+MONTHS = ['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01']
+
+
+@pytest.fixture
+def baseline():
+    income = [{'categoria': 'Ventas', 'mes': m, 'total': 1000} for m in MONTHS[1:]]
+    expense = [
+        *({'categoria': 'Renta', 'mes': m, 'total': 400} for m in MONTHS[1:]),
+        {'categoria': 'Marketing', 'mes': MONTHS[3], 'total': 300},
+    ]
+    return Baseline.from_rows(income, expense, MONTHS, balance=500.0)
+
+
+def test_baseline_skips_leading_empty_months(baseline):
+    assert baseline.months == tuple(MONTHS[1:])
+    assert baseline.income == 1000.0
+    assert baseline.categories['gasto'] == {'Renta': 400.0, 'Marketing': 100.0}
+    assert baseline.expense == 500.0
+
+
+def test_baseline_without_history():
+    assert Baseline.from_rows([], [], MONTHS, balance=5.0) == Baseline(income=0.0, expense=0.0, balance=5.0)
+
+
+def test_from_dict_validates_values():
+    with pytest.raises(ValueError, match='income_pct'):
+        Scenario.from_dict({'income_pct': 'diez'}, 0)
+    with pytest.raises(ValueError, match='tipo'):
+        Scenario.from_dict({'category_changes': [{'category': 'Renta', 'tipo': 'otro'}]}, 0)
+    with pytest.raises(ValueError, match='month'):
+        Scenario.from_dict({'events': [{'month': 0, 'amount': 1}]}, 0)
+    assert Scenario.from_dict({}, 2).name == 'escenario_3'
+
+
+def test_check_rejects_out_of_horizon_and_unknown_categories(baseline):
+    with pytest.raises(ValueError, match='fuera del horizonte'):
+        Scenario('s', start_month=7).check(baseline, 6)
+    unknown = Scenario.from_dict({'category_changes': [{'category': 'Viajes', 'pct': 10}]}, 0)
+    with pytest.raises(ValueError, match='Viajes'):
+        unknown.check(baseline, 6)
+    # Un monto fijo sí puede abrir una categoría nueva
+    Scenario.from_dict({'category_changes': [{'category': 'Viajes', 'amount': 50}]}, 0).check(baseline, 6)
+
+
+def test_simulate_grid(baseline):
+    scenarios = [
+        Scenario('base'),
+        Scenario.from_dict({
+            'name': 'recorte',
+            'expense_pct': -10,
+            'category_changes': [{'category': 'Renta', 'pct': 50}],
+            'start_month': 2,
+        }, 1),
+        Scenario.from_dict({'name': 'caida', 'income_pct': -100, 'events': [{'month': 3, 'amount': 200}]}, 2),
+    ]
+
+    grid = simulate(baseline, scenarios, months=3, start_balance=baseline.balance)
+
+    assert grid.balance.shape == (3, 3)
+    np.testing.assert_allclose(grid.net[0], [500, 500, 500])
+    # -10% de 500 más +50% de Renta (200), aditivos, desde el mes 2
+    np.testing.assert_allclose(grid.expense[1], [500, 650, 650])
+    np.testing.assert_allclose(grid.net[2], [-500, -500, -300])
+
+    summary = grid.summary()
+    np.testing.assert_allclose(summary['final_balance'], [2000, 1700, -800])
+    assert summary['first_negative_month'].tolist() == [0, 0, 2]
+    assert summary['min_balance_month'].tolist() == [1, 1, 3]
@@ -0,0 +1,70 @@
+"""Response shaping: field projection, column encoding and argument parsing."""
+import json
+
+import pytest
+
+from utils.shaping import ShapeOptions, project, render, shape, to_columns
+
+RESULT = {
+    'success': True,
+    'summary': {'balance': 10.0, 'months': 3},
+    'projections': [
+        {'mes': '2024-01', 'balance': 1.0, 'ingresos': 5.0},
+        {'mes': '2024-02', 'balance': 2.0, 'ingresos': 6.0},
+    ],
+}
+
+
+def test_project_keeps_paths_and_status_keys():
+    out = project(RESULT, ['projections.balance', 'summary.months'])
+
+    assert out == {
+        'success': True,
+        'summary': {'months': 3},
+        'projections': [{'balance': 1.0}, {'balance': 2.0}],
+    }
+
+
+def test_prefix_keeps_whole_subtree():
+    assert project(RESULT, ['summary', 'summary.balance'])['summary'] == RESULT['summary']
+
+
+def test_to_columns_only_for_uniform_lists():
+    out = to_columns({'rows': RESULT['projections'], 'one': [{'a': 1}], 'plain': [1, 2]})
+
+    assert out['rows'] == {
+        'cols': ['mes', 'balance', 'ingresos'],
+        'rows': [['2024-01', 1.0, 5.0], ['2024-02', 2.0, 6.0]],
+    }
+    assert out['one'] == [{'a': 1}]
+    assert out['plain'] == [1, 2]
+
+
+def test_shape_projects_before_encoding():
+    options = ShapeOptions(fields=('projections.mes',), encoding='columns')
+
+    assert shape(RESULT, options)['projections'] == {'cols': ['mes'], 'rows': [['2024-01'], ['2024-02']]}
+
+
+def test_pop_from_takes_shaping_arguments(monkeypatch):
+    monkeypatch.delenv('RESPONSE_ENCODING', raising=False)
+    arguments = {'company_id': 'E1', 'fields': ['summary'], 'encoding': 'columns'}
+
+    options = ShapeOptions.pop_from(arguments)
+
+    assert arguments == {'company_id': 'E1'}
+    assert options == ShapeOptions(fields=('summary',), encoding='columns')
+    assert ShapeOptions.pop_from({}).is_default
+
+
+@pytest.mark.parametrize('arguments', [{'fields': 'summary'}, {'encoding': 'xml'}])
+def test_pop_from_rejects_bad_arguments(arguments):
+    with pytest.raises(ValueError):
+        ShapeOptions.pop_from(arguments)
+
+
+def test_render_is_compact_json():
+    text = render({'categoría': 'Nómina', 'n': 1}, ShapeOptions())
+
+    assert ' ' not in text
+    assert json.loads(text) == {'categoría': 'Nómina', 'n': 1}
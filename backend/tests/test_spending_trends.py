@@ -0,0 +1,68 @@
+"""get_spending_trends: columnar cache per company, SQL aggregate otherwise."""
+from datetime import date
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from database.columnar import EntityColumns
+from tools.financial import analytics
+
+THIS_MONTH = date.today().replace(day=1)
+LAST_MONTH = THIS_MONTH - relativedelta(months=1)
+
+SQL_TRENDS = [
+    {'año': LAST_MONTH.year, 'mes': LAST_MONTH.month, 'ingresos': 100.0, 'gastos': 50.0, 'balance': 50.0},
+    {'año': THIS_MONTH.year, 'mes': THIS_MONTH.month, 'ingresos': 100.0, 'gastos': 75.0, 'balance': 25.0},
+]
+
+
+class FakeQueries:
+    def get_monthly_trends(self, company_id, months_back):
+        return [dict(t) for t in SQL_TRENDS]
+
+
+class FakeStore:
+    def __init__(self):
+        self.loaded = []
+
+    def get(self, entity_type, entity_id=None):
+        self.loaded.append(entity_id)
+        rows = [
+            {'fecha': LAST_MONTH, 'tipo': 'ingreso', 'monto': 100, 'categoria': 'Ventas', 'contraparte': 'A'},
+            {'fecha': LAST_MONTH, 'tipo': 'gasto', 'monto': 50, 'categoria': 'Renta', 'contraparte': 'B'},
+            {'fecha': THIS_MONTH, 'tipo': 'ingreso', 'monto': 100, 'categoria': 'Ventas', 'contraparte': 'A'},
+            {'fecha': THIS_MONTH, 'tipo': 'gasto', 'monto': 75, 'categoria': 'Renta', 'contraparte': 'B'},
+        ]
+        return EntityColumns.from_rows((entity_type, entity_id), rows)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(analytics, 'get_columnar_store', lambda: store)
+    monkeypatch.setattr(analytics, 'FinancialDataQueries', FakeQueries)
+    monkeypatch.delenv('USE_MONTHLY_ROLLUP', raising=False)
+    return store
+
+
+def test_all_companies_use_the_sql_aggregate(store):
+    result = analytics.get_spending_trends_tool(None, 6)
+
+    assert store.loaded == []
+    assert result['data']['tendencias_mensuales'] == SQL_TRENDS
+    assert result['data']['analisis']['tendencia_promedio'] == 50.0
+
+
+def test_rollup_uses_the_sql_aggregate(store, monkeypatch):
+    monkeypatch.setenv('USE_MONTHLY_ROLLUP', 'true')
+
+    analytics.get_spending_trends_tool('E1', 6)
+
+    assert store.loaded == []
+
+
+def test_one_company_matches_the_sql_result(store):
+    result = analytics.get_spending_trends_tool('E1', 6)
+
+    assert store.loaded == ['E1']
+    assert result['data']['tendencias_mensuales'] == SQL_TRENDS
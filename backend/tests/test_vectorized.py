@@ -0,0 +1,61 @@
+"""Closed-form and Holt-Winters forecasters over many series at once."""
+import numpy as np
+
+from forecasting import model_entity
+from forecasting.vectorized import holt_winters, pivot_monthly, trend_seasonal
+
+
+def test_trend_seasonal_clamps_declining_series():
+    declining = np.array([[500.0, 400.0, 300.0, 200.0, 100.0, 0.0]])
+
+    forecast, info = trend_seasonal(declining, 6)
+
+    assert info['method'] == 'linear_trend'
+    assert forecast.shape == (1, 6)
+    assert (forecast >= 0).all()
+    np.testing.assert_allclose(forecast, 0.0)
+
+
+def test_trend_seasonal_follows_a_line():
+    rising = np.array([[100.0, 110.0, 120.0, 130.0]])
+
+    forecast, _ = trend_seasonal(rising, 2)
+
+    np.testing.assert_allclose(forecast, [[140.0, 150.0]])
+
+
+def test_trend_seasonal_short_history_uses_the_mean():
+    forecast, info = trend_seasonal(np.array([[10.0, 30.0]]), 3)
+
+    assert info['method'] == 'mean'
+    np.testing.assert_allclose(forecast, [[20.0, 20.0, 20.0]])
+
+
+def test_holt_winters_is_non_negative_and_per_row():
+    months = np.arange(30, dtype=float)
+    matrix = np.stack([1000 - 40 * months, 200 + 50 * np.sin(months * np.pi / 6)])
+
+    forecast, info = holt_winters(matrix, 6)
+
+    assert info['method'] == 'holt_winters'
+    assert forecast.shape == (2, 6)
+    assert (forecast >= 0).all()
+
+
+def test_pivot_monthly_fills_missing_months():
+    rows = [
+        {'categoria': 'A', 'mes': '2024-01-01', 'total': 10},
+        {'categoria': 'A', 'mes': '2024-03-01', 'total': 5},
+        {'categoria': 'B', 'mes': '2024-02-15', 'total': 7},
+    ]
+
+    labels, matrix = pivot_monthly(rows, 'categoria', ['2024-01-01', '2024-02-01', '2024-03-01'])
+
+    assert labels == ['A', 'B']
+    np.testing.assert_allclose(matrix, [[10, 0, 5], [0, 7, 0]])
+
+
+def test_model_entity_is_shared_by_every_tool():
+    assert model_entity('company', 'E1') == 'company:E1'
+    assert model_entity('company', None) == 'company:all'
+    assert model_entity('personal', 'U1') == 'personal:U1'